@@ -0,0 +1,81 @@
+#AnimationManager.py
+import logging
+
+from PySide6.QtCore import QObject, QTimer, QElapsedTimer
+
+FRAME_INTERVAL_MS = 16  # ~60 frames per second for all animated widgets
+DEFAULT_DURATION_MS = 500
+
+
+class ValueAnimationManager(QObject):
+    """Animates the values of data widgets from one shared frame timer.
+
+    Every widget owns at most one animation. A new target arriving mid-flight
+    retargets the running animation from the currently displayed value, and a
+    target equal to the current value is ignored.
+    """
+
+    def __init__(self, interval=FRAME_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        # widget -> [start_value, end_value, start_ms, duration_ms]
+        self.animations = {}
+        self.clock = QElapsedTimer()
+        self.clock.start()
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.on_frame)
+
+    def animate(self, widget, new_value, duration=DEFAULT_DURATION_MS):
+        """Move widget.value towards new_value, reusing the widget's animation if it has one."""
+        animation = self.animations.get(widget)
+        if animation is not None:
+            if animation[1] == new_value:
+                return  # Already heading there
+        elif widget.value == new_value:
+            return  # Nothing to animate
+
+        if duration <= 0 or not widget.isVisible():
+            # Hidden widgets jump straight to the new value
+            self.animations.pop(widget, None)
+            widget.on_value_changed(new_value)
+            return
+
+        self.animations[widget] = [widget.value, new_value, self.clock.elapsed(), duration]
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def stop(self, widget):
+        """Drop the widget's animation, leaving the current value displayed."""
+        self.animations.pop(widget, None)
+        if not self.animations:
+            self.timer.stop()
+
+    def on_frame(self):
+        now = self.clock.elapsed()
+        finished = []
+        for widget, (start, end, started, duration) in self.animations.items():
+            progress = min(1.0, (now - started) / duration)
+            try:
+                widget.on_value_changed(start + (end - start) * progress)
+            except RuntimeError:
+                # The underlying C++ widget was deleted (window closed)
+                logging.debug("Dropping animation of a deleted widget.")
+                progress = 1.0
+            if progress >= 1.0:
+                finished.append(widget)
+
+        for widget in finished:
+            del self.animations[widget]
+        if not self.animations:
+            self.timer.stop()
+
+
+animation_manager = None
+
+
+def get_animation_manager():
+    """Return the application-wide animation manager, creating it on first use."""
+    global animation_manager
+    if animation_manager is None:
+        animation_manager = ValueAnimationManager()
+    return animation_manager
@@ -0,0 +1,89 @@
+#AssetLoader.py
+import logging
+import threading
+
+from PySide6.QtCore import Qt, QRunnable, QThreadPool
+from PySide6.QtGui import QImage, QPixmap
+
+
+def scale_image(image, size):
+    """Scale like the widgets do: fit in a size x size square, keeping the aspect ratio."""
+    if size is None or image.isNull():
+        return image
+    return image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+
+class DecodeTask(QRunnable):
+    """Decodes one image file, and its scaled copies, on a worker thread."""
+
+    def __init__(self, loader, path, sizes):
+        super().__init__()
+        self.loader = loader
+        self.path = path
+        self.sizes = sizes
+
+    def run(self):
+        image = QImage(self.path)
+        if image.isNull():
+            logging.warning(f"Failed to load image {self.path}")
+        images = {(self.path, None): image}
+        for size in self.sizes:
+            images[(self.path, size)] = scale_image(image, size)
+        self.loader.store(images)
+
+
+class AssetLoader:
+    """Decodes images into QImage on a thread pool (QImage is safe to use off the GUI thread).
+
+    The GUI thread only converts finished images to pixmaps. Anything that was
+    not preloaded is decoded synchronously on first use.
+    """
+
+    def __init__(self):
+        self.pool = QThreadPool.globalInstance()
+        self.lock = threading.Lock()
+        self.images = {}  # (path, size or None) -> QImage, filled by the workers
+        self.pixmaps = {}  # (path, size or None) -> QPixmap, GUI thread only
+
+    def preload(self, paths, sizes=()):
+        """Start decoding every path, and pre-scaling it to each of sizes, in the background."""
+        sizes = tuple(sorted(set(sizes)))
+        for path in dict.fromkeys(paths):
+            self.pool.start(DecodeTask(self, path, sizes))
+        logging.info(f"Preloading {len(paths)} images at sizes {sizes}")
+
+    def store(self, images):
+        with self.lock:
+            self.images.update(images)
+
+    def image(self, path, size=None):
+        with self.lock:
+            image = self.images.get((path, size))
+            original = self.images.get((path, None))
+        if image is not None:
+            return image
+
+        if original is None:
+            original = QImage(path)
+        image = scale_image(original, size)
+        self.store({(path, None): original, (path, size): image})
+        return image
+
+    def pixmap(self, path, size=None):
+        """Return the image at path scaled to size as a pixmap. Call from the GUI thread only."""
+        pixmap = self.pixmaps.get((path, size))
+        if pixmap is None:
+            pixmap = QPixmap.fromImage(self.image(path, size))
+            self.pixmaps[(path, size)] = pixmap
+        return pixmap
+
+
+asset_loader = None
+
+
+def get_asset_loader():
+    """Return the application-wide asset loader, creating it on first use."""
+    global asset_loader
+    if asset_loader is None:
+        asset_loader = AssetLoader()
+    return asset_loader
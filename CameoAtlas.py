@@ -0,0 +1,268 @@
+#CameoAtlas.py
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+
+from PySide6.QtCore import QRect, QRunnable, QThreadPool
+from PySide6.QtGui import QImage, QPainter, QPixmap
+
+from AssetLoader import scale_image
+from common import names, name_to_path
+
+ATLAS_CACHE_DIR = 'cache'
+ATLAS_MAGIC = b'RA2A'
+ATLAS_VERSION = 1
+HEADER = struct.Struct('<4sII')  # magic, version, length of the JSON index
+
+
+def all_unit_names():
+    """Every unit that can have a counter, without duplicates."""
+    return list(dict.fromkeys(unit for faction in names.values() for units in faction.values() for unit in units))
+
+
+def atlas_cache_key(unit_names, size):
+    """Hash of the atlas size and the name, size and mtime of every source cameo."""
+    digest = hashlib.sha1(f"{ATLAS_VERSION}:{size}".encode())
+    for unit_name in sorted(unit_names):
+        try:
+            stat = os.stat(name_to_path(unit_name))
+            digest.update(f"{unit_name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        except OSError:
+            digest.update(f"{unit_name}:missing;".encode())
+    return digest.hexdigest()
+
+
+class CameoAtlas:
+    """Every cameo scaled to one size, packed into a single image.
+
+    Counter widgets draw their sub-rectangle of the shared pixmap instead of
+    holding a scaled pixmap each.
+    """
+
+    def __init__(self, size, image, rects):
+        self.size = size
+        self.image = image  # QImage, safe to create on a worker thread
+        self.rects = rects  # unit_name -> QRect within the image
+        self._pixmap = None
+
+    @property
+    def pixmap(self):
+        """The atlas as a pixmap. GUI thread only."""
+        if self._pixmap is None:
+            self._pixmap = QPixmap.fromImage(self.image)
+        return self._pixmap
+
+    def source_rect(self, unit_name):
+        return self.rects.get(unit_name)
+
+    @classmethod
+    def build(cls, unit_names, size):
+        """Decode, scale and shelf-pack the cameos of unit_names."""
+        cameos = []
+        for unit_name in unit_names:
+            image = QImage(name_to_path(unit_name))
+            if image.isNull():
+                continue  # Counters fall back to loading the file themselves
+            cameos.append((unit_name, scale_image(image, size)))
+
+        # Pack in rows of about sqrt(n) cameos, each row as high as its tallest cameo
+        per_row = max(1, int(len(cameos) ** 0.5 + 0.5))
+        rects = {}
+        x = y = row_height = width = 0
+        for i, (unit_name, image) in enumerate(cameos):
+            if i and i % per_row == 0:
+                x, y, row_height = 0, y + row_height, 0
+            rects[unit_name] = QRect(x, y, image.width(), image.height())
+            x += image.width()
+            width = max(width, x)
+            row_height = max(row_height, image.height())
+
+        atlas = QImage(max(width, 1), max(y + row_height, 1), QImage.Format_RGBA8888)
+        atlas.fill(0)
+        painter = QPainter(atlas)
+        for unit_name, image in cameos:
+            painter.drawImage(rects[unit_name].topLeft(), image)
+        painter.end()
+        return cls(size, atlas, rects)
+
+    def save(self, path):
+        """Write the index and the raw RGBA pixels to one file, atomically."""
+        index = {
+            'size': self.size,
+            'width': self.image.width(),
+            'height': self.image.height(),
+            'rects': {name: [r.x(), r.y(), r.width(), r.height()] for name, r in self.rects.items()},
+        }
+        index_data = json.dumps(index).encode('utf-8')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(HEADER.pack(ATLAS_MAGIC, ATLAS_VERSION, len(index_data)))
+            file.write(index_data)
+            file.write(self.image.constBits().tobytes()[:self.image.sizeInBytes()])
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load an atlas written by save() with a single read. Returns None if the file is unusable."""
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            magic, version, index_length = HEADER.unpack_from(data)
+            if magic != ATLAS_MAGIC or version != ATLAS_VERSION:
+                return None
+            index = json.loads(data[HEADER.size:HEADER.size + index_length])
+            pixels = data[HEADER.size + index_length:]
+            width, height = index['width'], index['height']
+            if len(pixels) != width * height * 4:
+                return None
+            image = QImage(pixels, width, height, width * 4, QImage.Format_RGBA8888).copy()
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            logging.warning(f"Ignoring unreadable cameo atlas {path}: {e}")
+            return None
+        rects = {name: QRect(*rect) for name, rect in index['rects'].items()}
+        return cls(index['size'], image, rects)
+
+
+def load_or_build_atlas(size, unit_names=None):
+    """Return the atlas for size from the on-disk cache, building and caching it if needed."""
+    unit_names = unit_names if unit_names is not None else all_unit_names()
+    path = os.path.join(ATLAS_CACHE_DIR, f"cameos_{size}_{atlas_cache_key(unit_names, size)}.atlas")
+    with _registry_lock:
+        _atlas_paths[size] = path
+    atlas = CameoAtlas.load(path) if os.path.exists(path) else None
+    if atlas is not None:
+        logging.debug(f"Loaded cameo atlas {path}")
+        return atlas
+
+    atlas = CameoAtlas.build(unit_names, size)
+    try:
+        atlas.save(path)
+        logging.info(f"Built cameo atlas {path}")
+    except OSError as e:
+        logging.warning(f"Could not cache cameo atlas {path}: {e}")
+    return atlas
+
+
+class AtlasTask(QRunnable):
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+
+    def run(self):
+        get_atlas(self.size)
+
+
+_atlases = {}  # size -> CameoAtlas
+_atlas_locks = {}  # size -> lock held while that atlas is being loaded or built
+_atlas_paths = {}  # size -> cache file of the current cameos
+_wanted_sizes = {}  # key -> configured size, one per unit window type; other sizes are evicted
+_registry_lock = threading.Lock()
+
+
+def get_atlas(size):
+    """Return the cameo atlas for size, loading or building it on first use (from any thread)."""
+    with _registry_lock:
+        atlas = _atlases.get(size)
+        if atlas is not None:
+            return atlas
+        size_lock = _atlas_locks.setdefault(size, threading.Lock())
+
+    with size_lock:  # Waits for a worker that is already building this size
+        atlas = _atlases.get(size)
+        if atlas is None:
+            atlas = load_or_build_atlas(size)
+            with _registry_lock:
+                _atlases[size] = atlas
+    return atlas
+
+
+def peek_atlas(size):
+    """Return the atlas for size if it is already loaded, without loading or building it."""
+    with _registry_lock:
+        return _atlases.get(size)
+
+
+def nearest_atlas(size):
+    """Return the loaded atlas closest in size, or None if none is loaded yet."""
+    with _registry_lock:
+        if not _atlases:
+            return None
+        return _atlases[min(_atlases, key=lambda loaded_size: abs(loaded_size - size))]
+
+
+def preload_atlases(sizes):
+    """Load or build the atlases of sizes, a dict of key -> size, on worker threads.
+
+    These are the configured sizes; cache files of any other size are deleted
+    once the atlases are loaded.
+    """
+    with _registry_lock:
+        _wanted_sizes.update(sizes)
+    pool = QThreadPool.globalInstance()
+    for size in dict.fromkeys(sizes.values()):
+        pool.start(AtlasTask(size))
+    pool.start(PruneTask())
+
+
+def set_wanted_atlas_size(key, size):
+    """Record that key, e.g. a unit window type, now uses atlases of size."""
+    with _registry_lock:
+        _wanted_sizes[key] = size
+
+
+def evict_unwanted_atlases(keep=()):
+    """Drop the atlases of sizes no longer configured, in memory and on disk.
+
+    Sizes in keep, e.g. atlases still being built, are left alone. Counters
+    that still draw an evicted atlas keep it alive until they swap.
+    """
+    with _registry_lock:
+        wanted = set(_wanted_sizes.values()) | set(keep)
+        for size in [size for size in _atlases if size not in wanted]:
+            del _atlases[size]
+            _atlas_locks.pop(size, None)
+            logging.debug(f"Evicted the {size} px cameo atlas")
+    prune_atlas_files()
+
+
+def prune_atlas_files():
+    """Delete every cached atlas except the current file of each configured size.
+
+    Files of a configured size whose current file is not known yet are kept.
+    """
+    with _registry_lock:
+        wanted = set(_wanted_sizes.values())
+        keep = {os.path.basename(path) for size, path in _atlas_paths.items() if size in wanted}
+        unknown = wanted - set(_atlas_paths)
+    try:
+        file_names = os.listdir(ATLAS_CACHE_DIR)
+    except OSError:
+        return
+    for file_name in file_names:
+        if not (file_name.startswith('cameos_') and file_name.endswith('.atlas')) or file_name in keep:
+            continue
+        try:
+            size = int(file_name.split('_')[1])
+        except (IndexError, ValueError):
+            continue
+        if size in unknown:
+            continue
+        try:
+            os.remove(os.path.join(ATLAS_CACHE_DIR, file_name))
+            logging.debug(f"Deleted stale cameo atlas {file_name}")
+        except OSError as e:
+            logging.warning(f"Could not delete stale cameo atlas {file_name}: {e}")
+
+
+class PruneTask(QRunnable):
+    def run(self):
+        # Queued after the atlas tasks; wait for them so their current files are known
+        with _registry_lock:
+            sizes = set(_wanted_sizes.values())
+        for size in sizes:
+            get_atlas(size)
+        prune_atlas_files()
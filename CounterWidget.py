@@ -1,65 +1,104 @@
 #CounterWidget.py
 
-from PySide6.QtGui import QColor, QPixmap, QPainter, QPen, QFontDatabase, QFont, QFontMetrics
+from PySide6.QtGui import QPainter, QFontMetrics
 from PySide6.QtWidgets import QLabel, QSizePolicy
 from PySide6.QtCore import Qt
 
+from AssetLoader import get_asset_loader
+from CameoAtlas import get_atlas, nearest_atlas, peek_atlas
+from Theme import to_qcolor, frame_pen, number_font
+from common import name_to_path
+
 class CounterWidgetBase(QLabel):
     def __init__(self, color=Qt.red, size=100, parent=None):
         super().__init__(parent)
-        self.color = self._convert_to_qcolor(color)
+        self.color = to_qcolor(color)
         self.size = size
+        self.count = 0
+        self.frame_pen = frame_pen(self.color, int(self.size / 15))
         self.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
         self.setAttribute(Qt.WA_TranslucentBackground)
 
     def update_size(self, new_size):
         self.size = new_size
+        self.frame_pen = frame_pen(self.color, int(self.size / 15))
         self.repaint()
 
     def update_color(self, new_color):
-        self.color = self._convert_to_qcolor(new_color)
+        self.color = to_qcolor(new_color)
+        self.frame_pen = frame_pen(self.color, int(self.size / 15))
         self.repaint()
 
     def update_count(self, new_count):
+        if new_count == self.count:
+            return
         self.count = new_count
-        self.repaint()
-
-    def _convert_to_qcolor(self, color):
-        if isinstance(color, QColor):
-            return color
-        elif isinstance(color, tuple) and len(color) == 3:
-            return QColor(*color)
-        elif isinstance(color, str):
-            if color.startswith('#'):
-                return QColor(color)
-            return QColor(color)
-        else:
-            return QColor(Qt.red)  # Default color
+        self.update()
 
     def update_show_frame(self, show_frame):
         self.show_frame = show_frame
         self.repaint()
 
+    def load_cameo(self):
+        """Look up the unit's cameo in the shared atlas of the current size and resize to it.
+
+        If that atlas is not loaded yet (the size is being changed), the nearest
+        loaded atlas is stretched as a preview until refresh_cameo() is called.
+        """
+        atlas = peek_atlas(self.size)
+        self.preview = atlas is None
+        if atlas is None:
+            atlas = nearest_atlas(self.size) or get_atlas(self.size)
+            self.preview = atlas.size != self.size
+        self.atlas = atlas
+        self.source_rect = atlas.source_rect(self.unit_name)
+        if self.source_rect is not None:
+            self.cameo_pixmap = None
+            size = self.source_rect.size()
+        else:
+            # Not in the atlas (missing file), load it on its own
+            self.cameo_pixmap = get_asset_loader().pixmap(name_to_path(self.unit_name), self.size)
+            size = self.cameo_pixmap.size()
+            self.preview = False
+        if self.preview:
+            size = size.scaled(self.size, self.size, Qt.KeepAspectRatio)
+        self.setFixedSize(size)
+
+    def refresh_cameo(self):
+        """Swap a preview for the properly scaled cameo once its atlas is loaded."""
+        if self.preview and peek_atlas(self.size) is not None:
+            self.load_cameo()
+            self.update()
+
+    def draw_cameo(self, painter):
+        # Without SmoothPixmapTransform a stretched preview is drawn nearest-neighbour, which is cheap
+        if self.source_rect is not None:
+            painter.drawPixmap(self.rect(), self.atlas.pixmap, self.source_rect)
+        else:
+            painter.drawPixmap(0, 0, self.cameo_pixmap)
+
+    def set_unit(self, unit_name):
+        """Show another unit's cameo."""
+        self.unit_name = unit_name
+        self.update_image_size()
+        self.update()
+
 class CounterWidgetImageOnly(CounterWidgetBase):
-    def __init__(self, image_path, color=Qt.red, size=100, show_frame=True, parent=None):
+    def __init__(self, unit_name, color=Qt.red, size=100, show_frame=True, parent=None):
         super().__init__(color=color, size=size, parent=parent)
-        self.image_path = image_path
+        self.unit_name = unit_name
         self.show_frame = show_frame
         self.update_image_size()
 
     def update_image_size(self):
-        pixmap = QPixmap(self.image_path)
-        self.scaled_pixmap = pixmap.scaled(self.size, self.size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.setFixedSize(self.scaled_pixmap.size())
+        self.load_cameo()
 
     def paintEvent(self, event):
         painter = QPainter(self)
-        painter.drawPixmap(0, 0, self.scaled_pixmap)
+        self.draw_cameo(painter)
         if self.show_frame:
-            pen = QPen(self.color)
-            pen.setWidth(int(self.size / 15))
-            painter.setPen(pen)
-            painter.drawRoundedRect(0, 0, self.scaled_pixmap.width(), self.scaled_pixmap.height(), 10, 10)
+            painter.setPen(self.frame_pen)
+            painter.drawRoundedRect(0, 0, self.width(), self.height(), 10, 10)
 
 
     def update_size(self, new_size):
@@ -76,13 +115,7 @@ class CounterWidgetNumberOnly(CounterWidgetBase):
         self.update_size(size)
 
     def compute_fixed_width(self):
-        font_size = self.size
-        font_id = QFontDatabase.addApplicationFont("Other/Futured.ttf")
-        font_family = QFontDatabase.applicationFontFamilies(font_id)
-        if font_family:
-            self.number_font = QFont(font_family[0], font_size, QFont.Bold)
-        else:
-            self.number_font = QFont("Arial", font_size, QFont.Bold)
+        self.number_font = number_font(self.size)
         fm = QFontMetrics(self.number_font)
         max_number = '8' * self.max_digits
         self.fixed_width = fm.horizontalAdvance(max_number)
@@ -93,8 +126,6 @@ class CounterWidgetNumberOnly(CounterWidgetBase):
         painter.setFont(self.number_font)
         fm = painter.fontMetrics()
         text_width = fm.horizontalAdvance(str(self.count))
-        text_height = fm.height()
-        self.setFixedSize(self.fixed_width, self.fixed_height)
         text_x = (self.fixed_width - text_width) / 2
         text_y = self.fixed_height - fm.descent()
         painter.setPen(Qt.black)
@@ -109,34 +140,27 @@ class CounterWidgetNumberOnly(CounterWidgetBase):
     def update_size(self, new_size):
         super().update_size(new_size)
         self.compute_fixed_width()
+        self.setFixedSize(self.fixed_width, self.fixed_height)
 
 
 
 
 class CounterWidgetImagesAndNumber(CounterWidgetBase):
-    def __init__(self, count, image_path, color=Qt.red, size=100, show_frame=True, parent=None):
+    def __init__(self, count, unit_name, color=Qt.red, size=100, show_frame=True, parent=None):
         super().__init__(color=color, size=size, parent=parent)
         self.count = count
-        self.image_path = image_path
+        self.unit_name = unit_name
         self.show_frame = show_frame
         self.update_image_size()
 
     def update_image_size(self):
-        pixmap = QPixmap(self.image_path)
-        self.scaled_pixmap = pixmap.scaled(self.size, self.size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.setFixedSize(self.scaled_pixmap.size())
+        self.load_cameo()
+        self.number_font = number_font(int(self.size / 3))
 
     def paintEvent(self, event):
         painter = QPainter(self)
-        painter.drawPixmap(0, 0, self.scaled_pixmap)
-        font_size = int(self.size / 3)
-        font_id = QFontDatabase.addApplicationFont("Other/Futured.ttf")
-        font_family = QFontDatabase.applicationFontFamilies(font_id)
-        if font_family:
-            number_font = QFont(font_family[0], font_size, QFont.Bold)
-        else:
-            number_font = QFont("Arial", font_size, QFont.Bold)
-        painter.setFont(number_font)
+        self.draw_cameo(painter)
+        painter.setFont(self.number_font)
         padding_x = max(5, int(self.size * 0.05))
         padding_y = max(5, int(self.size * 0.05))
         text_x = padding_x
@@ -150,10 +174,8 @@ class CounterWidgetImagesAndNumber(CounterWidgetBase):
         painter.setPen(Qt.white)
         painter.drawText(text_x, text_y, str(self.count))
         if self.show_frame:
-            pen = QPen(self.color)
-            pen.setWidth(int(self.size / 15))
-            painter.setPen(pen)
-            painter.drawRoundedRect(0, 0, self.scaled_pixmap.width(), self.scaled_pixmap.height(), 10, 10)
+            painter.setPen(self.frame_pen)
+            painter.drawRoundedRect(0, 0, self.width(), self.height(), 10, 10)
 
 
 
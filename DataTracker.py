@@ -5,7 +5,8 @@ from PySide6.QtGui import QPixmap, QFont, QFontDatabase, QColor
 from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout
 
 # Import the new widget classes
-from DataWidget import MoneyWidget, PowerWidget, NameWidget, FlagWidget
+from DataWidget import MoneyWidget, PowerWidget, NameWidget, FlagWidget, IncomeWidget, ArmyValueWidget
+from Theme import number_font
 
 faction_to_flag = {
     "British": "RA2_Flag_Britain.png",
@@ -20,26 +21,27 @@ faction_to_flag = {
     "YuriCountry": "RA2_Yuricountry.png"
 }
 
+# The show_* setting of each window in ResourceWindow.windows, in the same order
+VISIBILITY_SETTINGS = ('show_name', 'show_money', 'show_power', 'show_flag', 'show_income', 'show_army_value')
+
 class ResourceWindow(QMainWindow):
-    def __init__(self, player, player_count, hud_positions, player_index):
+    def __init__(self, player, player_count, hud_positions, player_index, visible=True):
         super().__init__()
         self.player = player
         self.hud_positions = hud_positions
 
-        # Load sizes from hud_positions
-        name_widget_size = self.hud_positions.get('name_widget_size', 50)
-        money_widget_size = self.hud_positions.get('money_widget_size', 50)
-        power_widget_size = self.hud_positions.get('power_widget_size', 50)
-        flag_widget_size = self.hud_positions.get('flag_widget_size', 50)  # New line
+        self.in_use = False  # False while idle in the HUD pool or not shown yet
 
+        # Load sizes from hud_positions
+        name_widget_size = self.hud_positions.name_widget_size
+        money_widget_size = self.hud_positions.money_widget_size
+        power_widget_size = self.hud_positions.power_widget_size
+        flag_widget_size = self.hud_positions.flag_widget_size
+        income_widget_size = self.hud_positions.income_widget_size
+        army_value_widget_size = self.hud_positions.army_value_widget_size
 
         # Load fonts
-        font_id = QFontDatabase.addApplicationFont("Other/Futured.ttf")
-        font_family = QFontDatabase.applicationFontFamilies(font_id)
-        if font_family:
-            money_font = QFont(font_family[0], 18, QFont.Bold)
-        else:
-            money_font = QFont("Arial", 18, QFont.Bold)
+        money_font = number_font(18)
 
         power_font = QFont("Impact", 18, QFont.Bold)
         username_font = QFont("Roboto", 16, QFont.Bold)
@@ -48,24 +50,21 @@ class ResourceWindow(QMainWindow):
         self.name_widget = NameWidget(
             data=self.player.username.value,
             image_path=None,  # Remove the image from the name widget
-            text_color=player.color,
+            text_color=player.theme.color,
             size=name_widget_size,
             font=username_font
         )
 
         self.flag_widget = FlagWidget(
-            image_path="Flags/PNG/" + faction_to_flag[player.country_name.value.decode('utf-8')],
+            image_path=self.get_flag_path(player),
             size=flag_widget_size
         )
 
         # Determine the money color
-        money_color_option = self.hud_positions.get('money_color', 'Use player color')
-        if money_color_option == 'Use player color':
-            money_text_color = player.color
-        elif money_color_option == 'White':
-            money_text_color = Qt.white
+        if self.hud_positions.money_uses_player_color:
+            money_text_color = player.theme.color
         else:
-            money_text_color = Qt.white  # Default to white if option unrecognized
+            money_text_color = Qt.white
 
         self.money_widget = MoneyWidget(
             data=self.player.balance,
@@ -83,43 +82,54 @@ class ResourceWindow(QMainWindow):
             font=power_font
         )
 
+        self.income_widget = IncomeWidget(
+            data=self.economy_value('income_per_minute'),
+            text_color=player.theme.color,
+            size=income_widget_size,
+            font=number_font(18)
+        )
+
+        self.army_value_widget = ArmyValueWidget(
+            data=self.economy_value('army_value'),
+            text_color=player.theme.color,
+            size=army_value_widget_size,
+            font=number_font(18)
+        )
+
         # Create windows for each widget
         self.name_window = self.create_window_with_widget(
             f"Player {player_index} Name", self.name_widget, player_count, 'name', self.player.color_name
         )
-        if self.hud_positions['show_name']:
-            self.name_window.show()
-        else:
-            self.name_window.hide()
 
         self.flag_window = self.create_window_with_widget(
             f"Player {player_index} Flag", self.flag_widget, player_count, 'flag', self.player.color_name
         )
-        if self.hud_positions.get('show_flag', True):
-            self.flag_window.show()
-        else:
-            self.flag_window.hide()
 
         self.money_window = self.create_window_with_widget(
             f"Player {player_index} Money", self.money_widget, player_count, 'money', self.player.color_name)
-        if self.hud_positions['show_money']:
-            self.money_window.show()
-        else:
-            self.money_window.hide()
 
         self.power_window = self.create_window_with_widget(
             f"Player {player_index} Power", self.power_widget, player_count, 'power', self.player.color_name)
-        if self.hud_positions['show_power']:
-            self.power_window.show()
-        else:
-            self.power_window.hide()
+
+        self.income_window = self.create_window_with_widget(
+            f"Player {player_index} Income", self.income_widget, player_count, 'income', self.player.color_name)
+
+        self.army_value_window = self.create_window_with_widget(
+            f"Player {player_index} Army Value", self.army_value_widget, player_count, 'army_value',
+            self.player.color_name)
 
         self.windows = [
             self.name_window,
             self.money_window,
             self.power_window,
-            self.flag_window  # Add the flag window
+            self.flag_window,  # Add the flag window
+            self.income_window,
+            self.army_value_window
         ]
+        self.hud_positions.signals.changed.connect(self.on_setting_changed)
+        # A HUD prebuilt during the loading screen stays hidden until apply_visibility()
+        if visible:
+            self.apply_visibility()
 
     def create_window_with_widget(self, title, widget, player_count, hud_type, player_color):
         """Create a new window for a given widget with a specified title."""
@@ -155,48 +165,78 @@ class ResourceWindow(QMainWindow):
         window.mousePressEvent = mouse_press_event
         window.mouseMoveEvent = mouse_move_event
 
-        window.show()  # Show the window immediately
         return window
 
+    @staticmethod
+    def get_flag_path(player):
+        return "Flags/PNG/" + faction_to_flag[player.country_name.value.decode('utf-8')]
+
+    def rebind(self, player):
+        """Reuse this HUD for another player with the same color, e.g. in the next match."""
+        self.player = player
+        self.name_widget.update_color(new_text_color=player.theme.color)
+        self.name_widget.set_data(player.username.value)
+        self.flag_widget.set_image_path(self.get_flag_path(player))
+        self.update_money_widget_color()
+        self.money_widget.set_data(player.balance)
+        self.power_widget.set_data(player.power)
+        self.power_widget.set_low_power(player.power < 0, player.theme)
+        self.income_widget.update_color(new_text_color=player.theme.color)
+        self.income_widget.set_data(self.economy_value('income_per_minute'))
+        self.army_value_widget.update_color(new_text_color=player.theme.color)
+        self.army_value_widget.set_data(self.economy_value('army_value'))
+
+    def apply_visibility(self):
+        """Show or hide each window according to the current show_* settings."""
+        self.in_use = True
+        for window, setting in zip(self.windows, VISIBILITY_SETTINGS):
+            window.setVisible(getattr(self.hud_positions, setting))
+
+    def hide_windows(self):
+        self.in_use = False
+        for window in self.windows:
+            window.hide()
+
+    def on_setting_changed(self, name, value):
+        """Follow the HUD settings. Idle windows are resized too, but stay hidden."""
+        if name in VISIBILITY_SETTINGS:
+            if self.in_use:
+                self.apply_visibility()
+        elif name == 'name_widget_size':
+            self.name_widget.update_data_size(value)
+        elif name == 'money_widget_size':
+            self.money_widget.update_data_size(value)
+        elif name == 'power_widget_size':
+            self.power_widget.update_data_size(value)
+        elif name == 'flag_widget_size':
+            self.flag_widget.update_data_size(value)
+        elif name == 'income_widget_size':
+            self.income_widget.update_data_size(value)
+        elif name == 'army_value_widget_size':
+            self.army_value_widget.update_data_size(value)
+        elif name == 'money_color':
+            self.update_money_widget_color()
+
     def update_labels(self):
         """Update the money and power values."""
         self.money_widget.update_data(self.player.balance)
         self.power_widget.update_data(self.player.power)
-        if self.player.power < 0:
-            self.power_widget.update_color(new_image_color=Qt.red, new_text_color=Qt.red)
-        else:
-            self.power_widget.update_color(new_image_color=Qt.green, new_text_color=Qt.green)
-
-    def get_default_position(self, player_color, hud_type, player_count, hud_positions):
-        player_color_str = player_color  # Use player's color as the key
+        self.power_widget.set_low_power(self.player.power < 0, self.player.theme)
+        if self.player.economy is not None:
+            self.income_widget.update_data(self.player.economy.income_per_minute)
+            self.army_value_widget.update_data(self.player.economy.army_value)
 
-        # Ensure the player's color section exists in hud_positions
-        if player_color_str not in self.hud_positions:
-            self.hud_positions[player_color_str] = {}
+    def economy_value(self, name):
+        """A statistic of the player's economy, 0 before the first tick."""
+        economy = self.player.economy
+        return getattr(economy, name) if economy is not None else 0
 
-        # Check if hud_type exists for the player, if not, create default position for it
-        if hud_type not in self.hud_positions[player_color_str]:
-            # Set default x and y positions
-            default_position = {"x": 100, "y": 100}
-            self.hud_positions[player_color_str][hud_type] = default_position
-        else:
-            default_position = self.hud_positions[player_color_str][hud_type]
-
-        # Ensure the position values are integers
-        default_position['x'] = int(default_position['x'])
-        default_position['y'] = int(default_position['y'])
-
-        return default_position
+    def get_default_position(self, player_color, hud_type, player_count, hud_positions):
+        # Positions are kept per player color
+        return self.hud_positions.position(player_color, hud_type)
 
     def update_hud_position(self, player_color, hud_type, x, y, player_count, hud_positions):
-        player_color_str = player_color  # Use player's color as the key
-
-        # Ensure the player's color section exists in hud_positions
-        if player_color_str not in self.hud_positions:
-            self.hud_positions[player_color_str] = {}
-
-        # Update the HUD position for this player and type
-        self.hud_positions[player_color_str][hud_type] = {"x": x, "y": y}
+        self.hud_positions.set_position(player_color, hud_type, x, y)
 
     def update_all_data_size(self, new_size):
         """Resize all DataWidgets in this ResourceWindow."""
@@ -206,21 +246,14 @@ class ResourceWindow(QMainWindow):
 
     def update_money_widget_color(self):
         """Update the color of the money widget based on the current setting."""
-        money_color_option = self.hud_positions.get('money_color', 'Use player color').strip().lower()
-        logging.debug(f"money_color_option: '{money_color_option}'")
-        if money_color_option == 'use player color':
-            money_text_color = self.player.color  # Use self.player.color directly
-        elif money_color_option == 'white':
-            money_text_color = QColor(Qt.white)
+        if self.hud_positions.money_uses_player_color:
+            money_palette = self.player.theme.text_palette
         else:
-            money_text_color = QColor(Qt.white)  # Default to white if option unrecognized
+            money_palette = self.player.theme.white_palette
 
         logging.debug(
-            f"money_text_color being set to: {money_text_color.name()} for player {self.player.username.value}")
-        self.money_widget.update_color(new_text_color=money_text_color)
-        logging.debug(f"money_color_option: '{money_color_option}'")
-        logging.debug(
-            f"money_text_color being set to: {money_text_color.name()} for player {self.player.username.value}")
+            f"money color set to: {money_palette.windowText().color().name()} for player {self.player.username.value}")
+        self.money_widget.set_text_palette(money_palette)
 
 
 
@@ -1,9 +1,13 @@
 import logging
 
-from PySide6.QtCore import Qt, QPropertyAnimation
+from PySide6.QtCore import Qt
 from PySide6.QtGui import QPixmap, QColor, QPainter, QFont, QFontMetrics
 from PySide6.QtWidgets import QWidget, QLabel, QHBoxLayout
 
+from AnimationManager import get_animation_manager
+from AssetLoader import get_asset_loader
+from Theme import text_palette, to_qcolor
+
 class BaseDataWidget(QWidget):
     def __init__(self, data=None, text_color=Qt.black, size=16, font=None, use_fixed_width=False, max_digits=8, parent=None):
         super().__init__(parent)
@@ -15,10 +19,11 @@ class BaseDataWidget(QWidget):
         self.max_digits = max_digits
 
         # Create QLabel for the data (text or number)
-        self.data_label = QLabel(str(self.value), self)
+        self.data_label = QLabel(self.format_value(self.value), self)
         if self.use_fixed_width:
             self.data_label.setAlignment(Qt.AlignCenter)  # Center the text
-        self.data_label.setStyleSheet(f"color: {QColor(self.text_color).name()}; margin-top: -2px;")  # Adjust text position
+        self.data_label.setContentsMargins(0, -2, 0, 0)  # Adjust text position; no style sheet, the palette sets the color
+        self.data_label.setPalette(text_palette(self.text_color))
 
         # Apply the custom font or dynamically adjust the font size
         self.update_font_size()
@@ -76,44 +81,64 @@ class BaseDataWidget(QWidget):
 
         self.setFixedSize(total_width, self.data_label.height())
 
+    def format_value(self, value):
+        return str(int(value))  # Display integer for a clean update
+
     def on_value_changed(self, value):
+        """Show an (intermediate) value. Only relayout when the new text no longer fits."""
         self.value = value
-        self.data_label.setText(str(int(value)))  # Display integer for a clean update
-        self.data_label.adjustSize()
-        self.adjust_size()
+        text = self.format_value(value)
+        if text == self.data_label.text():
+            return
+        self.data_label.setText(text)
+        if not self.use_fixed_width and self.data_label.sizeHint().width() != self.data_label.width():
+            self.data_label.adjustSize()
+            self.adjust_size()
 
     def update_color(self, new_text_color=None):
-        """Update the color of the text."""
+        """Update the color of the text by switching to its prebuilt palette."""
         if new_text_color is not None:
-            self.text_color = QColor(new_text_color)
-            logging.debug(f"update_color called with new_text_color: {self.text_color.name()}")
-            self.data_label.setStyleSheet(f"color: {self.text_color.name()}; margin-top: -2px;")
-            self.data_label.adjustSize()
-            self.adjust_size()
+            self.text_color = to_qcolor(new_text_color)
+            self.set_text_palette(text_palette(self.text_color))
+
+    def set_text_palette(self, palette):
+        if self.data_label.palette() != palette:
+            self.data_label.setPalette(palette)
 
     def update_data(self, new_data):
-        """Smoothly update the data using QPropertyAnimation."""
-        self.animation = QPropertyAnimation(self, b"value")
-        self.animation.setDuration(500)
-        self.animation.setStartValue(self.value)
-        self.animation.setEndValue(new_data)
-        self.animation.valueChanged.connect(self.on_value_changed)
-        self.animation.start()
+        """Smoothly update the data using the shared animation manager."""
+        get_animation_manager().animate(self, new_data)
+
+    def set_data(self, new_data):
+        """Show new_data immediately, cancelling any running animation."""
+        get_animation_manager().stop(self)
+        self.on_value_changed(new_data)
 
 
 class MoneyWidget(BaseDataWidget):
     def __init__(self, data=None, text_color=Qt.white, size=16, font=None, parent=None):
         super().__init__(data=data, text_color=text_color, size=size, font=font, use_fixed_width=True, max_digits=8, parent=parent)
-        self.update_data_label()
 
-    def on_value_changed(self, value):
-        self.value = value
-        self.update_data_label()
-        self.data_label.adjustSize()
-        self.adjust_size()
+    def format_value(self, value):
+        return f"${int(value)}"
+
+
+class IncomeWidget(BaseDataWidget):
+    """Income per minute over the last STATS_WINDOW seconds."""
+    def __init__(self, data=None, text_color=Qt.white, size=16, font=None, parent=None):
+        super().__init__(data=data, text_color=text_color, size=size, font=font, use_fixed_width=False, parent=parent)
+
+    def format_value(self, value):
+        return f"+${int(value)}/m"
+
+
+class ArmyValueWidget(BaseDataWidget):
+    """Build cost of all units the player has."""
+    def __init__(self, data=None, text_color=Qt.white, size=16, font=None, parent=None):
+        super().__init__(data=data, text_color=text_color, size=size, font=font, use_fixed_width=False, parent=parent)
 
-    def update_data_label(self):
-        self.data_label.setText(f"${int(self.value)}")
+    def format_value(self, value):
+        return f"Army ${int(value)}"
 
 
 class PowerWidget(BaseDataWidget):
@@ -121,6 +146,8 @@ class PowerWidget(BaseDataWidget):
         super().__init__(data=data, text_color=text_color, size=size, font=font, use_fixed_width=False, parent=parent)
         self.image_path = image_path
         self.image_color = image_color
+        self.low_power = False
+        self.colored_pixmaps = {}  # rgba -> tinted icon at the current size
 
         # Load and set the image
         self.icon_label = QLabel(self)
@@ -138,22 +165,27 @@ class PowerWidget(BaseDataWidget):
         self.adjust_size()
 
     def load_and_set_image(self):
-        pixmap = QPixmap(self.image_path).scaled(self.size, self.size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        # Apply the image color
-        colored_pixmap = QPixmap(pixmap.size())
-        colored_pixmap.fill(Qt.transparent)
-        painter = QPainter(colored_pixmap)
-        painter.setCompositionMode(QPainter.CompositionMode_Source)
-        painter.drawPixmap(0, 0, pixmap)
-        painter.setCompositionMode(QPainter.CompositionMode_SourceIn)
-        painter.fillRect(colored_pixmap.rect(), QColor(self.image_color))
-        painter.end()
+        color = to_qcolor(self.image_color)
+        colored_pixmap = self.colored_pixmaps.get(color.rgba())
+        if colored_pixmap is None:
+            pixmap = get_asset_loader().pixmap(self.image_path, self.size)
+            # Apply the image color
+            colored_pixmap = QPixmap(pixmap.size())
+            colored_pixmap.fill(Qt.transparent)
+            painter = QPainter(colored_pixmap)
+            painter.setCompositionMode(QPainter.CompositionMode_Source)
+            painter.drawPixmap(0, 0, pixmap)
+            painter.setCompositionMode(QPainter.CompositionMode_SourceIn)
+            painter.fillRect(colored_pixmap.rect(), color)
+            painter.end()
+            self.colored_pixmaps[color.rgba()] = colored_pixmap
         self.icon_label.setPixmap(colored_pixmap)
         self.icon_label.setFixedSize(colored_pixmap.size())
 
     def update_data_size(self, new_size):
         """Adjust the text size and image size."""
         self.size = new_size
+        self.colored_pixmaps.clear()
         self.load_and_set_image()
         self.update_font_size()
         self.adjust_size()
@@ -164,12 +196,6 @@ class PowerWidget(BaseDataWidget):
         total_height = max(self.icon_label.height(), self.data_label.height())
         self.setFixedSize(total_width, total_height)
 
-    def on_value_changed(self, value):
-        self.value = value
-        self.data_label.setText(str(int(value)))  # Display integer for a clean update
-        self.data_label.adjustSize()
-        self.adjust_size()
-
     def update_color(self, new_image_color=None, new_text_color=None):
         """Update the color of the image and the text."""
         # Update the image color if a new one is provided
@@ -180,6 +206,17 @@ class PowerWidget(BaseDataWidget):
         # Update the text color using the method from the base class
         super().update_color(new_text_color=new_text_color)
 
+    def set_low_power(self, low_power, theme):
+        """Switch between the green and red look of theme, only when the power state flips."""
+        if low_power == self.low_power:
+            return
+        self.low_power = low_power
+        palette = theme.low_power_palette if low_power else theme.power_palette
+        self.image_color = palette.windowText().color()
+        self.load_and_set_image()
+        self.text_color = self.image_color
+        self.set_text_palette(palette)
+
 
 
 
@@ -198,11 +235,14 @@ class NameWidget(BaseDataWidget):
 
         self.update_font_size()
 
+    def format_value(self, value):
+        return str(value)
+
 
 
 
     def load_and_set_image(self):
-        pixmap = QPixmap(self.image_path).scaled(self.size, self.size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        pixmap = get_asset_loader().pixmap(self.image_path, self.size)
         if self.image_color is not None:
             # Apply the image color
             colored_pixmap = QPixmap(pixmap.size())
@@ -248,12 +288,16 @@ class FlagWidget(QWidget):
         self.adjust_size()
 
     def load_and_set_image(self):
-        pixmap = QPixmap(self.image_path).scaled(
-            self.size, self.size, Qt.KeepAspectRatio, Qt.SmoothTransformation
-        )
+        pixmap = get_asset_loader().pixmap(self.image_path, self.size)
         self.icon_label.setPixmap(pixmap)
         self.icon_label.setFixedSize(pixmap.size())
 
+    def set_image_path(self, image_path):
+        if image_path != self.image_path:
+            self.image_path = image_path
+            self.load_and_set_image()
+            self.adjust_size()
+
     def update_data_size(self, new_size):
         """Adjust the image size."""
         self.size = new_size
@@ -0,0 +1,129 @@
+#EconomyStats.py
+from collections import deque
+
+from common import unit_costs
+
+STATS_WINDOW = 60  # Seconds of history the rates are averaged over
+UNIT_FIELDS = ('infantry_counts', 'tank_counts', 'aircraft_counts')
+
+
+class PlayerEconomy:
+    """Rolling economy statistics of one player, updated in O(1) per tick.
+
+    Every tick adds one sample to the window and every sample that falls out
+    of it is subtracted again, so the sums never need the history rescanned.
+    Income is what came in: the change of the balance plus what was spent in
+    the meantime, so it includes sold buildings and refunds. The power trend is the slope of a least squares line through
+    the power margin samples, kept as running sums as well. Army and building
+    values are adjusted by the count changes of each tick.
+    """
+
+    def __init__(self, window=STATS_WINDOW):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.samples = deque()  # (timestamp, seconds since the previous sample, income, spent, t, power)
+        self.origin = None  # First timestamp; regression times are relative to it to keep the sums small
+        self.last_timestamp = None
+        self.last_balance = 0
+        self.last_spent = 0
+        self.last_counts = {}  # field -> counts of the previous tick
+
+        # Running sums over the window
+        self.duration = 0.0
+        self.income_sum = 0
+        self.spent_sum = 0
+        self.t_sum = 0.0
+        self.tt_sum = 0.0
+        self.power_sum = 0.0
+        self.t_power_sum = 0.0
+
+        # Results, read by the HUD
+        self.income_per_minute = 0
+        self.spend_per_minute = 0
+        self.power_margin = 0
+        self.power_trend = 0.0  # Change of the power margin per minute
+        self.army_value = 0
+        self.building_value = 0
+
+    def update(self, timestamp, player):
+        """Add a tick. timestamp is in seconds, of game time if it is known."""
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            self.reset()  # The clock went back, e.g. it switched from wall time to game time
+        if self.last_timestamp is None:
+            self.origin = timestamp
+            elapsed = 0.0
+            income = spent = 0
+        else:
+            elapsed = max(0.0, timestamp - self.last_timestamp)
+            spent = max(0, player.spent_credit - self.last_spent)
+            # Sell proceeds and refunds count as income too: the balance does not say where
+            # credits came from. A drop that spending does not explain, e.g. a spy stealing
+            # money, counts as no income.
+            income = max(0, player.balance - self.last_balance + spent)
+        self.last_timestamp = timestamp
+        self.last_balance = player.balance
+        self.last_spent = player.spent_credit
+
+        t = timestamp - self.origin
+        power = player.power_output - player.power_drain
+        self.samples.append((timestamp, elapsed, income, spent, t, power))
+        self.add(elapsed, income, spent, t, power, 1)
+        while self.samples[0][0] < timestamp - self.window:
+            _, elapsed, income, spent, t, power = self.samples.popleft()
+            self.add(elapsed, income, spent, t, power, -1)
+
+        self.power_margin = power
+        if self.duration > 0:
+            self.income_per_minute = round(self.income_sum * 60 / self.duration)
+            self.spend_per_minute = round(self.spent_sum * 60 / self.duration)
+        count = len(self.samples)
+        denominator = count * self.tt_sum - self.t_sum * self.t_sum
+        if count > 1 and denominator > 1e-9:
+            self.power_trend = (count * self.t_power_sum - self.t_sum * self.power_sum) / denominator * 60
+
+        self.army_value += sum(self.value_change(field, getattr(player, field) or {}) for field in UNIT_FIELDS)
+        self.building_value += self.value_change('building_counts', player.building_counts or {})
+
+    def add(self, elapsed, income, spent, t, power, sign):
+        self.duration += sign * elapsed
+        self.income_sum += sign * income
+        self.spent_sum += sign * spent
+        self.t_sum += sign * t
+        self.tt_sum += sign * t * t
+        self.power_sum += sign * power
+        self.t_power_sum += sign * t * power
+
+    def value_change(self, field, counts):
+        """Credits gained or lost in field since the previous tick."""
+        last = self.last_counts.get(field, {})
+        change = 0
+        for unit_name, count in counts.items():
+            previous = last.get(unit_name, 0)
+            if count != previous:
+                change += (count - previous) * unit_costs.get(unit_name, 0)
+        for unit_name, previous in last.items():
+            if unit_name not in counts:
+                change -= previous * unit_costs.get(unit_name, 0)
+        self.last_counts[field] = counts
+        return change
+
+
+class EconomyStats:
+    """Keeps a PlayerEconomy per player and hands it to the player as player.economy."""
+
+    def __init__(self, window=STATS_WINDOW):
+        self.window = window
+        self.economies = {}  # player index -> PlayerEconomy
+
+    def update(self, players, timestamp):
+        for player in players:
+            economy = self.economies.get(player.index)
+            if economy is None:
+                economy = self.economies[player.index] = PlayerEconomy(self.window)
+            economy.update(timestamp, player)
+            player.economy = economy
+
+    def clear(self):
+        self.economies.clear()
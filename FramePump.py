@@ -0,0 +1,92 @@
+#FramePump.py
+import logging
+import threading
+import time
+
+from PySide6.QtCore import QObject, QTimer, Qt
+
+DEFAULT_FRAME_RATE = 30
+REPORT_INTERVAL = 60  # Seconds between frame statistics log lines
+
+
+class FramePump(QObject):
+    """Runs the HUD update on the GUI thread at a fixed frame rate.
+
+    The reader thread calls publish() after every tick. On each frame the pump
+    runs the update callback once if anything new was published since the last
+    frame, so a fast reader can never queue up GUI work. Ticks published between
+    two frames are counted as dropped.
+    """
+
+    def __init__(self, callback, frame_rate=DEFAULT_FRAME_RATE, parent=None):
+        super().__init__(parent)
+        self.callback = callback
+        self.lock = threading.Lock()
+        self.published = 0  # Ticks published by the reader
+        self.consumed = 0   # Last tick shown on screen
+
+        # Statistics
+        self.frames = 0
+        self.dropped_frames = 0
+        self.last_frame_ms = 0.0
+        self.max_frame_ms = 0.0
+        self.total_frame_ms = 0.0
+        self.last_report = time.monotonic()
+
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.on_frame)
+        self.set_frame_rate(frame_rate)
+
+    def set_frame_rate(self, frame_rate):
+        frame_rate = max(1, int(frame_rate))
+        self.timer.setInterval(max(1, round(1000 / frame_rate)))
+        logging.info(f"GUI frame rate set to {frame_rate} fps")
+
+    def start(self):
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def publish(self):
+        """Announce new data. Safe to call from any thread."""
+        with self.lock:
+            self.published += 1
+
+    def on_frame(self):
+        with self.lock:
+            published = self.published
+        if published == self.consumed:
+            return  # Nothing new since the last frame
+
+        self.dropped_frames += published - self.consumed - 1
+        self.consumed = published
+
+        start = time.perf_counter()
+        self.callback()
+        self.last_frame_ms = (time.perf_counter() - start) * 1000
+        self.max_frame_ms = max(self.max_frame_ms, self.last_frame_ms)
+        self.total_frame_ms += self.last_frame_ms
+        self.frames += 1
+
+        if time.monotonic() - self.last_report >= REPORT_INTERVAL:
+            self.report()
+
+    def stats(self):
+        """Return the frame statistics collected so far."""
+        return {
+            'frames': self.frames,
+            'dropped_frames': self.dropped_frames,
+            'last_frame_ms': self.last_frame_ms,
+            'max_frame_ms': self.max_frame_ms,
+            'average_frame_ms': self.total_frame_ms / self.frames if self.frames else 0.0,
+        }
+
+    def report(self):
+        stats = self.stats()
+        logging.debug(
+            f"GUI frames: {stats['frames']}, dropped: {stats['dropped_frames']}, "
+            f"frame time avg {stats['average_frame_ms']:.2f} ms, max {stats['max_frame_ms']:.2f} ms"
+        )
+        self.last_report = time.monotonic()
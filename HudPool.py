@@ -0,0 +1,73 @@
+#HudPool.py
+import logging
+
+
+def unit_windows_of(unit_window):
+    """Return the unit windows of a hud_windows entry, which holds either one window or a tuple."""
+    if not unit_window:
+        return ()
+    if isinstance(unit_window, tuple):
+        return unit_window
+    return (unit_window,)
+
+
+def take_idle(idle_windows, key):
+    """Remove and return the oldest idle entry under key, or None."""
+    entries = idle_windows.get(key)
+    if not entries:
+        return None
+    entry = entries.pop(0)
+    if not entries:
+        del idle_windows[key]
+    return entry
+
+
+class HudPool:
+    """Keeps the HUD windows of finished matches alive but hidden, keyed by color.
+
+    A match with a player of the same color gets the old windows back, rebound
+    to the new Player object, instead of rebuilding them with their fonts and
+    pixmaps. Windows stay where they were, since positions are per color too.
+    Acquired windows are handed out hidden; the caller shows them. Each key
+    holds a list, since players can share a color name, e.g. colors without a
+    name of their own all fall back to "white".
+    """
+
+    def __init__(self):
+        self.idle_resource_windows = {}  # color_name -> [ResourceWindow]
+        self.idle_unit_windows = {}  # (color_name, separate) -> [unit window or (images, numbers) tuple]
+
+    def acquire_resource_window(self, player, build):
+        resource_window = take_idle(self.idle_resource_windows, player.color_name)
+        if resource_window is None:
+            return build()
+        resource_window.rebind(player)
+        logging.debug(f"Reusing resource windows for color {player.color_name}")
+        return resource_window
+
+    def acquire_unit_window(self, player, separate, build):
+        unit_window = take_idle(self.idle_unit_windows, (player.color_name, separate))
+        if unit_window is None:
+            return build()
+        for uw in unit_windows_of(unit_window):
+            uw.rebind(player)
+        logging.debug(f"Reusing unit windows for color {player.color_name}")
+        return unit_window
+
+    def release_resource_window(self, resource_window):
+        resource_window.hide_windows()
+        self.idle_resource_windows.setdefault(resource_window.player.color_name, []).append(resource_window)
+
+    def release_unit_window(self, unit_window, color_name):
+        windows = unit_windows_of(unit_window)
+        if not windows:
+            return
+        for uw in windows:
+            uw.hide()
+        self.idle_unit_windows.setdefault((color_name, isinstance(unit_window, tuple)), []).append(unit_window)
+
+    def release(self, hud_windows):
+        """Hide every (unit_window, resource_window) pair and keep it for the next match."""
+        for unit_window, resource_window in hud_windows:
+            self.release_unit_window(unit_window, resource_window.player.color_name)
+            self.release_resource_window(resource_window)
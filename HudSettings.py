@@ -0,0 +1,140 @@
+#HudSettings.py
+import logging
+
+from PySide6.QtCore import QObject, Signal
+
+from FramePump import DEFAULT_FRAME_RATE
+
+UNIT_LAYOUTS = ('Vertical', 'Horizontal')
+MONEY_COLORS = ('Use player color', 'White')
+
+# name -> (type, default, allowed values or None)
+SETTINGS = {
+    'unit_counter_size': (int, 75, None),
+    'image_size': (int, 75, None),
+    'number_size': (int, 75, None),
+    'distance_between_numbers': (int, 0, None),
+    'show_name': (bool, True, None),
+    'show_money': (bool, True, None),
+    'show_power': (bool, True, None),
+    'show_flag': (bool, True, None),
+    'show_income': (bool, False, None),
+    'show_army_value': (bool, False, None),
+    'show_unit_frames': (bool, True, None),
+    'unit_layout': (str, 'Vertical', UNIT_LAYOUTS),
+    'money_color': (str, 'Use player color', MONEY_COLORS),
+    'flag_widget_size': (int, 50, None),
+    'name_widget_size': (int, 50, None),
+    'money_widget_size': (int, 50, None),
+    'power_widget_size': (int, 50, None),
+    'income_widget_size': (int, 50, None),
+    'army_value_widget_size': (int, 50, None),
+    'separate_unit_counters': (bool, False, None),
+    'gui_frame_rate': (int, DEFAULT_FRAME_RATE, None),
+    'record_matches': (bool, True, None),
+    'max_recordings': (int, 100, None),  # Oldest recordings beyond this are deleted, 0 keeps all
+    'game_path': (str, '', None),
+}
+
+
+def validate_setting(name, value):
+    """Return value converted to the type of setting name. Raises ValueError if it does not fit."""
+    setting_type, _, choices = SETTINGS[name]
+    if setting_type is bool:
+        if not isinstance(value, bool):
+            raise ValueError(f"{name} must be true or false, got {value!r}")
+    elif setting_type is int:
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError(f"{name} must be a number, got {value!r}")
+        value = int(value)
+        if value < 0:
+            raise ValueError(f"{name} must not be negative, got {value}")
+    else:
+        value = str(value).strip()
+    if choices is not None:
+        # Accept any capitalization, store the canonical spelling
+        match = [choice for choice in choices if choice.lower() == value.lower()]
+        if not match:
+            raise ValueError(f"{name} must be one of {choices}, got {value!r}")
+        value = match[0]
+    return value
+
+
+class SettingsSignals(QObject):
+    changed = Signal(str, object)  # Setting name, new value
+    position_changed = Signal(str, str)  # Color name, HUD type
+
+
+class HudSettings:
+    """The contents of hud_positions.json: typed settings plus per-color window positions.
+
+    Settings are validated once, when loaded or changed, and read as plain
+    attributes. set() emits signals.changed, so windows update themselves
+    instead of polling the dict. Keys this version does not know are kept
+    and written back unchanged.
+    """
+
+    __slots__ = tuple(SETTINGS) + ('positions', 'extra', 'signals', 'money_uses_player_color')
+
+    def __init__(self):
+        for name, (_, default, _) in SETTINGS.items():
+            setattr(self, name, default)
+        self.positions = {}  # color_name -> {hud_type: {"x": x, "y": y}}
+        self.extra = {}  # Unknown keys, preserved for round-tripping
+        self.signals = SettingsSignals()
+        self.update_derived()
+
+    @classmethod
+    def from_dict(cls, data):
+        settings = cls()
+        for key, value in data.items():
+            if key in SETTINGS:
+                try:
+                    setattr(settings, key, validate_setting(key, value))
+                except ValueError as e:
+                    logging.warning(f"Ignoring invalid setting in hud positions, using the default: {e}")
+            elif isinstance(value, dict):
+                settings.positions[key] = value
+            else:
+                settings.extra[key] = value
+        settings.update_derived()
+        return settings
+
+    def to_dict(self):
+        data = dict(self.extra)
+        for name in SETTINGS:
+            data[name] = getattr(self, name)
+        data.update(self.positions)
+        return data
+
+    def update_derived(self):
+        self.money_uses_player_color = self.money_color == 'Use player color'
+
+    def set(self, name, value):
+        """Change a setting and notify listeners. Returns whether the value changed."""
+        if name not in SETTINGS:
+            if self.extra.get(name) == value:
+                return False
+            self.extra[name] = value
+        else:
+            value = validate_setting(name, value)
+            if getattr(self, name) == value:
+                return False
+            setattr(self, name, value)
+            self.update_derived()
+        self.signals.changed.emit(name, value)
+        return True
+
+    def position(self, color_name, hud_type):
+        """Return the saved {"x", "y"} of a window, storing the default position if there is none."""
+        position = self.positions.setdefault(color_name, {}).setdefault(hud_type, {"x": 100, "y": 100})
+        position['x'] = int(position['x'])
+        position['y'] = int(position['y'])
+        return position
+
+    def set_position(self, color_name, hud_type, x, y):
+        positions = self.positions.setdefault(color_name, {})
+        if positions.get(hud_type) == {"x": x, "y": y}:
+            return
+        positions[hud_type] = {"x": x, "y": y}
+        self.signals.position_changed.emit(color_name, hud_type)
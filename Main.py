@@ -1,6 +1,8 @@
 #Main.py
 # Standard library imports
+import argparse
 import configparser
+import copy
 import ctypes
 import json
 import logging
@@ -19,149 +21,161 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import QObject, Signal, QThread, Qt
 
 # Local imports
-from DataTracker import ResourceWindow
+from AssetLoader import get_asset_loader
+from CameoAtlas import preload_atlases
+from DataTracker import ResourceWindow, faction_to_flag
+from FramePump import FramePump
+from HudPool import HudPool, unit_windows_of
+from HudSettings import HudSettings
+from MatchRecorder import MatchRecorder, RECORDING_EXTENSION, prune_recordings
+from PersistenceService import PersistenceService
+from Replay import ReplayThread, ReplayControls
+from SelectionIndex import get_selection_index
 from Player import (
     GameData, initialize_players_after_loading,
-    detect_if_all_players_are_loaded, ProcessExitedException
+    detect_if_all_players_are_loaded, load_offset_profile, ProcessExitedException
 )
 from UnitSelectionWindow import UnitSelectionWindow
 from UnitWindow import (UnitWindowWithImages, UnitWindowNumbersOnly, UnitWindowImagesOnly)
 from logging_config import setup_logging
 
-from common import (HUD_POSITION_FILE, players, hud_windows, selected_units_dict, data_lock, hud_positions,
+from common import (HUD_POSITION_FILE, UNIT_SELECTION_FILE, RECORDINGS_DIR, players, hud_windows, selected_units_dict, data_lock, hud_positions,
                     process_handle, control_panel, data_update_thread, names, name_to_path, game_path, admin)
 
 
+# HUD windows of finished matches, reused by the next match
+hud_pool = HudPool()
+
+# Seconds of loading to wait for the default offsets to check out before scanning the game
+PROFILE_SCAN_DELAY = 5
+
+
 # Load HUD positions from file if it exists, otherwise create defaults
 def load_hud_positions():
     global hud_positions
     if os.path.exists(HUD_POSITION_FILE):
         with open(HUD_POSITION_FILE, 'r') as file:
-            hud_positions = json.load(file)
+            hud_positions = HudSettings.from_dict(json.load(file))
     else:
-        hud_positions = {}
-
-    # Set default values if not present
-    hud_positions.setdefault('unit_counter_size', 75)
-    hud_positions.setdefault('image_size', 75)
-    hud_positions.setdefault('number_size', 75)
-    hud_positions.setdefault('distance_between_numbers', 0)
-    hud_positions.setdefault('show_name', True)
-    hud_positions.setdefault('show_money', True)
-    hud_positions.setdefault('show_power', True)
-    hud_positions.setdefault('unit_layout', 'Vertical')  # Default to Vertical layout
-    hud_positions.setdefault('money_color', 'Use player color')  # Default to player color
-    hud_positions.setdefault('show_flag', True)
-    hud_positions.setdefault('flag_widget_size', 50)
-    hud_positions.setdefault('show_unit_frames', True)
-    hud_positions.setdefault('name_widget_size', 50)
-    hud_positions.setdefault('money_widget_size', 50)
-    hud_positions.setdefault('power_widget_size', 50)
-    hud_positions.setdefault('separate_unit_counters', False)
-
-
-# Save HUD positions and settings to file
+        hud_positions = HudSettings()  # Defaults for every setting
+
+
+# Decode every image the HUD can show on worker threads, pre-scaled to the configured sizes.
+# Cameos go into one atlas per size, cached on disk.
+def preload_assets():
+    preload_atlases({'unit_counter_combined': hud_positions.unit_counter_size,
+                     'unit_counter_images': hud_positions.image_size})
+    asset_loader = get_asset_loader()
+    flag_paths = ["Flags/PNG/" + flag for flag in faction_to_flag.values()]
+    asset_loader.preload(flag_paths, (hud_positions.flag_widget_size,))
+    asset_loader.preload(['bolt.png'], (hud_positions.power_widget_size,))
+
+
+# Store the control panel values and HUD window positions in hud_positions.
+# The persistence service writes them to file once they stop changing.
 def save_hud_positions():
     global control_panel, hud_positions, hud_windows
 
     # Save HUD sizes from control panel spin boxes
     if control_panel:
         if control_panel.counter_size_spinbox:
-            hud_positions['unit_counter_size'] = control_panel.counter_size_spinbox.value()
+            hud_positions.set('unit_counter_size', control_panel.counter_size_spinbox.value())
 
         # Save new settings
-        hud_positions['image_size'] = control_panel.image_size_spinbox.value()
-        hud_positions['number_size'] = control_panel.number_size_spinbox.value()
-        hud_positions['distance_between_numbers'] = control_panel.distance_spinbox.value()
+        hud_positions.set('image_size', control_panel.image_size_spinbox.value())
+        hud_positions.set('number_size', control_panel.number_size_spinbox.value())
+        hud_positions.set('distance_between_numbers', control_panel.distance_spinbox.value())
 
         # Save individual widget sizes
         if control_panel.name_size_spinbox:
-            hud_positions['name_widget_size'] = control_panel.name_size_spinbox.value()
+            hud_positions.set('name_widget_size', control_panel.name_size_spinbox.value())
         if control_panel.money_size_spinbox:
-            hud_positions['money_widget_size'] = control_panel.money_size_spinbox.value()
+            hud_positions.set('money_widget_size', control_panel.money_size_spinbox.value())
         if control_panel.power_size_spinbox:
-            hud_positions['power_widget_size'] = control_panel.power_size_spinbox.value()
+            hud_positions.set('power_widget_size', control_panel.power_size_spinbox.value())
+        hud_positions.set('income_widget_size', control_panel.income_size_spinbox.value())
+        hud_positions.set('army_value_widget_size', control_panel.army_value_size_spinbox.value())
 
         # Save checkbox values
-        hud_positions['show_name'] = control_panel.name_checkbox.isChecked()
-        hud_positions['show_money'] = control_panel.money_checkbox.isChecked()
-        hud_positions['show_power'] = control_panel.power_checkbox.isChecked()
-        hud_positions['unit_layout'] = control_panel.layout_combo.currentText()
-        hud_positions['show_unit_frames'] = control_panel.unit_frame_checkbox.isChecked()
+        hud_positions.set('show_name', control_panel.name_checkbox.isChecked())
+        hud_positions.set('show_money', control_panel.money_checkbox.isChecked())
+        hud_positions.set('show_power', control_panel.power_checkbox.isChecked())
+        hud_positions.set('show_income', control_panel.income_checkbox.isChecked())
+        hud_positions.set('show_army_value', control_panel.army_value_checkbox.isChecked())
+        hud_positions.set('unit_layout', control_panel.layout_combo.currentText())
+        hud_positions.set('show_unit_frames', control_panel.unit_frame_checkbox.isChecked())
         # Save the selected color option
-        hud_positions['money_color'] = control_panel.color_combo.currentText()
-        hud_positions['separate_unit_counters'] = control_panel.separate_units_checkbox.isChecked()
+        hud_positions.set('money_color', control_panel.color_combo.currentText())
+        hud_positions.set('separate_unit_counters', control_panel.separate_units_checkbox.isChecked())
+        hud_positions.set('record_matches', control_panel.record_matches_checkbox.isChecked())
+        hud_positions.set('max_recordings', control_panel.max_recordings_spinbox.value())
 
     # Save the game path from the QLineEdit
     if control_panel.path_edit:
-        hud_positions['game_path'] = control_panel.path_edit.text()  # Save the game path
+        hud_positions.set('game_path', control_panel.path_edit.text())  # Save the game path
 
     # Save the positions of all HUD windows
     for unit_window, resource_window in hud_windows:
         player_id = resource_window.player.color_name
 
-        # Ensure the player's section exists in the hud_positions
-        if player_id not in hud_positions:
-            hud_positions[player_id] = {}
-
         # Save positions for each individual window (name, money, power)
         name_pos = resource_window.windows[0].pos()  # Name window
         money_pos = resource_window.windows[1].pos()  # Money window
         power_pos = resource_window.windows[2].pos()  # Power window
         flag_pos = resource_window.windows[3].pos()  # Flag window
+        income_pos = resource_window.windows[4].pos()  # Income window
+        army_value_pos = resource_window.windows[5].pos()  # Army value window
 
-        hud_positions[player_id]['flag'] = {"x": flag_pos.x(), "y": flag_pos.y()}
-        hud_positions[player_id]['name'] = {"x": name_pos.x(), "y": name_pos.y()}
-        hud_positions[player_id]['money'] = {"x": money_pos.x(), "y": money_pos.y()}
-        hud_positions[player_id]['power'] = {"x": power_pos.x(), "y": power_pos.y()}
+        hud_positions.set_position(player_id, 'flag', flag_pos.x(), flag_pos.y())
+        hud_positions.set_position(player_id, 'name', name_pos.x(), name_pos.y())
+        hud_positions.set_position(player_id, 'money', money_pos.x(), money_pos.y())
+        hud_positions.set_position(player_id, 'power', power_pos.x(), power_pos.y())
+        hud_positions.set_position(player_id, 'income', income_pos.x(), income_pos.y())
+        hud_positions.set_position(player_id, 'army_value', army_value_pos.x(), army_value_pos.y())
 
         # Save positions of unit windows based on mode
-        separate = hud_positions.get('separate_unit_counters', False)
+        separate = hud_positions.separate_unit_counters
         if separate:
             # Unit windows are separate
             unit_window_images, unit_window_numbers = unit_window
             unit_images_pos = unit_window_images.pos()
             unit_numbers_pos = unit_window_numbers.pos()
-            hud_positions[player_id]['unit_counter_images'] = {"x": unit_images_pos.x(), "y": unit_images_pos.y()}
-            hud_positions[player_id]['unit_counter_numbers'] = {"x": unit_numbers_pos.x(), "y": unit_numbers_pos.y()}
+            hud_positions.set_position(player_id, 'unit_counter_images', unit_images_pos.x(), unit_images_pos.y())
+            hud_positions.set_position(player_id, 'unit_counter_numbers', unit_numbers_pos.x(), unit_numbers_pos.y())
         else:
             # Unit window is combined
             unit_counter_pos = unit_window.pos()
-            hud_positions[player_id]['unit_counter_combined'] = {"x": unit_counter_pos.x(), "y": unit_counter_pos.y()}
-
-    # Write everything to the HUD position file
-    with open(HUD_POSITION_FILE, 'w') as file:
-        json.dump(hud_positions, file, indent=4)
+            hud_positions.set_position(player_id, 'unit_counter_combined', unit_counter_pos.x(), unit_counter_pos.y())
 
 
 def create_unit_windows_in_current_mode():
     global hud_windows
 
     # Create unit windows according to the current mode
-    separate = hud_positions.get('separate_unit_counters', False)
+    separate = hud_positions.separate_unit_counters
 
     for i, (unit_window, resource_window) in enumerate(hud_windows):
         player = resource_window.player
 
-        # Close existing unit_window if any
-        if unit_window:
-            if isinstance(unit_window, tuple):
-                for uw in unit_window:
-                    uw.close()
-            else:
-                unit_window.close()
+        # Keep existing unit windows for later reuse
+        hud_pool.release_unit_window(unit_window, player.color_name)
+
+        # Reuse or create unit windows based on mode
+        unit_window = hud_pool.acquire_unit_window(player, separate, lambda: build_unit_window(player, separate))
+        hud_windows[i] = (unit_window, resource_window)
 
-        # Create new unit windows based on mode
-        if separate:
-            unit_window_images = UnitWindowImagesOnly(player, hud_positions, selected_units_dict)
-            unit_window_images.setWindowTitle(f"Player {player.color_name} unit images window")
-            unit_window_numbers = UnitWindowNumbersOnly(player, hud_positions, selected_units_dict)
-            unit_window_numbers.setWindowTitle(f"Player {player.color_name} unit numbers window")
-            hud_windows[i] = ((unit_window_images, unit_window_numbers), resource_window)
-        else:
-            unit_window = UnitWindowWithImages(player, hud_positions, selected_units_dict)
-            unit_window.setWindowTitle(f"Player {player.color_name} unit window")
-            hud_windows[i] = (unit_window, resource_window)
+
+def build_unit_window(player, separate):
+    """Build the unit window(s) of a player hidden; the caller shows them once they are filled in."""
+    if separate:
+        unit_window_images = UnitWindowImagesOnly(player, hud_positions, selected_units_dict, visible=False)
+        unit_window_images.setWindowTitle(f"Player {player.color_name} unit images window")
+        unit_window_numbers = UnitWindowNumbersOnly(player, hud_positions, selected_units_dict, visible=False)
+        unit_window_numbers.setWindowTitle(f"Player {player.color_name} unit numbers window")
+        return unit_window_images, unit_window_numbers
+    unit_window = UnitWindowWithImages(player, hud_positions, selected_units_dict, visible=False)
+    unit_window.setWindowTitle(f"Player {player.color_name} unit window")
+    return unit_window
 
 
 
@@ -185,8 +199,21 @@ def find_game_process(stop_event):
     return None  # Return None if stop_event is set
 
 
+# Read the players while the game is still loading, once their colors and countries are known
+def read_players_while_loading(process_handle):
+    loading_data = GameData()
+    try:
+        if initialize_players_after_loading(loading_data, process_handle) == 0:
+            return None
+    except ProcessExitedException:
+        return None
+    if not loading_data.players or any(player.faction == 'Unknown' for player in loading_data.players):
+        return None  # Countries are not readable yet
+    return loading_data.players
+
+
 # Run player creation in the background
-def run_create_players_in_background(stop_event):
+def run_create_players_in_background(stop_event, on_players_loading=None):
     global players, game_data, process_handle
 
     players.clear()
@@ -209,8 +236,38 @@ def run_create_players_in_background(stop_event):
     game_process = psutil.Process(pid)
 
     try:
-        # Wait until players are loaded
+        executable_path = game_process.exe()
+    except psutil.Error as e:
+        logging.warning(f"Cannot locate the game executable: {e}")
+        executable_path = None
+    try:
+        # A known build needs no reads at all. Any other build is checked, and if need be
+        # scanned, once the game is far enough along, see select_profile().
+        profile_checks = 0
+        frame_samples = {}  # Lets each check see whether the game frame counts up
+        profile_verified = load_offset_profile(process_handle, executable_path, allow_scan=False,
+                                               frame_samples=frame_samples)
+    except ProcessExitedException:
+        logging.info("Game process exited while loading its offset profile.")
+        ctypes.windll.kernel32.CloseHandle(process_handle)
+        process_handle = None
+        return None
+
+    try:
+        # Wait until players are loaded. Meanwhile, announce the players as soon as
+        # they can be read so the HUD can be built during the loading screen.
+        players_announced = on_players_loading is None
         while not detect_if_all_players_are_loaded(process_handle):
+            if not profile_verified:
+                profile_checks += 1
+                profile_verified = load_offset_profile(process_handle, executable_path,
+                                                       allow_scan=profile_checks >= PROFILE_SCAN_DELAY,
+                                                       frame_samples=frame_samples)
+            if not players_announced:
+                loading_players = read_players_while_loading(process_handle)
+                if loading_players:
+                    on_players_loading(loading_players)
+                    players_announced = True
             if stop_event.is_set():
                 return None
             if not game_process.is_running():
@@ -220,6 +277,8 @@ def run_create_players_in_background(stop_event):
                 process_handle = None
                 return None
             QThread.msleep(1000)
+        if not profile_verified:
+            load_offset_profile(process_handle, executable_path, frame_samples=frame_samples)
 
         # Initialize players after loading
         valid_player_count = initialize_players_after_loading(game_data, process_handle)
@@ -236,8 +295,10 @@ def run_create_players_in_background(stop_event):
 
 
 # Create HUD windows for each player
-def create_hud_windows():
+def create_hud_windows(hud_players=None, warn=True):
     global hud_windows
+    if hud_players is None:
+        hud_players = players
 
     # Step 1: Get the game path and check for spawn.ini
     global game_path
@@ -254,32 +315,24 @@ def create_hud_windows():
 
         if not is_spectator:
             # Step 5: Show a warning if the player is not in spectator mode
-            QMessageBox.warning(None, "Spectator Mode Required", "You can only use the Unit counter in Spectator mode.")
+            if warn:
+                QMessageBox.warning(None, "Spectator Mode Required", "You can only use the Unit counter in Spectator mode.")
             return
 
-    # Step 6: Close any existing HUD windows before creating new ones
-    for unit_window, resource_window in hud_windows:
-        if unit_window:
-            if isinstance(unit_window, tuple):
-                for uw in unit_window:
-                    uw.close()
-            else:
-                unit_window.close()
-        # Close each individual resource window (name, money, power, flag)
-        for window in resource_window.windows:
-            window.close()
-        # No need to call resource_window.close()
+    # Step 6: Hide any existing HUD windows, they are kept in the pool for reuse
+    hud_pool.release(hud_windows)
 
     hud_windows = []
 
-    if len(players) == 0:
+    if len(hud_players) == 0:
         logging.info("No valid players found. HUD will not be displayed.")
         return
 
-    # Step 7: Create the resource windows and placeholders for unit windows
-    for player in players:
+    # Step 7: Create (or reuse) the resource windows and placeholders for unit windows
+    for player in hud_players:
         logging.info(f"Creating HUD for {player.username.value} with color {player.color_name}")
-        resource_window = ResourceWindow(player, len(players), hud_positions, player.color_name)
+        resource_window = hud_pool.acquire_resource_window(
+            player, lambda: ResourceWindow(player, len(hud_players), hud_positions, player.color_name, visible=False))
         # Do NOT set window title on resource_window
         # resource_window.setWindowTitle(f"Player {player.color_name} resource window")
         hud_windows.append((None, resource_window))  # Will set unit_window later
@@ -308,6 +361,24 @@ def update_huds():
         traceback.print_exc()
 
 
+# Handler for when the players are known but the game is still loading
+def game_loading_handler(loading_players):
+    """Build the HUD for the loading players and park it, hidden, in the HUD pool.
+
+    When the match starts create_hud_windows() then only has to rebind the
+    prebuilt windows to the final Player objects and show them.
+    """
+    with data_lock:
+        if len(hud_windows) > 0:
+            return  # A HUD is already on screen
+        start = time.perf_counter()
+        create_hud_windows(loading_players, warn=False)
+        update_huds()  # Builds the counters locked for each player's faction
+        hud_pool.release(hud_windows)
+        hud_windows.clear()
+        logging.info(f"Prebuilt HUD for {len(loading_players)} players in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
 # Handler for when the game starts
 def game_started_handler():
     logging.info("Game started handler called")
@@ -315,18 +386,15 @@ def game_started_handler():
         if len(players) == 0:
             logging.info("No valid players found. HUD will not be displayed.")
             return
-        # Create HUD windows
+        # Create HUD windows, hidden, then show them with their current data
         create_hud_windows()
+        update_huds()
         for unit_window, resource_window in hud_windows:
             # Show unit windows
-            if unit_window:
-                if isinstance(unit_window, tuple):
-                    for uw in unit_window:
-                        uw.show()
-                else:
-                    unit_window.show()
-            # Do NOT call resource_window.show()
-            # resource_window.show()
+            for uw in unit_windows_of(unit_window):
+                uw.show()
+            # Show the resource windows the settings ask for; resource_window itself stays hidden
+            resource_window.apply_visibility()
 
 
 # Handler for when the game stops
@@ -334,19 +402,8 @@ def game_stopped_handler():
     logging.info("Game stopped handler called")
     save_hud_positions()  # Save the positions of HUD windows
 
-    # Close all HUD windows (unit window, resource window)
-    for unit_window, resource_window in hud_windows:
-        # Close unit counter window
-        if unit_window:
-            if isinstance(unit_window, tuple):
-                for uw in unit_window:
-                    uw.close()
-            else:
-                unit_window.close()
-
-        # Close each individual resource window (name, money, power, flag)
-        for window in resource_window.windows:
-            window.close()
+    # Hide all HUD windows (unit window, resource window) and keep them for the next match
+    hud_pool.release(hud_windows)
 
     hud_windows.clear()  # Clear the HUD windows list
     players.clear()  # Clear the players list
@@ -387,7 +444,7 @@ class ControlPanel(QMainWindow):
         unit_layout = QFormLayout()
 
         unit_size_label = QLabel("Unit Window Size:")
-        counter_size = hud_positions.get('unit_counter_size', 75)
+        counter_size = hud_positions.unit_counter_size
         self.counter_size_spinbox = QSpinBox()
         self.counter_size_spinbox.setRange(5, 250)
         self.counter_size_spinbox.setValue(counter_size)
@@ -397,7 +454,7 @@ class ControlPanel(QMainWindow):
         # Add new settings for separate mode
         # Image Size
         image_size_label = QLabel("Image Size:")
-        image_size = hud_positions.get('image_size', 75)
+        image_size = hud_positions.image_size
         self.image_size_spinbox = QSpinBox()
         self.image_size_spinbox.setRange(5, 250)
         self.image_size_spinbox.setValue(image_size)
@@ -406,7 +463,7 @@ class ControlPanel(QMainWindow):
 
         # Number Size
         number_size_label = QLabel("Number Size:")
-        number_size = hud_positions.get('number_size', 75)
+        number_size = hud_positions.number_size
         self.number_size_spinbox = QSpinBox()
         self.number_size_spinbox.setRange(5, 250)
         self.number_size_spinbox.setValue(number_size)
@@ -415,7 +472,7 @@ class ControlPanel(QMainWindow):
 
         # Distance Between Numbers
         distance_label = QLabel("Distance Between Numbers:")
-        distance = hud_positions.get('distance_between_numbers', 0)
+        distance = hud_positions.distance_between_numbers
         self.distance_spinbox = QSpinBox()
         self.distance_spinbox.setRange(0, 150)
         self.distance_spinbox.setValue(distance)
@@ -423,13 +480,13 @@ class ControlPanel(QMainWindow):
         unit_layout.addRow(distance_label, self.distance_spinbox)
 
         self.unit_frame_checkbox = QCheckBox("Show Unit Frames")
-        self.unit_frame_checkbox.setChecked(hud_positions.get('show_unit_frames', True))
+        self.unit_frame_checkbox.setChecked(hud_positions.show_unit_frames)
         self.unit_frame_checkbox.stateChanged.connect(self.toggle_unit_frames)
         unit_layout.addRow(self.unit_frame_checkbox)
 
         # Separate Unit Counters Checkbox
         self.separate_units_checkbox = QCheckBox("Separate Unit Counters")
-        self.separate_units_checkbox.setChecked(hud_positions.get('separate_unit_counters', False))
+        self.separate_units_checkbox.setChecked(hud_positions.separate_unit_counters)
         self.separate_units_checkbox.stateChanged.connect(self.toggle_separate_unit_counters)
         unit_layout.addRow(self.separate_units_checkbox)
 
@@ -437,7 +494,7 @@ class ControlPanel(QMainWindow):
         layout_label = QLabel("Select Unit Layout:")
         self.layout_combo = QComboBox()
         self.layout_combo.addItems(["Vertical", "Horizontal"])
-        layout_type = hud_positions.get('unit_layout', 'Vertical')
+        layout_type = hud_positions.unit_layout
         self.layout_combo.setCurrentText(layout_type)
         self.layout_combo.currentTextChanged.connect(self.update_layout)
         unit_layout.addRow(layout_label, self.layout_combo)
@@ -455,12 +512,12 @@ class ControlPanel(QMainWindow):
         name_layout = QFormLayout()
 
         self.name_checkbox = QCheckBox("Show Name")
-        self.name_checkbox.setChecked(hud_positions.get('show_name'))
+        self.name_checkbox.setChecked(hud_positions.show_name)
         self.name_checkbox.stateChanged.connect(self.toggle_name)
         name_layout.addRow(self.name_checkbox)
 
         name_size_label = QLabel("Name Widget Size:")
-        name_size = hud_positions.get('name_widget_size', 50)
+        name_size = hud_positions.name_widget_size
         self.name_size_spinbox = QSpinBox()
         self.name_size_spinbox.setRange(5, 500)
         self.name_size_spinbox.setValue(name_size)
@@ -475,12 +532,12 @@ class ControlPanel(QMainWindow):
         flag_layout = QFormLayout()
 
         self.flag_checkbox = QCheckBox("Show Flag")
-        self.flag_checkbox.setChecked(hud_positions.get('show_flag', True))
+        self.flag_checkbox.setChecked(hud_positions.show_flag)
         self.flag_checkbox.stateChanged.connect(self.toggle_flag)
         flag_layout.addRow(self.flag_checkbox)
 
         flag_size_label = QLabel("Flag Widget Size:")
-        flag_size = hud_positions.get('flag_widget_size', 50)
+        flag_size = hud_positions.flag_widget_size
         self.flag_size_spinbox = QSpinBox()
         self.flag_size_spinbox.setRange(5, 500)
         self.flag_size_spinbox.setValue(flag_size)
@@ -495,12 +552,12 @@ class ControlPanel(QMainWindow):
         money_layout = QFormLayout()
 
         self.money_checkbox = QCheckBox("Show Money")
-        self.money_checkbox.setChecked(hud_positions.get('show_money'))
+        self.money_checkbox.setChecked(hud_positions.show_money)
         self.money_checkbox.stateChanged.connect(self.toggle_money)
         money_layout.addRow(self.money_checkbox)
 
         money_size_label = QLabel("Money Widget Size:")
-        money_size = hud_positions.get('money_widget_size', 50)
+        money_size = hud_positions.money_widget_size
         self.money_size_spinbox = QSpinBox()
         self.money_size_spinbox.setRange(5, 500)
         self.money_size_spinbox.setValue(money_size)
@@ -510,7 +567,7 @@ class ControlPanel(QMainWindow):
         money_color_label = QLabel("Money Text Color:")
         self.color_combo = QComboBox()
         self.color_combo.addItems(["Use player color", "White"])
-        money_color = hud_positions.get('money_color', 'Use player color')
+        money_color = hud_positions.money_color
         self.color_combo.setCurrentText(money_color)
         self.color_combo.currentTextChanged.connect(self.update_money_color)
         money_layout.addRow(money_color_label, self.color_combo)
@@ -523,12 +580,12 @@ class ControlPanel(QMainWindow):
         power_layout = QFormLayout()
 
         self.power_checkbox = QCheckBox("Show Power")
-        self.power_checkbox.setChecked(hud_positions.get('show_power'))
+        self.power_checkbox.setChecked(hud_positions.show_power)
         self.power_checkbox.stateChanged.connect(self.toggle_power)
         power_layout.addRow(self.power_checkbox)
 
         power_size_label = QLabel("Power Widget Size:")
-        power_size = hud_positions.get('power_widget_size', 50)
+        power_size = hud_positions.power_widget_size
         self.power_size_spinbox = QSpinBox()
         self.power_size_spinbox.setRange(5, 500)
         self.power_size_spinbox.setValue(power_size)
@@ -538,12 +595,62 @@ class ControlPanel(QMainWindow):
         power_group.setLayout(power_layout)
         main_layout.addWidget(power_group)
 
+        # Economy Widget Settings Group
+        economy_group = QGroupBox("Economy Widget Settings")
+        economy_layout = QFormLayout()
+
+        self.income_checkbox = QCheckBox("Show Income")
+        self.income_checkbox.setChecked(hud_positions.show_income)
+        self.income_checkbox.stateChanged.connect(self.toggle_income)
+        economy_layout.addRow(self.income_checkbox)
+
+        income_size_label = QLabel("Income Widget Size:")
+        self.income_size_spinbox = QSpinBox()
+        self.income_size_spinbox.setRange(5, 500)
+        self.income_size_spinbox.setValue(hud_positions.income_widget_size)
+        self.income_size_spinbox.valueChanged.connect(self.update_income_widget_size)
+        economy_layout.addRow(income_size_label, self.income_size_spinbox)
+
+        self.army_value_checkbox = QCheckBox("Show Army Value")
+        self.army_value_checkbox.setChecked(hud_positions.show_army_value)
+        self.army_value_checkbox.stateChanged.connect(self.toggle_army_value)
+        economy_layout.addRow(self.army_value_checkbox)
+
+        army_value_size_label = QLabel("Army Value Widget Size:")
+        self.army_value_size_spinbox = QSpinBox()
+        self.army_value_size_spinbox.setRange(5, 500)
+        self.army_value_size_spinbox.setValue(hud_positions.army_value_widget_size)
+        self.army_value_size_spinbox.valueChanged.connect(self.update_army_value_widget_size)
+        economy_layout.addRow(army_value_size_label, self.army_value_size_spinbox)
+
+        economy_group.setLayout(economy_layout)
+        main_layout.addWidget(economy_group)
+
+        # Recording Settings Group
+        recording_group = QGroupBox("Recording Settings")
+        recording_layout = QFormLayout()
+
+        self.record_matches_checkbox = QCheckBox("Record Matches")
+        self.record_matches_checkbox.setChecked(hud_positions.record_matches)
+        self.record_matches_checkbox.stateChanged.connect(self.toggle_record_matches)
+        recording_layout.addRow(self.record_matches_checkbox)
+
+        max_recordings_label = QLabel("Recordings To Keep (0 = all):")
+        self.max_recordings_spinbox = QSpinBox()
+        self.max_recordings_spinbox.setRange(0, 10000)
+        self.max_recordings_spinbox.setValue(hud_positions.max_recordings)
+        self.max_recordings_spinbox.valueChanged.connect(self.update_max_recordings)
+        recording_layout.addRow(max_recordings_label, self.max_recordings_spinbox)
+
+        recording_group.setLayout(recording_layout)
+        main_layout.addWidget(recording_group)
+
         # Game Path Settings Group
         path_group = QGroupBox("Game Path Settings")
         path_layout = QHBoxLayout()
 
         self.path_edit = QLineEdit()
-        game_path = hud_positions.get('game_path', '')
+        game_path = hud_positions.game_path
         self.path_edit.setText(game_path)
         self.path_edit.setPlaceholderText("Enter or select the game path")
         path_layout.addWidget(self.path_edit)
@@ -569,7 +676,7 @@ class ControlPanel(QMainWindow):
         self.unit_selection_window = None
 
         # Initialize control states based on separate_unit_counters
-        if hud_positions.get('separate_unit_counters', False):
+        if hud_positions.separate_unit_counters:
             # Separate mode: enable image_size, number_size, distance_between_numbers
             self.image_size_spinbox.setEnabled(True)
             self.number_size_spinbox.setEnabled(True)
@@ -587,25 +694,15 @@ class ControlPanel(QMainWindow):
 
 
     def toggle_unit_frames(self, state):
-        hud_positions['show_unit_frames'] = (state != 0)
-        logging.info(f"Toggled show_unit_frames to: {hud_positions['show_unit_frames']}")
-
-        # Update all existing CounterWidgets
-        if hud_windows:
-            for unit_window, _ in hud_windows:
-                if unit_window:
-                    if isinstance(unit_window, tuple):
-                        for uw in unit_window:
-                            uw.update_show_unit_frames(hud_positions['show_unit_frames'])
-                    else:
-                        unit_window.update_show_unit_frames(hud_positions['show_unit_frames'])
+        hud_positions.set('show_unit_frames', (state != 0))
+        logging.info(f"Toggled show_unit_frames to: {hud_positions.show_unit_frames}")
 
     def toggle_separate_unit_counters(self, state):
-        hud_positions['separate_unit_counters'] = (state != 0)
-        logging.info(f"Toggled separate_unit_counters to: {hud_positions['separate_unit_counters']}")
+        hud_positions.set('separate_unit_counters', (state != 0))
+        logging.info(f"Toggled separate_unit_counters to: {hud_positions.separate_unit_counters}")
 
         # Enable/disable controls based on the state
-        if hud_positions['separate_unit_counters']:
+        if hud_positions.separate_unit_counters:
             # Separate mode: enable image_size, number_size, distance_between_numbers
             self.image_size_spinbox.setEnabled(True)
             self.number_size_spinbox.setEnabled(True)
@@ -620,104 +717,44 @@ class ControlPanel(QMainWindow):
             # Enable unit window size
             self.counter_size_spinbox.setEnabled(True)
 
-        # Recreate HUD windows if a game is running
+        # Swap the unit windows if a game is running. The windows of the other mode are kept,
+        # hidden, in the HUD pool, so switching back and forth does not rebuild anything.
         if len(hud_windows) > 0:
-            # Close existing unit windows
-            for unit_window, _ in hud_windows:
-                if unit_window:
-                    if isinstance(unit_window, tuple):
-                        for uw in unit_window:
-                            uw.close()
-                    else:
-                        unit_window.close()
-            # Update hud_windows to remove unit windows
-            hud_windows[:] = [(None, resource_window) for unit_window, resource_window in hud_windows]
-
-            # Create new unit windows in the new mode
             create_unit_windows_in_current_mode()
-
-            # Show the new unit windows
             for unit_window, _ in hud_windows:
-                if unit_window:
-                    if isinstance(unit_window, tuple):
-                        for uw in unit_window:
-                            uw.show()
-                    else:
-                        unit_window.show()
+                for uw in unit_windows_of(unit_window):
+                    uw.update_labels()  # Fill in the counts before the window appears
+                    uw.show()
 
     def update_image_size(self):
         new_size = self.image_size_spinbox.value()
-        hud_positions['image_size'] = new_size
+        hud_positions.set('image_size', new_size)
         logging.info(f"Updated image size in hud_positions: {new_size}")
 
-        # If HUD windows exist, update their sizes
-        if hud_windows:
-            for unit_window, _ in hud_windows:
-                if unit_window and isinstance(unit_window, tuple):
-                    unit_window_images, _ = unit_window
-                    unit_window_images.update_all_counters_size(new_size)
-
     def update_number_size(self):
         new_size = self.number_size_spinbox.value()
-        hud_positions['number_size'] = new_size
+        hud_positions.set('number_size', new_size)
         logging.info(f"Updated number size in hud_positions: {new_size}")
 
-        # If HUD windows exist, update their sizes
-        if hud_windows:
-            for unit_window, _ in hud_windows:
-                if unit_window and isinstance(unit_window, tuple):
-                    _, unit_window_numbers = unit_window
-                    unit_window_numbers.update_all_counters_size(new_size)
-
     def update_distance_between_numbers(self):
         new_distance = self.distance_spinbox.value()
-        hud_positions['distance_between_numbers'] = new_distance
+        hud_positions.set('distance_between_numbers', new_distance)
         logging.info(f"Updated distance between numbers in hud_positions: {new_distance}")
 
-        # If HUD windows exist, update their spacing
-        if hud_windows:
-            for unit_window, _ in hud_windows:
-                if unit_window:
-                    if isinstance(unit_window, tuple):
-                        # Assuming the numbers window is the second in the tuple
-                        _, unit_window_numbers = unit_window
-                        unit_window_numbers.update_spacing(new_distance)
-
     # Add methods for the flag widget
     def update_flag_widget_size(self):
         new_size = self.flag_size_spinbox.value()
-        hud_positions['flag_widget_size'] = new_size
+        hud_positions.set('flag_widget_size', new_size)
         logging.info(f"Updated flag widget size in hud_positions: {new_size}")
 
-        # If HUD windows exist, update their sizes as well
-        if hud_windows:
-            for _, resource_window in hud_windows:
-                resource_window.flag_widget.update_data_size(new_size)
-
     def toggle_flag(self, state):
         self.toggle_hud_element('show_flag', 'flag_widget', state)
 
     # Update toggle_hud_element to include the flag_widget
     def toggle_hud_element(self, element, widget_name, state):
-        hud_positions[element] = (state == 2)
-        logging.info(f"Toggled {element} state to: {hud_positions[element]}")
-
-        # If HUD windows exist, toggle visibility of the specified widget
-        if hud_windows:
-            index_mapping = {
-                'name_widget': 0,
-                'money_widget': 1,
-                'power_widget': 2,
-                'flag_widget': 3  # Add the flag widget index
-            }
-            index = index_mapping.get(widget_name)
-            if index is not None:
-                for _, resource_window in hud_windows:
-                    window = resource_window.windows[index]
-                    if state == 2:
-                        window.show()
-                    else:
-                        window.hide()
+        # Resource windows show or hide the widget when the setting changes
+        hud_positions.set(element, state == 2)
+        logging.info(f"Toggled {element} state to: {state == 2}")
 
     def select_game_path(self):
         # Open the folder selection dialog
@@ -726,93 +763,68 @@ class ControlPanel(QMainWindow):
         if game_path:
             # Set the folder path in the text box
             self.path_edit.setText(game_path)
-            hud_positions['game_path'] = control_panel.path_edit.text()  # Save the game path
+            hud_positions.set('game_path', control_panel.path_edit.text())  # Save the game path
 
     def update_money_color(self, color):
         """Update the selected money color."""
-        color = color.strip()
-        hud_positions['money_color'] = color
+        hud_positions.set('money_color', color)
         logging.info(f"HUD money color updated to: '{color}'")
 
-        # If HUD windows exist, update their money widget colors
-        if hud_windows:
-            for _, resource_window in hud_windows:
-                logging.debug(f"Updating money widget color for player {resource_window.player.username.value}")
-                resource_window.update_money_widget_color()
-
     def update_layout(self, layout_type):
         """Update the layout of the UnitWindow between vertical and horizontal."""
-        hud_positions['unit_layout'] = layout_type
+        hud_positions.set('unit_layout', layout_type)
         logging.info(f"Updated layout to: {layout_type}")
-
-        # If HUD windows exist, update their layouts as well
-        if hud_windows:
-            for unit_window, _ in hud_windows:
-                if unit_window:
-                    if isinstance(unit_window, tuple):
-                        for uw in unit_window:
-                            uw.update_layout(layout_type)
-                    else:
-                        unit_window.update_layout(layout_type)
-        else:
-            logging.info("HUD windows do not exist yet, storing the layout for later.")
         self.update_distance_between_numbers()
 
     def update_unit_window_size(self):
         new_size = self.counter_size_spinbox.value()
-        hud_positions['unit_counter_size'] = new_size
+        hud_positions.set('unit_counter_size', new_size)
         logging.info(f"Updated unit window size in hud_positions: {new_size}")
 
-        # If HUD windows exist, update their sizes as well
-        if hud_windows:
-            for unit_window, _ in hud_windows:
-                if unit_window:
-                    if isinstance(unit_window, tuple):
-                        for uw in unit_window:
-                            uw.update_all_counters_size(new_size)
-                    else:
-                        unit_window.update_all_counters_size(new_size)
-
     def update_name_widget_size(self):
         new_size = self.name_size_spinbox.value()
-        hud_positions['name_widget_size'] = new_size
+        hud_positions.set('name_widget_size', new_size)
         logging.info(f"Updated name widget size in hud_positions: {new_size}")
 
-        # If HUD windows exist, update their sizes as well
-        if hud_windows:
-            for _, resource_window in hud_windows:
-                resource_window.name_widget.update_data_size(new_size)
-
     def update_money_widget_size(self):
         new_size = self.money_size_spinbox.value()
-        hud_positions['money_widget_size'] = new_size
+        hud_positions.set('money_widget_size', new_size)
         logging.info(f"Updated money widget size in hud_positions: {new_size}")
 
-        # If HUD windows exist, update their sizes as well
-        if hud_windows:
-            for _, resource_window in hud_windows:
-                resource_window.money_widget.update_data_size(new_size)
-
     def update_power_widget_size(self):
         new_size = self.power_size_spinbox.value()
-        hud_positions['power_widget_size'] = new_size
+        hud_positions.set('power_widget_size', new_size)
         logging.info(f"Updated power widget size in hud_positions: {new_size}")
 
-        # If HUD windows exist, update their sizes as well
-        if hud_windows:
-            for _, resource_window in hud_windows:
-                resource_window.power_widget.update_data_size(new_size)
+    def toggle_record_matches(self, state):
+        hud_positions.set('record_matches', (state != 0))
+        logging.info(f"Toggled record_matches to: {hud_positions.record_matches}")
+
+    def update_max_recordings(self):
+        max_recordings = self.max_recordings_spinbox.value()
+        hud_positions.set('max_recordings', max_recordings)
+        logging.info(f"Updated max_recordings in hud_positions: {max_recordings}")
+
+    def update_income_widget_size(self):
+        new_size = self.income_size_spinbox.value()
+        hud_positions.set('income_widget_size', new_size)
+        logging.info(f"Updated income widget size in hud_positions: {new_size}")
+
+    def update_army_value_widget_size(self):
+        new_size = self.army_value_size_spinbox.value()
+        hud_positions.set('army_value_widget_size', new_size)
+        logging.info(f"Updated army value widget size in hud_positions: {new_size}")
 
     # Method to open the Unit Selection window
     def open_unit_selection(self):
         if self.unit_selection_window is None or not self.unit_selection_window.isVisible():
-            self.unit_selection_window = UnitSelectionWindow(selected_units_dict, hud_windows)
+            self.unit_selection_window = UnitSelectionWindow(selected_units_dict)
             logging.info("Opening Unit Selection window")
             self.unit_selection_window.show()
 
     def load_selected_units(self):
         """Load the selected units from the JSON file."""
-        json_file = 'unit_selection.json'
+        json_file = UNIT_SELECTION_FILE
         if os.path.exists(json_file):
             with open(json_file, 'r') as file:
                 data = json.load(file)
@@ -833,29 +845,41 @@ class ControlPanel(QMainWindow):
     def toggle_power(self, state):
         self.toggle_hud_element('show_power', 'power_widget', state)
 
+    def toggle_income(self, state):
+        self.toggle_hud_element('show_income', 'income_widget', state)
+
+    def toggle_army_value(self, state):
+        self.toggle_hud_element('show_army_value', 'army_value_widget', state)
+
     def toggle_separate(self, state):
         self.toggle_hud_element('separate_info', 'separate_info', state)
 
 
 
-def save_selected_units():
-    global selected_units_dict
-    """Save the selected units to the JSON file."""
-    json_file = 'unit_selection.json'
-    with open(json_file, 'w') as file:
-        json.dump(selected_units_dict, file, indent=4)
-    logging.info("Saved selected units.")
+def create_persistence_service():
+    """Save hud_positions.json and unit_selection.json in the background whenever they change."""
+    persistence = PersistenceService()
+    persistence.register('hud_positions', HUD_POSITION_FILE, lambda: copy.deepcopy(hud_positions.to_dict()))
+    persistence.register('unit_selection', UNIT_SELECTION_FILE, lambda: copy.deepcopy(selected_units_dict))
+    hud_positions.signals.changed.connect(lambda name, value: persistence.mark_dirty('hud_positions'))
+    hud_positions.signals.position_changed.connect(lambda color_name, hud_type: persistence.mark_dirty('hud_positions'))
+    get_selection_index(selected_units_dict).subscribe(
+        lambda unit_id, change: persistence.mark_dirty('unit_selection'), weak=False)
+    persistence.start()
+    return persistence
 
 
 # Thread to continuously update player data
 class DataUpdateThread(QThread):
-    update_signal = Signal()
+    game_loading = Signal(object)  # Players read during the loading screen
     game_started = Signal()
     game_stopped = Signal()
 
-    def __init__(self):
+    def __init__(self, frame_pump):
         super().__init__()
         self.stop_event = threading.Event()
+        self.frame_pump = frame_pump  # Picks up published ticks on the GUI thread
+        self.recorder = None  # Records the running match
 
     def run(self):
         self.setPriority(QThread.LowPriority)
@@ -863,7 +887,7 @@ class DataUpdateThread(QThread):
         try:
             while not self.stop_event.is_set():
                 logging.info("Waiting for the game to start and players to load...")
-                game_process = run_create_players_in_background(self.stop_event)
+                game_process = run_create_players_in_background(self.stop_event, self.game_loading.emit)
                 if game_process is None:
                     if self.stop_event.is_set():
                         logging.info("Stop event set. Exiting thread.")
@@ -873,6 +897,7 @@ class DataUpdateThread(QThread):
 
                 # Emit game_started signal now that players are initialized
                 self.game_started.emit()
+                self.recorder = start_match_recording(players)
 
                 # Now we have 'game_process' defined and can use it
                 while not self.stop_event.is_set():
@@ -885,9 +910,16 @@ class DataUpdateThread(QThread):
                         break
 
                     try:
-                        for player in players:
-                            player.update_dynamic_data()
-                        self.update_signal.emit()  # Emit signal after data update
+                        # Nothing is read, recorded or shown while the game frame stands still
+                        if game_data.update_all_players():
+                            if game_data.reinitialized:
+                                # A new match in the same process: restart the recording and rebind the HUD
+                                self.stop_match_recording()
+                                self.recorder = start_match_recording(players)
+                                self.game_started.emit()
+                            if self.recorder:
+                                self.recorder.record(players)
+                            self.frame_pump.publish()  # Let the GUI pick up the new data on its next frame
                     except ProcessExitedException:
                         logging.error("Process has exited. Exiting data update loop.")
                         break  # Exit the inner loop
@@ -898,6 +930,7 @@ class DataUpdateThread(QThread):
                     QThread.msleep(1000)
 
                 # Game has ended or exception occurred
+                self.stop_match_recording()
                 self.game_stopped.emit()
                 logging.info("Emitted game_stopped signal.")
 
@@ -915,17 +948,40 @@ class DataUpdateThread(QThread):
             self.game_stopped.emit()  # Ensure the signal is emitted
 
         finally:
+            self.stop_match_recording()
             with data_lock:
                 if process_handle:
                     ctypes.windll.kernel32.CloseHandle(process_handle)
                     process_handle = None
             logging.info("Data update thread has exited.")
 
+    def stop_match_recording(self):
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+
+def start_match_recording(match_players):
+    """Start recording the match to a new file in RECORDINGS_DIR, making room by deleting the oldest
+    recordings. Returns None if recording is turned off or the file cannot be created."""
+    if not hud_positions.record_matches:
+        return None
+    if hud_positions.max_recordings:
+        prune_recordings(RECORDINGS_DIR, hud_positions.max_recordings - 1)  # Room for the new one
+    path = os.path.join(RECORDINGS_DIR, time.strftime('%Y-%m-%d_%H-%M-%S') + RECORDING_EXTENSION)
+    recorder = MatchRecorder(path, match_players)
+    try:
+        recorder.start()
+    except OSError as e:
+        logging.error(f"Failed to start recording the match to {path}: {e}")
+        return None
+    return recorder
+
 
 def wait_for_current_file_path():
     # Wait until the user selects a valid file path
     global game_path
-    game_path = hud_positions.get('game_path', '')
+    game_path = hud_positions.game_path
     spawn_ini_path = os.path.join(game_path, 'spawn.ini')
 
     new = game_path
@@ -937,7 +993,7 @@ def wait_for_current_file_path():
         while old == new:
             logging.debug(f"current files path: {game_path}")
             app.processEvents()  # Allows the GUI to keep running while waiting for input
-            game_path = hud_positions.get('game_path', '')
+            game_path = hud_positions.game_path
             new = game_path
             time.sleep(1)
 
@@ -947,33 +1003,68 @@ def wait_for_current_file_path():
 
 
 # Main application logic
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Red Alert 2 HUD")
+    parser.add_argument('--replay', metavar='RECORDING', help="play a match recording instead of reading the game")
+    parser.add_argument('--speed', type=float, default=1, help="replay speed, 0.25 to 64 (default 1)")
+    return parser.parse_args()
+
+
+# Start playing a match recording into the HUD. No game process is needed.
+def start_replay(path, frame_pump, speed):
+    global players, game_data, game_path
+    game_path = hud_positions.game_path
+    replay_thread = ReplayThread(path, frame_pump, speed)
+    game_data = replay_thread.game_data
+    players = game_data.players
+    replay_thread.game_started.connect(game_started_handler, Qt.QueuedConnection)
+    replay_thread.game_stopped.connect(game_stopped_handler, Qt.QueuedConnection)
+    replay_thread.start()
+    return replay_thread
+
+
 if __name__ == '__main__':
+    arguments = parse_arguments()
     app = QApplication([])
     setup_logging()
 
     # Load HUD positions
     load_hud_positions()
+    preload_assets()
 
     # Initialize the control panel
     control_panel = ControlPanel()
     control_panel.show()
+    persistence = create_persistence_service()
 
-    wait_for_current_file_path()
+    # HUD updates run at the GUI frame rate, decoupled from the reader
+    frame_pump = FramePump(update_huds, hud_positions.gui_frame_rate)
+
+    if arguments.replay:
+        data_update_thread = start_replay(arguments.replay, frame_pump, arguments.speed)
+        replay_controls = ReplayControls(data_update_thread)
+        replay_controls.show()
+        frame_pump.start()
+    else:
+        wait_for_current_file_path()
+        frame_pump.start()
 
-    # Once a valid path is selected, continue with the rest of the logic
-    data_update_thread = DataUpdateThread()
+        # Once a valid path is selected, continue with the rest of the logic
+        data_update_thread = DataUpdateThread(frame_pump)
 
-    # Connect signals from data_update_thread with Qt.QueuedConnection
-    data_update_thread.update_signal.connect(update_huds, Qt.QueuedConnection)
-    data_update_thread.game_started.connect(game_started_handler, Qt.QueuedConnection)
-    data_update_thread.game_stopped.connect(game_stopped_handler, Qt.QueuedConnection)
+        # Connect signals from data_update_thread with Qt.QueuedConnection
+        data_update_thread.game_loading.connect(game_loading_handler, Qt.QueuedConnection)
+        data_update_thread.game_started.connect(game_started_handler, Qt.QueuedConnection)
+        data_update_thread.game_stopped.connect(game_stopped_handler, Qt.QueuedConnection)
 
-    data_update_thread.start()
+        data_update_thread.start()
 
     app.exec()
 
     # On application exit
+    frame_pump.stop()
+    frame_pump.report()
     data_update_thread.stop_event.set()
     data_update_thread.wait()
-    save_selected_units()
     save_hud_positions()
+    persistence.stop()  # Writes whatever changed since the last background save
@@ -0,0 +1,333 @@
+#MatchRecorder.py
+import bisect
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+from Player import infantry_offsets, tank_offsets, structure_offsets, aircraft_offsets
+
+RECORDING_EXTENSION = '.ra2rec'
+FORMAT_VERSION = 1
+BLOCK_TICKS = 60  # Ticks per block. Every block starts with absolute values, so it is also a keyframe.
+COMPRESSION_LEVEL = 6
+
+FILE_MAGIC = b'RA2REC\x00' + bytes([FORMAT_VERSION])
+BLOCK_MAGIC = b'BLCK'
+INDEX_MAGIC = b'INDX'
+LENGTH = struct.Struct('<I')
+BLOCK_HEADER = struct.Struct('<4sIIqII')  # magic, first tick, tick count, first time ms, payload length, crc32
+INDEX_ENTRY = struct.Struct('<IqQ')  # first tick, first time ms, file offset of the block
+TRAILER = struct.Struct('<4sQI')  # magic, file offset of the index, entry count
+
+SCALAR_COLUMNS = ('balance', 'spent_credit', 'power_output', 'power_drain', 'is_winner', 'is_loser')
+
+
+def count_columns():
+    """(field, unit names) of the count columns, from the unit tables of the current offset profile."""
+    return (
+        ('infantry_counts', tuple(infantry_offsets.values())),
+        ('tank_counts', tuple(tank_offsets.values())),
+        ('building_counts', tuple(structure_offsets.values())),
+        ('aircraft_counts', tuple(aircraft_offsets.values())),
+    )
+
+
+def encode_varints(values, out):
+    """Append values to the bytearray out as zigzag LEB128 varints."""
+    for value in values:
+        value = (value << 1) ^ (value >> 63)  # Zigzag, so small negative deltas stay short
+        while value > 0x7F:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+
+def decode_varints(data):
+    values = []
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append((value >> 1) ^ -(value & 1))
+        value = 0
+        shift = 0
+    return values
+
+
+def delta_encode(column, out):
+    previous = 0
+    deltas = []
+    for value in column:
+        deltas.append(value - previous)
+        previous = value
+    encode_varints(deltas, out)
+
+
+def player_snapshot(player, columns):
+    """The values of one tick of a player, in the order of the recording's columns."""
+    row = [int(player.balance), int(player.spent_credit), int(player.power_output), int(player.power_drain),
+           int(player.is_winner), int(player.is_loser)]
+    for field, unit_names in columns:
+        counts = getattr(player, field) or {}
+        row.extend(int(counts.get(unit_name, 0)) for unit_name in unit_names)
+    return row
+
+
+def player_header(player):
+    country_name = player.country_name.value
+    if isinstance(country_name, bytes):
+        country_name = country_name.decode('utf-8', errors='replace')
+    return {
+        'index': player.index,
+        'username': player.username.value,
+        'color_name': player.color_name,
+        'color': player.color.name() if hasattr(player.color, 'name') else str(player.color),
+        'country_name': country_name,
+        'faction': player.faction,
+    }
+
+
+def prune_recordings(directory, max_files):
+    """Delete the oldest recordings in directory until at most max_files are left."""
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith(RECORDING_EXTENSION)]
+    except OSError:
+        return
+    paths = sorted((os.path.join(directory, name) for name in names), key=os.path.getmtime)
+    for path in paths[:max(len(paths) - max_files, 0)]:
+        try:
+            os.remove(path)
+            logging.info(f"Deleted old recording {path}")
+        except OSError as e:
+            logging.warning(f"Could not delete old recording {path}: {e}")
+
+
+class MatchRecorder:
+    """Streams every tick of a match into an append-only, columnar recording file.
+
+    The file starts with a JSON header describing the players and columns.
+    Ticks are grouped into blocks of BLOCK_TICKS; inside a block each column
+    of each player is stored as zigzag varint deltas and the block is zlib
+    compressed and checksummed. Blocks are written and fsynced one at a time,
+    so after a crash the file is readable up to the last complete block.
+    close() appends an index of the blocks for fast seeking.
+
+    record() only copies the player values and queues them; encoding and
+    writing happen on the recorder's own thread.
+    """
+
+    def __init__(self, path, players, block_ticks=BLOCK_TICKS):
+        self.path = path
+        self.block_ticks = block_ticks
+        self.start_time = time.time()
+        self.tick = 0
+        self.count_columns = count_columns()
+        self.header = {
+            'version': FORMAT_VERSION,
+            'start_time': self.start_time,
+            'block_ticks': block_ticks,
+            'scalar_columns': list(SCALAR_COLUMNS),
+            'count_columns': [[field, list(unit_names)] for field, unit_names in self.count_columns],
+            'players': [player_header(player) for player in players],
+        }
+        self.player_count = len(players)
+        self.queue = queue.Queue()  # (tick, time ms, rows) per tick, None to close
+        self.index = []  # (first tick, first time ms, offset) of each written block
+        self.file = None
+        self.failed = False  # Set when writing failed, after which ticks are no longer queued
+        self.thread = threading.Thread(target=self.run, name="MatchRecorder", daemon=True)
+
+    def start(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.path, 'wb')
+        header = json.dumps(self.header).encode('utf-8')
+        self.file.write(FILE_MAGIC + LENGTH.pack(len(header)) + header)
+        self.sync()
+        self.thread.start()
+        logging.info(f"Recording match to {self.path}")
+
+    def record(self, players):
+        if self.failed:
+            return
+        time_ms = round((time.time() - self.start_time) * 1000)
+        self.queue.put((self.tick, time_ms, [player_snapshot(player, self.count_columns) for player in players]))
+        self.tick += 1
+
+    def close(self):
+        """Write the pending ticks and the index, and wait for the recorder thread."""
+        self.queue.put(None)
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def run(self):
+        pending = []
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                pending.append(item)
+                if len(pending) >= self.block_ticks:
+                    self.write_block(pending)
+                    pending = []
+            if pending:
+                self.write_block(pending)
+            self.write_index()
+        except OSError as e:
+            self.failed = True
+            logging.error(f"Failed to write match recording {self.path}: {e}")
+        finally:
+            self.file.close()
+            logging.info(f"Match recording {self.path} closed after {self.tick} ticks")
+
+    def write_block(self, ticks):
+        payload = bytearray()
+        delta_encode([time_ms for _, time_ms, _ in ticks], payload)
+        column_count = len(ticks[0][2][0]) if self.player_count else 0
+        for player in range(self.player_count):
+            for column in range(column_count):
+                delta_encode([rows[player][column] for _, _, rows in ticks], payload)
+
+        compressed = zlib.compress(bytes(payload), COMPRESSION_LEVEL)
+        first_tick, first_time_ms, _ = ticks[0]
+        offset = self.file.tell()
+        self.file.write(BLOCK_HEADER.pack(BLOCK_MAGIC, first_tick, len(ticks), first_time_ms,
+                                          len(compressed), zlib.crc32(compressed)))
+        self.file.write(compressed)
+        self.sync()
+        self.index.append((first_tick, first_time_ms, offset))
+
+    def write_index(self):
+        offset = self.file.tell()
+        for entry in self.index:
+            self.file.write(INDEX_ENTRY.pack(*entry))
+        self.file.write(TRAILER.pack(INDEX_MAGIC, offset, len(self.index)))
+        self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+
+class MatchRecording:
+    """Reads a recording written by MatchRecorder.
+
+    The block index comes from the footer, or from scanning the blocks if the
+    recorder never closed the file; scanning stops at the first incomplete or
+    corrupt block. frame(tick) finds the block by binary search and decodes
+    only that block, keeping the last decoded block around for playback.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            self.data = file.read()
+        if not self.data.startswith(FILE_MAGIC):
+            raise ValueError(f"{path} is not a match recording")
+        header_length, = LENGTH.unpack_from(self.data, len(FILE_MAGIC))
+        header_start = len(FILE_MAGIC) + LENGTH.size
+        self.header = json.loads(self.data[header_start:header_start + header_length].decode('utf-8'))
+        self.blocks_start = header_start + header_length
+
+        self.players = self.header['players']
+        self.columns = list(self.header['scalar_columns'])
+        for field, unit_names in self.header['count_columns']:
+            self.columns.extend((field, unit_name) for unit_name in unit_names)
+
+        self.index = self.read_index() or self.scan_blocks()
+        self.block_starts = [first_tick for first_tick, _, _, _ in self.index]
+        self.block_times = [first_time_ms for _, first_time_ms, _, _ in self.index]
+        self.tick_count = self.index[-1][0] + self.index[-1][3] if self.index else 0
+        self.cached_block = None  # (block number, times, [player][column][tick])
+        self.length = None  # Cached duration()
+
+    def read_index(self):
+        """[(first tick, first time ms, offset, tick count)] from the footer, or None if there is none."""
+        if len(self.data) < self.blocks_start + TRAILER.size:
+            return None
+        magic, offset, count = TRAILER.unpack_from(self.data, len(self.data) - TRAILER.size)
+        if magic != INDEX_MAGIC or offset + count * INDEX_ENTRY.size != len(self.data) - TRAILER.size:
+            return None
+        index = []
+        for number in range(count):
+            first_tick, first_time_ms, block_offset = INDEX_ENTRY.unpack_from(self.data, offset + number * INDEX_ENTRY.size)
+            _, _, tick_count, _, _, _ = BLOCK_HEADER.unpack_from(self.data, block_offset)
+            index.append((first_tick, first_time_ms, block_offset, tick_count))
+        return index
+
+    def scan_blocks(self):
+        index = []
+        offset = self.blocks_start
+        while offset + BLOCK_HEADER.size <= len(self.data):
+            magic, first_tick, tick_count, first_time_ms, length, crc = BLOCK_HEADER.unpack_from(self.data, offset)
+            payload_start = offset + BLOCK_HEADER.size
+            payload = self.data[payload_start:payload_start + length]
+            if magic != BLOCK_MAGIC or len(payload) != length or zlib.crc32(payload) != crc:
+                logging.warning(f"Match recording {self.path} ends with an incomplete block, reading up to it")
+                break
+            index.append((first_tick, first_time_ms, offset, tick_count))
+            offset = payload_start + length
+        return index
+
+    def duration(self):
+        """Seconds between the first and the last tick."""
+        if self.length is None:
+            self.length = (self.times(len(self.index) - 1)[-1] - self.block_times[0]) / 1000 if self.index else 0.0
+        return self.length
+
+    def tick_at(self, seconds):
+        """The last tick at or before seconds into the recording."""
+        time_ms = self.block_times[0] + seconds * 1000 if self.index else 0
+        number = max(0, bisect.bisect_right(self.block_times, time_ms) - 1)
+        times = self.times(number)
+        return self.block_starts[number] + max(0, bisect.bisect_right(times, time_ms) - 1) if times else 0
+
+    def times(self, number):
+        return self.decode_block(number)[1]
+
+    def decode_block(self, number):
+        if self.cached_block is not None and self.cached_block[0] == number:
+            return self.cached_block
+        _, _, offset, tick_count = self.index[number]
+        _, _, _, _, length, _ = BLOCK_HEADER.unpack_from(self.data, offset)
+        payload_start = offset + BLOCK_HEADER.size
+        values = decode_varints(zlib.decompress(self.data[payload_start:payload_start + length]))
+
+        def undelta(start):
+            column = []
+            total = 0
+            for delta in values[start:start + tick_count]:
+                total += delta
+                column.append(total)
+            return column
+
+        times = undelta(0)
+        players = []
+        position = tick_count
+        for _ in self.players:
+            columns = []
+            for _ in self.columns:
+                columns.append(undelta(position))
+                position += tick_count
+            players.append(columns)
+        self.cached_block = (number, times, players)
+        return self.cached_block
+
+    def frame(self, tick):
+        """(seconds since the start, [{column: value} per player]) of one tick."""
+        tick = min(max(0, tick), self.tick_count - 1)
+        number = bisect.bisect_right(self.block_starts, tick) - 1
+        _, times, players = self.decode_block(number)
+        row = tick - self.block_starts[number]
+        frame = [{column: values[row] for column, values in zip(self.columns, columns)} for columns in players]
+        return (times[row] - self.block_times[0]) / 1000, frame
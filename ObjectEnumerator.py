@@ -0,0 +1,210 @@
+#ObjectEnumerator.py
+import struct
+from array import array
+
+# DynamicVectorClass<T*> of every object of a class: vtable, items, capacity, flags, count, capacity increment
+VECTOR_HEADER = struct.Struct('<IIIII')
+VECTOR_HEADER_SIZE = 0x18
+
+# Object arrays of gamemd 1.001 and the offset of the Type pointer in their records
+OBJECT_VECTORS = {
+    'infantry': (0xa83de8, 0x6c0),
+    'unit': (0x8b4108, 0x6c4),
+    'building': (0xa8eb40, 0x520),
+    'aircraft': (0xa8e390, 0x6c4),
+}
+
+# Fields shared by all techno records
+HEALTH_OFFSET = 0x6c  # int
+LOCATION_OFFSET = 0xac  # x, y, z ints in leptons, 256 per cell
+VETERANCY_OFFSET = 0x150  # float, 1.0 veteran and 2.0 elite
+OWNER_OFFSET = 0x21c  # HouseClass pointer
+TYPE_ID_OFFSET = 0x24  # char[25] ID of a TechnoTypeClass
+
+# Part of a record read every refresh: from health up to the type pointer, so that
+# objects whose memory was reused by a new object between refreshes are noticed
+DYNAMIC_START = HEALTH_OFFSET
+
+MAX_GAP = 4096  # Bytes of unused memory worth reading to save a read; a read costs far more than copying
+MAX_READ = 64 * 1024  # Largest single read
+
+
+def coalesce(addresses, start_offset, end_offset):
+    """Group the records at sorted addresses into [(read address, size, [addresses])] spans.
+
+    Records closer than MAX_GAP are read together, up to MAX_READ bytes at a time.
+    """
+    spans = []
+    for address in addresses:
+        start = address + start_offset
+        end = address + end_offset
+        if spans:
+            span_start, span_end, members = spans[-1]
+            if start - span_end <= MAX_GAP and end - span_start <= MAX_READ:
+                spans[-1] = (span_start, max(span_end, end), members)
+                members.append(address)
+                continue
+        spans.append((start, end, [address]))
+    return [(start, end - start, members) for start, end, members in spans]
+
+
+class ObjectTable:
+    """Every infantry, vehicle, building and aircraft in the game, as parallel arrays.
+
+    refresh() reads each object vector with one read for its header and one
+    for its pointer array, then reads the object records in coalesced spans
+    instead of one read per field per object. Every refresh reads health,
+    location, veterancy, type and owner of all objects in those spans; type
+    and owner are compared with the previous refresh, since the memory of a
+    destroyed object is often handed to a new one in between. Row i of every
+    array describes the same object, e.g.
+    (kinds[i], type_ids[i], owners[i], health[i], x[i], y[i]).
+
+    read(address, size) returns the bytes or None. It is passed in so the table
+    can run against a live process or against a memory image.
+    """
+
+    def __init__(self, read):
+        self.read = read
+        self.reads = 0  # Reads done by the last refresh
+        self.vector_state = {}  # kind -> (items address, count, raw pointer array)
+        self.static_info = {}  # (kind, object address) -> (type pointer, owner)
+        self.type_names = {}  # type pointer -> ID string
+        self.clear_rows()
+
+    def clear_rows(self):
+        self.addresses = array('I')
+        self.kinds = []
+        self.type_ids = array('I')  # Type pointers; type_name() turns them into IDs
+        self.owners = array('I')  # HouseClass addresses, compare with Player.real_class_base
+        self.veterancy = array('f')
+        self.health = array('i')
+        self.x = array('i')
+        self.y = array('i')
+        self.rows = {}  # object address -> row
+
+    def counted_read(self, address, size):
+        self.reads += 1
+        return self.read(address, size)
+
+    def read_spans(self, addresses, start_offset, end_offset):
+        """Yield (object address, data, offset of the object's record in data) for every readable record.
+
+        A span that cannot be read, e.g. because a gap in it is not mapped,
+        is retried one record at a time.
+        """
+        for span_address, size, members in coalesce(addresses, start_offset, end_offset):
+            data = self.counted_read(span_address, size)
+            if data is not None:
+                for address in members:
+                    yield address, data, address - span_address
+            elif len(members) > 1:
+                for address in members:
+                    data = self.counted_read(address + start_offset, end_offset - start_offset)
+                    if data is not None:
+                        yield address, data, -start_offset
+
+    def refresh(self):
+        """Bring the arrays up to date. Returns whether objects were created, destroyed or replaced."""
+        self.reads = 0
+        pointers = {}
+        changed = False
+        for kind, (vector_address, _) in OBJECT_VECTORS.items():
+            kind_pointers, kind_changed = self.read_vector(kind, vector_address)
+            pointers[kind] = kind_pointers
+            changed = changed or kind_changed
+
+        if changed:
+            self.rebuild(pointers)
+        reused = self.read_dynamic_fields()
+        return changed or reused
+
+    def read_vector(self, kind, vector_address):
+        """The object addresses of one vector, and whether they differ from the last refresh."""
+        header = self.counted_read(vector_address, VECTOR_HEADER_SIZE)
+        if header is None:
+            return [], kind in self.vector_state
+        _, items, capacity, _, count = VECTOR_HEADER.unpack_from(header)
+        if items == 0 or count == 0 or count > capacity:
+            raw = b''
+        else:
+            raw = self.counted_read(items, count * 4) or b''
+        previous = self.vector_state.get(kind)
+        self.vector_state[kind] = (items, count, raw)
+        object_pointers = list(struct.unpack(f'<{len(raw) // 4}I', raw))
+        return object_pointers, previous is None or previous[2] != raw
+
+    def rebuild(self, pointers):
+        """Rebuild the rows after objects were created or destroyed, reading the new ones."""
+        new_objects = []
+        for kind, kind_pointers in pointers.items():
+            new_objects.extend((address, kind) for address in kind_pointers if (kind, address) not in self.static_info)
+        self.read_static_fields(new_objects)
+
+        alive = set()
+        self.clear_rows()
+        for kind, kind_pointers in pointers.items():
+            for address in kind_pointers:
+                info = self.static_info.get((kind, address))
+                if info is None:
+                    self.vector_state.pop(kind, None)  # Its record could not be read, try again next time
+                    continue
+                alive.add((kind, address))
+                self.rows[address] = len(self.addresses)
+                self.addresses.append(address)
+                self.kinds.append(kind)
+                self.type_ids.append(info[0])
+                self.owners.append(info[1])
+                self.veterancy.append(0)
+                self.health.append(0)
+                self.x.append(0)
+                self.y.append(0)
+        # Forget destroyed objects, their memory will be reused
+        for key in [key for key in self.static_info if key not in alive]:
+            del self.static_info[key]
+
+    def read_static_fields(self, new_objects):
+        by_kind = {}
+        for address, kind in new_objects:
+            by_kind.setdefault(kind, []).append(address)
+        for kind, addresses in by_kind.items():
+            type_offset = OBJECT_VECTORS[kind][1]
+            start_offset = min(OWNER_OFFSET, type_offset)
+            end_offset = max(OWNER_OFFSET, type_offset) + 4
+            for address, data, base in self.read_spans(sorted(addresses), start_offset, end_offset):
+                type_pointer, = struct.unpack_from('<I', data, base + type_offset)
+                owner, = struct.unpack_from('<I', data, base + OWNER_OFFSET)
+                self.static_info[(kind, address)] = (type_pointer, owner)
+
+    def read_dynamic_fields(self):
+        """Read health, location and veterancy, and pick up objects that took over the memory
+        of a destroyed one. Returns whether any object was replaced that way."""
+        end_offset = max(max(type_offset for _, type_offset in OBJECT_VECTORS.values()), OWNER_OFFSET) + 4
+        reused = False
+        for address, data, base in self.read_spans(sorted(self.rows), DYNAMIC_START, end_offset):
+            row = self.rows[address]
+            self.health[row], = struct.unpack_from('<i', data, base + HEALTH_OFFSET)
+            self.x[row], self.y[row] = struct.unpack_from('<ii', data, base + LOCATION_OFFSET)
+            self.veterancy[row], = struct.unpack_from('<f', data, base + VETERANCY_OFFSET)
+            kind = self.kinds[row]
+            type_pointer, = struct.unpack_from('<I', data, base + OBJECT_VECTORS[kind][1])
+            owner, = struct.unpack_from('<I', data, base + OWNER_OFFSET)
+            if type_pointer != self.type_ids[row] or owner != self.owners[row]:
+                self.type_ids[row] = type_pointer
+                self.owners[row] = owner
+                self.static_info[(kind, address)] = (type_pointer, owner)
+                reused = True
+        return reused
+
+    def type_name(self, type_pointer):
+        """The ID of a type, e.g. "HTNK", read once per type."""
+        name = self.type_names.get(type_pointer)
+        if name is None:
+            data = self.counted_read(type_pointer + TYPE_ID_OFFSET, 25)
+            name = data.split(b'\x00', 1)[0].decode('ascii', errors='replace') if data else ''
+            self.type_names[type_pointer] = name
+        return name
+
+    def rows_of(self, owner):
+        """Rows of the objects owned by the HouseClass at owner."""
+        return [row for row, object_owner in enumerate(self.owners) if object_owner == owner]
@@ -0,0 +1,370 @@
+#OffsetProfiles.py
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from SignatureScanner import SignatureScanner
+
+PROFILES_DIR = 'profiles'  # Profiles shipped with the viewer
+DEFAULT_PROFILE_FILE = os.path.join(PROFILES_DIR, 'gamemd-1.001.json')
+LEARNED_PROFILES_DIR = os.path.join('cache', 'profiles')  # Profiles of builds that were scanned here
+EXE_HASH_CACHE_FILE = os.path.join('cache', 'exe_hashes.json')
+HASH_CHUNK_SIZE = 1024 * 1024
+
+UNIT_TABLES = ('infantry_offsets', 'tank_offsets', 'structure_offsets', 'aircraft_offsets')
+
+# Bounds of the live check in verify_profile()
+MAX_SLOTS = 8
+EMPTY_SLOT = 0xffffffff
+MAX_HOUSES = 256
+MAX_CREDITS = 100000000
+MAX_POWER = 100000
+MAX_FRAME = 15 * 60 * 60 * 24  # A day of game time
+MAX_COLOR_SCHEMES = 256
+MAX_UNIT_COUNT = 10000
+COUNTRY_NAME_SIZE = 25
+USERNAME_SIZE = 0x20
+UNIT_ARRAY_OFFSETS = ('INFOFFSET', 'TANKOFFSET', 'BUILDINGOFFSET', 'AIRCRAFTOFFSET')
+
+hash_lock = threading.Lock()
+known_hashes = None  # path -> {'size', 'mtime_ns', 'sha256'}, loaded from EXE_HASH_CACHE_FILE on first use
+profiles_by_hash = None  # load_profiles() result, loaded on first use and again after a profile is saved
+default_profile = None
+scanned_anchors = {}  # sha256 or path -> (found, ambiguous) of the signature scan, so a build is scanned once per run
+
+
+class OffsetProfile:
+    """The memory layout of one gamemd build: global addresses, HouseClass field
+    offsets, the object vectors and the unit count tables.
+
+    Profiles are JSON files. Numbers are written as hex strings, the way they
+    show up in a debugger, and converted to ints on load.
+    """
+
+    def __init__(self, name, sha256, addresses, field_offsets, object_vectors, unit_tables, path=None):
+        self.name = name
+        self.sha256 = list(sha256)  # Hashes of the executables this profile describes
+        self.addresses = addresses  # Player.py global -> address
+        self.field_offsets = field_offsets  # Player.py global -> offset
+        self.object_vectors = object_vectors  # kind -> (vector address, type pointer offset)
+        self.unit_tables = unit_tables  # table name -> {offset: unit name}
+        self.path = path
+
+    @classmethod
+    def from_json(cls, data, path=None):
+        return cls(
+            data['name'],
+            data.get('sha256', []),
+            {name: int(value, 16) for name, value in data['addresses'].items()},
+            {name: int(value, 16) for name, value in data['field_offsets'].items()},
+            {kind: (int(vector['address'], 16), int(vector['type_offset'], 16))
+             for kind, vector in data['object_vectors'].items()},
+            {table: {int(offset, 16): unit_name for offset, unit_name in data[table].items()} for table in UNIT_TABLES},
+            path,
+        )
+
+    def to_json(self):
+        data = {
+            'name': self.name,
+            'sha256': self.sha256,
+            'addresses': {name: f"{value:#x}" for name, value in self.addresses.items()},
+            'field_offsets': {name: f"{value:#x}" for name, value in self.field_offsets.items()},
+            'object_vectors': {kind: {'address': f"{address:#x}", 'type_offset': f"{type_offset:#x}"}
+                               for kind, (address, type_offset) in self.object_vectors.items()},
+        }
+        for table in UNIT_TABLES:
+            data[table] = {f"{offset:#x}": unit_name for offset, unit_name in self.unit_tables[table].items()}
+        return data
+
+    def with_anchors(self, anchors, name, sha256):
+        """A copy of this profile with the addresses and offsets a signature scan found."""
+        return OffsetProfile(
+            name, [sha256] if sha256 else [],
+            {name: anchors.get(name, value) for name, value in self.addresses.items()},
+            {name: anchors.get(name, value) for name, value in self.field_offsets.items()},
+            dict(self.object_vectors),
+            {table: dict(offsets) for table, offsets in self.unit_tables.items()},
+        )
+
+
+def load_profile(path):
+    with open(path, 'r') as file:
+        return OffsetProfile.from_json(json.load(file), path)
+
+
+def load_default_profile():
+    return load_profile(DEFAULT_PROFILE_FILE)
+
+
+def get_default_profile():
+    """The default profile, read from disk once."""
+    global default_profile
+    if default_profile is None:
+        default_profile = load_default_profile()
+    return default_profile
+
+
+def known_profiles():
+    """{sha256: profile} of the shipped and learned profiles, read from disk once."""
+    global profiles_by_hash
+    if profiles_by_hash is None:
+        profiles_by_hash = load_profiles()
+    return profiles_by_hash
+
+
+def load_profiles(directories=None):
+    """{sha256: profile} of every profile in directories. Shipped profiles win over learned ones."""
+    if directories is None:
+        directories = (PROFILES_DIR, LEARNED_PROFILES_DIR)
+    profiles = {}
+    for directory in reversed(directories):
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            continue
+        for file_name in names:
+            if not file_name.endswith('.json'):
+                continue
+            path = os.path.join(directory, file_name)
+            try:
+                profile = load_profile(path)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logging.warning(f"Ignoring offset profile {path}: {e}")
+                continue
+            for sha256 in profile.sha256:
+                profiles[sha256.lower()] = profile
+    return profiles
+
+
+def executable_hash(path):
+    """SHA-256 of the file at path, remembered across runs until its size or modification time changes."""
+    global known_hashes
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        logging.warning(f"Cannot hash the game executable {path}: {e}")
+        return None
+    key = os.path.normcase(os.path.abspath(path))
+    with hash_lock:
+        if known_hashes is None:
+            try:
+                with open(EXE_HASH_CACHE_FILE, 'r') as file:
+                    known_hashes = json.load(file)
+            except (OSError, ValueError):
+                known_hashes = {}
+        known = known_hashes.get(key)
+        if known and known.get('size') == stat.st_size and known.get('mtime_ns') == stat.st_mtime_ns:
+            return known['sha256']
+
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    except OSError as e:
+        logging.warning(f"Cannot hash the game executable {path}: {e}")
+        return None
+    sha256 = digest.hexdigest()
+
+    with hash_lock:
+        known_hashes[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+        write_json(EXE_HASH_CACHE_FILE, known_hashes)
+    return sha256
+
+
+def write_json(path, data):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(data, file, indent=4)
+    except OSError as e:
+        logging.warning(f"Could not write {path}: {e}")
+
+
+def read_int(read, address, signed=False):
+    data = read(address, 4)
+    if data is None:
+        return None
+    return int.from_bytes(data, 'little', signed=signed)
+
+
+def read_text(read, address, size, encoding):
+    """The NUL terminated string at address, or None if it is unreadable or not printable text."""
+    data = read(address, size) if address else None
+    if data is None:
+        return None
+    width = 2 if encoding == 'utf-16-le' else 1
+    end = next((index for index in range(0, len(data) - width + 1, width)
+                if data[index:index + width] == bytes(width)), len(data))
+    try:
+        text = data[:end].decode(encoding)
+    except UnicodeDecodeError:
+        return None
+    return text if text.isprintable() else None
+
+
+def verify_profile(profile, read, previous_frames=None):
+    """Check the values of profile that can be checked against the running game.
+
+    Returns {name: passed} of the checked values, or None while they cannot
+    be checked yet: the player slot table does not resolve to any HouseClass,
+    or the game frame has not advanced since previous_frames ({address:
+    value} read by an earlier check), e.g. during loading.
+    The slot table, the class base array and the slot offset are checked by
+    resolving the slots to HouseClass pointers; the HouseClass offsets by
+    reading sane values from every house found: numbers in range, printable
+    names and unit count arrays holding plausible counts.
+    """
+    addresses, offsets = profile.addresses, profile.field_offsets
+    fixed_point = read_int(read, addresses['FIXEDPOINTADDRESS'])
+    class_base_array = read_int(read, addresses['CLASSBASEARRAYADDRESS'])
+    if not fixed_point or not class_base_array:
+        return None
+    houses = []
+    for slot in range(MAX_SLOTS):
+        class_index = read_int(read, fixed_point + offsets['PLAYERSLOTSOFFSET'] + slot * 4)
+        if class_index is None or class_index == EMPTY_SLOT:
+            continue
+        if class_index >= MAX_HOUSES:
+            # Not a house index, so the slot table is not where the profile says
+            return dict.fromkeys(('FIXEDPOINTADDRESS', 'PLAYERSLOTSOFFSET'), False)
+        house = read_int(read, class_base_array + class_index * 4)
+        if not house:
+            return None  # Not created yet
+        if house % 4:
+            return {'CLASSBASEARRAYADDRESS': False}
+        houses.append(house)
+    if not houses:
+        return None
+
+    # The frame counter must be counting up
+    frame = read_int(read, addresses['CURRENTFRAMEADDRESS'])
+    previous_frame = (previous_frames or {}).get(addresses['CURRENTFRAMEADDRESS'])
+    if frame is not None and frame < MAX_FRAME and (previous_frame is None or frame == previous_frame):
+        return None
+
+    def all_houses(name, low, high):
+        values = [read_int(read, house + offsets[name], signed=True) for house in houses]
+        return all(value is not None and low <= value < high for value in values)
+
+    balances = [read_int(read, house + offsets['BALANCEOFFSET'], signed=True) for house in houses]
+    results = dict.fromkeys(('FIXEDPOINTADDRESS', 'CLASSBASEARRAYADDRESS', 'PLAYERSLOTSOFFSET'), True)
+    results['BALANCEOFFSET'] = (all(balance is not None and 0 <= balance < MAX_CREDITS for balance in balances)
+                                and any(balances))  # Every player starts with some money
+    results['CREDITSPENT_OFFSET'] = all_houses('CREDITSPENT_OFFSET', 0, MAX_CREDITS)
+    results['POWEROUTPUTOFFSET'] = all_houses('POWEROUTPUTOFFSET', 0, MAX_POWER)
+    results['POWERDRAINOFFSET'] = all_houses('POWERDRAINOFFSET', 0, MAX_POWER)
+    results['CURRENTFRAMEADDRESS'] = frame is not None and previous_frame is not None and previous_frame < frame < MAX_FRAME
+
+    # Not found by the signature scan, see SignatureScanner.NOT_SCANNED, but a wrong
+    # value still fails here, so the profile is not trusted or saved
+    results['COLORSCHEMEOFFSET'] = all_houses('COLORSCHEMEOFFSET', 0, MAX_COLOR_SCHEMES)
+    usernames = [read_text(read, house + offsets['USERNAMEOFFSET'], USERNAME_SIZE, 'utf-16-le') for house in houses]
+    results['USERNAMEOFFSET'] = all(name is not None for name in usernames) and any(usernames)
+    house_types = [read_int(read, house + offsets['HOUSETYPECLASSBASEOFFSET']) for house in houses]
+    results['HOUSETYPECLASSBASEOFFSET'] = all(house_type and house_type % 4 == 0 for house_type in house_types)
+    results['COUNTRYSTRINGOFFSET'] = results['HOUSETYPECLASSBASEOFFSET'] and all(
+        read_text(read, house_type + offsets['COUNTRYSTRINGOFFSET'], COUNTRY_NAME_SIZE, 'ascii')
+        for house_type in house_types)
+    for name in UNIT_ARRAY_OFFSETS:
+        # The arrays are allocated during loading; a house without one yet is not checked
+        arrays = [array for array in (read_int(read, house + offsets[name]) for house in houses) if array]
+        if arrays:
+            counts = [read_int(read, array, signed=True) if array % 4 == 0 else None for array in arrays]
+            results[name] = all(count is not None and 0 <= count < MAX_UNIT_COUNT for count in counts)
+    return results
+
+
+def select_profile(executable_path, read, allow_scan=True, frame_samples=None):
+    """(profile, verified) of the game build at executable_path.
+
+    A build with a profile is used as is, without reading the game. For any
+    other build the default profile is checked against the game first; if
+    it passes, the executable is remembered as that build. Otherwise the game
+    is signature scanned, once per build, and each value the default gets
+    wrong is replaced by the scanned one if that passes the check. Where a
+    signature matched several values, the only one that passes is used. The result
+    is saved as a learned profile only when every checked value passes.
+
+    verified is False while the values cannot be checked yet, e.g. early in
+    loading or before the frame counter was seen counting up; the profile is then the best guess and the caller should ask
+    again. allow_scan=False holds the scan back while the default profile
+    cannot be checked, so a known build is not scanned just for being early.
+    frame_samples is a dict the caller keeps for one game process; each call
+    compares the frame counter with what the previous call put there.
+    """
+    sha256 = executable_hash(executable_path) if executable_path else None
+    if sha256 is not None:
+        profile = known_profiles().get(sha256)
+        if profile is not None:
+            logging.info(f"Using offset profile {profile.name} for {executable_path}")
+            return profile, True
+
+    # Frames are compared with those of the previous call, which is a second or so earlier
+    if frame_samples is None:
+        frame_samples = {}
+    previous_frames = dict(frame_samples)
+
+    def check(profile):
+        frame_address = profile.addresses['CURRENTFRAMEADDRESS']
+        results = verify_profile(profile, read, previous_frames)
+        frame_samples[frame_address] = read_int(read, frame_address)
+        return results
+
+    default = get_default_profile()
+    default_results = check(default)
+    if default_results is not None and all(default_results.values()):
+        logging.info(f"{executable_path} checks out as {default.name}")
+        save_learned_profile(default.with_anchors({}, default.name, sha256), sha256)
+        return default, True
+    if default_results is None and not allow_scan:
+        return default, False
+
+    scan_key = sha256 or executable_path
+    if scan_key not in scanned_anchors:
+        scanner = SignatureScanner(read)
+        scanned_anchors[scan_key] = scanner.scan(), scanner.ambiguous
+    anchors, ambiguous = scanned_anchors[scan_key]
+    anchors = dict(anchors)
+    # A scanned value never replaces a default value that checked out
+    if default_results is not None:
+        anchors = {name: value for name, value in anchors.items() if not default_results.get(name)}
+        ambiguous = {name: values for name, values in ambiguous.items() if not default_results.get(name)}
+    profile_name = f"{os.path.basename(executable_path or 'gamemd')} {sha256[:12] if sha256 else 'unknown'}"
+    candidate = default.with_anchors(anchors, profile_name, sha256)
+    results = check(candidate)
+    if results is None:
+        return (default if default_results is None else candidate), False
+
+    # Signatures that matched several values: use the one value that passes the check, if there is exactly one
+    for name, values in ambiguous.items():
+        if results.get(name):
+            continue
+        passing = [value for value in values
+                   if (check(default.with_anchors({**anchors, name: value}, profile_name, sha256))
+                       or {}).get(name)]
+        if len(passing) == 1:
+            anchors[name] = passing[0]
+            candidate = default.with_anchors(anchors, profile_name, sha256)
+            results = check(candidate) or results
+
+    failed = [name for name, passed in results.items() if not passed]
+    if failed:
+        # Fall back to the defaults for scanned values that fail, and do not save anything
+        logging.warning(f"No working values for {failed} of {executable_path} yet")
+        return default.with_anchors({name: value for name, value in anchors.items() if name not in failed},
+                                    profile_name, sha256), False
+    save_learned_profile(candidate, sha256)
+    return candidate, True
+
+
+def save_learned_profile(profile, sha256):
+    global profiles_by_hash
+    if sha256 is None:
+        return
+    profile.path = os.path.join(LEARNED_PROFILES_DIR, f"{sha256}.json")
+    write_json(profile.path, profile.to_json())
+    profiles_by_hash = None  # Read again, with this one, by the next known_profiles()
+    logging.info(f"Saved offset profile {profile.name} to {profile.path}")
@@ -0,0 +1,93 @@
+#PersistenceService.py
+import json
+import logging
+import os
+import queue
+import threading
+
+from PySide6.QtCore import QObject, QTimer
+
+QUIET_PERIOD_MS = 1000  # Write once nothing has changed for this long
+
+
+def write_json_atomic(path, data):
+    """Write data as JSON to a temporary file and rename it over path, so a crash never leaves half a file."""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as file:
+        json.dump(data, file, indent=4)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+class PersistenceService(QObject):
+    """Saves settings files in the background while the HUD is being edited.
+
+    Each file is a section registered with a snapshot function. mark_dirty()
+    only flags the section and restarts the quiet period timer, so dragging a
+    window costs nothing per mouse move. When the timer fires, the dirty
+    sections are snapshotted on the GUI thread (a cheap copy) and a writer
+    thread serializes and writes them atomically. Sections that did not change
+    are not touched.
+    """
+
+    def __init__(self, quiet_period_ms=QUIET_PERIOD_MS, parent=None):
+        super().__init__(parent)
+        self.sections = {}  # name -> (path, snapshot function)
+        self.dirty = set()
+        self.queue = queue.Queue()  # (name, path, data) snapshots, None to stop
+        self.thread = threading.Thread(target=self.run, name="PersistenceWriter", daemon=True)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(quiet_period_ms)
+        self.timer.timeout.connect(self.flush)
+
+    def register(self, name, path, snapshot):
+        """Add a section. snapshot() must return a copy of the data that is safe to hand to another thread."""
+        self.sections[name] = (path, snapshot)
+
+    def start(self):
+        self.thread.start()
+
+    def mark_dirty(self, name):
+        self.dirty.add(name)
+        self.timer.start()  # Restarts the quiet period
+
+    def flush(self):
+        """Hand every dirty section to the writer thread now."""
+        self.timer.stop()
+        for name in self.dirty:
+            path, snapshot = self.sections[name]
+            self.queue.put((name, path, snapshot()))
+        self.dirty.clear()
+
+    def stop(self):
+        """Write whatever is pending and wait for the writer thread to finish."""
+        self.flush()
+        self.queue.put(None)
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def run(self):
+        running = True
+        while running:
+            pending = {}
+            item = self.queue.get()
+            # Coalesce everything queued so far, keeping the latest snapshot of each section
+            while True:
+                if item is None:
+                    running = False
+                else:
+                    pending[item[0]] = item
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            for name, path, data in pending.values():
+                try:
+                    write_json_atomic(path, data)
+                    logging.debug(f"Saved {name} to {path}")
+                except (OSError, TypeError, ValueError) as e:
+                    logging.error(f"Failed to save {name} to {path}: {e}")
@@ -1,75 +1,69 @@
 import ctypes
 import logging
+import time
 import traceback
+import zlib
 
 from PySide6.QtGui import QColor
 
-from common import COLOR_NAME_MAPPING, country_name_to_faction
+from Theme import PlayerTheme
+from EconomyStats import EconomyStats
+from ObjectEnumerator import ObjectTable, OBJECT_VECTORS
+from OffsetProfiles import get_default_profile, select_profile
+from TimeSeriesStore import TimeSeriesStore
+from common import COLOR_NAME_MAPPING, country_name_to_faction, data_lock
 
 # Constants
 MAXPLAYERS = 8
 INVALIDCLASS = 0xffffffff
 
-INFOFFSET = 0x557c
-AIRCRAFTOFFSET = 0x5590
-TANKOFFSET = 0x5568
-BUILDINGOFFSET = 0x5554
+# Addresses and offsets of the game build, see apply_profile()
+PROFILE = get_default_profile()
 
-CREDITSPENT_OFFSET = 0x2dc
-BALANCEOFFSET = 0x30c
-USERNAMEOFFSET = 0x1602a
-ISWINNEROFFSET = 0x1f7
-ISLOSEROFFSET = 0x1f8
+FIXEDPOINTADDRESS = PROFILE.addresses['FIXEDPOINTADDRESS']  # Holds the base of the player slot table
+CLASSBASEARRAYADDRESS = PROFILE.addresses['CLASSBASEARRAYADDRESS']  # Holds the HouseClass pointer array
+CURRENTFRAMEADDRESS = PROFILE.addresses['CURRENTFRAMEADDRESS']  # Global frame counter, only advances while the game runs
 
-POWEROUTPUTOFFSET = 0x53a4
-POWERDRAINOFFSET = 0x53a8
+INFOFFSET = PROFILE.field_offsets['INFOFFSET']
+AIRCRAFTOFFSET = PROFILE.field_offsets['AIRCRAFTOFFSET']
+TANKOFFSET = PROFILE.field_offsets['TANKOFFSET']
+BUILDINGOFFSET = PROFILE.field_offsets['BUILDINGOFFSET']
 
-HOUSETYPECLASSBASEOFFSET = 0x34
-COUNTRYSTRINGOFFSET = 0x24
+# Arrays next to the count arrays that hold an upper bound for each count, see read_and_store_inf_units_buildings()
+INFANTRYTESTOFFSET = PROFILE.field_offsets['INFANTRYTESTOFFSET']
+UNITTESTOFFSET = PROFILE.field_offsets['UNITTESTOFFSET']
+BUILDINGTESTOFFSET = PROFILE.field_offsets['BUILDINGTESTOFFSET']
+AIRCRAFTTESTOFFSET = PROFILE.field_offsets['AIRCRAFTTESTOFFSET']
 
-COLORSCHEMEOFFSET = 0x16054
+CREDITSPENT_OFFSET = PROFILE.field_offsets['CREDITSPENT_OFFSET']
+BALANCEOFFSET = PROFILE.field_offsets['BALANCEOFFSET']
+USERNAMEOFFSET = PROFILE.field_offsets['USERNAMEOFFSET']
+ISWINNEROFFSET = PROFILE.field_offsets['ISWINNEROFFSET']
+ISLOSEROFFSET = PROFILE.field_offsets['ISLOSEROFFSET']
 
-# Define the mappings of offsets to unit, infantry, and building names
-infantry_offsets = {
-    0x0: "GI", 0x4: "conscript", 0x8: "tesla trooper", 0xc: "Allied Engineer", 0x10: "Rocketeer",
-    0x14: "Navy Seal", 0x18: "Yuri Clone", 0x1c: "Ivan", 0x20: "Desolator", 0x24: "Soviet Dog",
-    0x3c: "Chrono Legionnaire", 0x40: "Spy", 0x50: "Yuri Prime", 0x54: "Sniper", 0x60: "Tanya",
-    0x6c: "Soviet Engineer", 0x68: "Terrorist", 0x70: "Allied Dog", 0xb4: "Yuri Engineer",
-    0xb8: "GGI", 0xbc: "Initiate", 0xc0: "Boris", 0xc4: "Brute", 0xc8: "Virus",
-}
+POWEROUTPUTOFFSET = PROFILE.field_offsets['POWEROUTPUTOFFSET']
+POWERDRAINOFFSET = PROFILE.field_offsets['POWERDRAINOFFSET']
 
-tank_offsets = {
-    0x0: "Allied MCV", 0x4: "War Miner", 0x8: "Apoc", 0x10: "Soviet Amphibious Transport", 0xc: "Rhino Tank",
-    0x24: "Grizzly", 0x34: "Aircraft Carrier", 0x38: "V3 Rocket Launcher", 0x3c: "Kirov",
-    0x40: "Terror Drone", 0x44: "Flak Track", 0x48: "Destroyer", 0x4c: "Typhoon attack sub", 0x50: "Aegis Cruiser",
-    0x54: "Allied Amphibious Transport", 0x58: "Dreadnought", 0x5c: "NightHawk Transport", 0x60: "Squid",
-    0x64: "Dolphin", 0x68: "Soviet MCV", 0x6c: "Tank Destroyer", 0x7c: "Lasher", 0x84: "Chrono Miner",
-    0x88: "Prism Tank", 0x90: "Sea Scorpion", 0x94: "Mirage Tank", 0x98: "IFV", 0xa4: "Demolition truck",
-    0xdc: "Yuri Amphibious Transport", 0xe0: "Yuri MCV", 0xe4: "Slave miner undeployed", 0xf0: "Gattling Tank",
-    0xf4: "Battle Fortress", 0xfc: "Chaos Drone", 0xf8: "Magnetron", 0x108: "Boomer", 0x10c: "Siege Chopper",
-    0x114: "Mastermind", 0x118: "Disc", 0x120: "Robot Tank",
-}
+HOUSETYPECLASSBASEOFFSET = PROFILE.field_offsets['HOUSETYPECLASSBASEOFFSET']
+COUNTRYSTRINGOFFSET = PROFILE.field_offsets['COUNTRYSTRINGOFFSET']
 
-structure_offsets = {
-    0x0: "Allied Power Plant", 0x4: "Allied Ore Refinery", 0x8: "Allied Con Yard", 0xc: "Allied Barracks",
-    0x14: "Allied service Depot", 0x18: "Allied Battle Lab", 0x1c: "Allied War Factory", 0x24: "Tesla Reactor",
-    0x28: "Sov Battle lab", 0x2c: "sov barracks", 0x34: "Sov Radar", 0x38: "Soviet War Factory",
-    0x3c: "Sov Ore Ref", 0x48: "Yuri Radar", 0x50: "Sentry Gun", 0x54: "Patriot Missile",
-    0x5c: "Allied Naval Yard", 0x60: "Iron Curtain", 0x64: "sov con yard", 0x68: "Sov Service Depot",
-    0x6c: "ChronoSphere", 0x74: "Weather Controller", 0xd4: "Tesla Coil", 0xd8: "Nuclear Missile Launcher",
-    0xf4: "Sov Naval Yard", 0xf8: "SpySat Uplink", 0xfc: "Gap Generator", 0x100: "Grand Cannon",
-    0x104: "Nuclear Reactor", 0x108: "PillBox", 0x10c: "Flak Cannon", 0x11c: "Oil", 0x120: "Cloning Vats",
-    0x124: "Ore Purifier", 0x1a4: "Allied AFC", 0x21c: "American AFC", 0x2dc: "Blitz oil (psychic sensor)",
-    0x4b0: "Yuri Con Yard", 0x4b4: "Bio Reactor", 0x4b8: "Yuri Barracks", 0x4bc: "Yuri War Factory",
-    0x4c0: "Yuri Naval Yard", 0x4c8: "Yuri Battle Lab", 0x4d0: "Gattling Cannon", 0x4d4: "Psychic Tower",
-    0x4d8: "Industrial Plant", 0x4dc: "Grinder", 0x4e0: "Genetic Mutator", 0x4ec: "Psychic dominator",
-    0x558: "Tank Bunker", 0x590: "Robot Control Center", 0x594: "Slave Miner Deployed", 0x59c: "Battle Bunker",
-}
+COLORSCHEMEOFFSET = PROFILE.field_offsets['COLORSCHEMEOFFSET']
 
-aircraft_offsets = {
-    0x4: "Harrier",
-    0x1c: "Black Eagle"
-}
+# HouseClass fields that hold 66, 0 and 90 once a player is fully loaded
+LOADCHECK1OFFSET = PROFILE.field_offsets['LOADCHECK1OFFSET']
+LOADCHECK2OFFSET = PROFILE.field_offsets['LOADCHECK2OFFSET']
+LOADCHECK3OFFSET = PROFILE.field_offsets['LOADCHECK3OFFSET']
+
+PLAYERSLOTSOFFSET = PROFILE.field_offsets['PLAYERSLOTSOFFSET']  # HouseClass index of each player slot, from fixedPoint
+
+GAME_FRAMES_PER_SECOND = 15  # Frames per game second at any game speed
+
+# Mappings of offsets to unit, infantry, and building names. apply_profile() refills them in place,
+# so modules that imported them keep seeing the current build.
+infantry_offsets = dict(PROFILE.unit_tables['infantry_offsets'])
+tank_offsets = dict(PROFILE.unit_tables['tank_offsets'])
+structure_offsets = dict(PROFILE.unit_tables['structure_offsets'])
+aircraft_offsets = dict(PROFILE.unit_tables['aircraft_offsets'])
 
 class ProcessExitedException(Exception):
     """Custom exception to indicate that the game process has exited."""
@@ -85,6 +79,7 @@ class Player:
         self.username = ctypes.create_unicode_buffer(0x20)
         self.color = ""
         self.color_name = ''
+        self.theme = None  # Prebuilt colors, pens and palettes, set together with the color
         self.country_name = ctypes.create_string_buffer(0x40)
 
         self.faction = 'Unknown'  # Add this attribute
@@ -104,6 +99,9 @@ class Player:
         self.building_counts = {}
         self.aircraft_counts = {}
 
+        self.economy = None  # Income, spend and army value, kept up to date by EconomyStats
+        self.fingerprint = None  # Identity of the HouseClass, see read_fingerprint()
+
         # Initialize pointers for arrays
         self.unit_array_ptr = None
         self.building_array_ptr = None
@@ -111,16 +109,87 @@ class Player:
         self.aircraft_array_ptr = None
 
         # Test case addresses
-        self.test_addresses = {
-            "infantry": self.real_class_base + 0x0b30,
-            "unit": self.real_class_base + 0x1338,
-            "building": self.real_class_base + 0x1b40,
-            "aircraft": self.real_class_base + 0x328
-        }
+        self.test_addresses = self.get_test_addresses()
 
         # Initialize the pointers by reading memory
         self.initialize_pointers()
 
+    def get_test_addresses(self):
+        return {
+            "infantry": self.real_class_base + INFANTRYTESTOFFSET,
+            "unit": self.real_class_base + UNITTESTOFFSET,
+            "building": self.real_class_base + BUILDINGTESTOFFSET,
+            "aircraft": self.real_class_base + AIRCRAFTTESTOFFSET
+        }
+
+    def read_identity(self):
+        """Read the color, country, faction and name. Returns False if any of them could not be read."""
+        i = self.index - 1
+
+        # Set the color
+        colorPtr = self.real_class_base + COLORSCHEMEOFFSET
+        color_data = read_process_memory(self.process_handle, colorPtr, 4)
+        if color_data is None:
+            logging.warning(f"Skipping color assignment for player {i} due to incomplete memory read.")
+            return False
+        color_scheme_value = ctypes.c_uint32.from_buffer_copy(color_data).value
+        self.color = get_color(color_scheme_value)
+        self.color_name = get_color_name(color_scheme_value)
+        self.theme = PlayerTheme(self.color)
+        logging.info(f"Player {i} color: {self.color_name}")
+
+        # Set the country name
+        houseTypeClassBasePtr = self.real_class_base + HOUSETYPECLASSBASEOFFSET
+        houseTypeClassBaseData = read_process_memory(self.process_handle, houseTypeClassBasePtr, 4)
+        if houseTypeClassBaseData is None:
+            logging.warning(f"Skipping country name assignment for player {i} due to incomplete memory read.")
+            return False
+        houseTypeClassBase = ctypes.c_uint32.from_buffer_copy(houseTypeClassBaseData).value
+        countryNamePtr = houseTypeClassBase + COUNTRYSTRINGOFFSET
+        country_data = read_process_memory(self.process_handle, countryNamePtr, 25)
+        if country_data is None:
+            logging.warning(f"Skipping country name assignment for player {i} due to incomplete memory read.")
+            return False
+        ctypes.memmove(self.country_name, country_data, 25)
+        country_name_str = self.country_name.value.decode('utf-8').strip('\x00')
+        logging.info(f"Player {i} country name: {country_name_str}")
+
+        # Set the faction based on the country name
+        self.faction = country_name_to_faction(country_name_str)
+        logging.info(f"Player {i} faction: {self.faction}")
+
+        # Set the username
+        userNamePtr = self.real_class_base + USERNAMEOFFSET
+        username_data = read_process_memory(self.process_handle, userNamePtr, 0x20)
+        if username_data is None:
+            logging.warning(f"Skipping username assignment for player {i} due to incomplete memory read.")
+            return False
+        ctypes.memmove(self.username, username_data, 0x20)
+        logging.info(f"Player {i} name: {self.username.value}")
+        return True
+
+    def read_fingerprint(self):
+        """A few identity bytes of the HouseClass: country pointer, color scheme and a hash of the name.
+
+        They change when the slot is reused by another match, long before anything
+        else notices. Returns None if they could not be read.
+        """
+        house_type_data = read_process_memory(self.process_handle, self.real_class_base + HOUSETYPECLASSBASEOFFSET, 4)
+        color_data = read_process_memory(self.process_handle, self.real_class_base + COLORSCHEMEOFFSET, 4)
+        username_data = read_process_memory(self.process_handle, self.real_class_base + USERNAMEOFFSET, 0x20)
+        if house_type_data is None or color_data is None or username_data is None:
+            return None
+        return house_type_data + color_data, zlib.crc32(username_data)
+
+    def rebase(self, real_class_base):
+        """Point this player at a (possibly new) HouseClass and re-read everything that depends on it."""
+        self.real_class_base = real_class_base
+        self.test_addresses = self.get_test_addresses()
+        self.initialize_pointers()
+        identity_read = self.read_identity()
+        self.fingerprint = self.read_fingerprint()
+        return identity_read
+
     def initialize_pointers(self):
         """ Initialize the pointers for the arrays of units, buildings, and infantry. """
         # Step 1: Read the pointer to the units array (use the TANKOFFSET)
@@ -283,13 +352,174 @@ class Player:
 class GameData:
     def __init__(self):
         self.players = []
+        self.history = TimeSeriesStore()  # What update_all_players() read, tick by tick
+        self.economy = EconomyStats()
+        self.frame = None  # Game frame of the last update
+        self.reinitialized = []  # Players the last update found in a new match
+        self.objects = None  # ObjectTable, only once track_objects() was called
 
     def add_player(self, player):
         self.players.append(player)
 
     def update_all_players(self):
+        """Read every player, unless the game frame has not advanced since the last update.
+
+        A paused, stalled or finished game costs one read per tick. Returns
+        whether the players were read.
+        """
+        frame = None
+        if self.players:
+            frame = read_game_frame(self.players[0].process_handle)
+            if frame is not None:
+                if frame == self.frame:
+                    return False
+                self.frame = frame
+        self.reinitialized = self.reinitialize_changed_players()
+        if self.reinitialized:
+            self.clear_history()  # The history belongs to the previous match
         for player in self.players:
             player.update_dynamic_data()
+        if self.objects is not None:
+            self.objects.refresh()
+        self.record(frame=frame)  # None if this read failed, never the frame of an older sample
+        return True
+
+    def track_objects(self):
+        """Also enumerate every object in the game on each update, for overlays that need
+        per-unit data. Returns the ObjectTable, or None before there are players.
+
+        Not called yet: no HUD element uses per-unit data so far, and the table
+        costs reads on every update, so it stays off until one does.
+        """
+        if self.objects is None and self.players:
+            process_handle = self.players[0].process_handle
+            self.objects = ObjectTable(lambda address, size: read_process_memory(process_handle, address, size))
+        return self.objects
+
+    def reinitialize_changed_players(self):
+        """Re-read the player slots once any HouseClass fingerprint changed, e.g. because the
+        same game process started a new match.
+
+        Every slot is scanned again, so a new match with more or other slots
+        gets its new players, and players whose slot is now empty are dropped.
+        Players whose slot still holds the same, unchanged HouseClass are kept
+        as they are. Returns the players that were re-read, added or dropped.
+        """
+        if not self.players:
+            return []
+        fingerprints = {player.index: player.read_fingerprint() for player in self.players}
+        if all(fingerprint is None or fingerprint == player.fingerprint
+               for player, fingerprint in zip(self.players, fingerprints.values())):
+            return []
+
+        logging.info("Player slots changed, scanning them again")
+        process_handle = self.players[0].process_handle
+        existing = {player.index: player for player in self.players}
+        kept = []
+        changed = []
+        for slot in range(MAXPLAYERS):
+            index = slot + 1
+            player = existing.get(index)
+            real_class_base = read_slot_class_base(process_handle, slot)
+            if real_class_base is None:
+                if player is not None:
+                    kept.append(player)  # Unreadable for now, try again on the next change
+                continue
+            if real_class_base == INVALIDCLASS:
+                if player is not None:
+                    logging.info(f"Player {index} left, its slot is empty now")
+                    changed.append(player)
+                continue
+            if player is None:
+                player = Player(index, process_handle, real_class_base)
+                if not player.read_identity():
+                    continue  # Not loaded yet, picked up by a later change
+                player.fingerprint = player.read_fingerprint()
+                logging.info(f"Player {index} joined")
+                changed.append(player)
+            elif real_class_base != player.real_class_base or fingerprints[index] != player.fingerprint:
+                logging.info(f"Player {index} changed, re-initializing it")
+                player.rebase(real_class_base)
+                changed.append(player)
+            kept.append(player)
+
+        with data_lock:
+            self.players[:] = kept  # In place, others hold on to this list
+        return changed
+
+    def record(self, timestamp=None, frame=None):
+        """Add the current player values to the history and the economy statistics.
+
+        Rates are computed in game time when the frame is known, so they do
+        not depend on the game speed setting.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        self.history.record(self.players, timestamp, frame)
+        if frame is not None:
+            self.economy.update(self.players, frame / GAME_FRAMES_PER_SECOND)
+        elif self.frame is None:
+            self.economy.update(self.players, timestamp)
+        # Otherwise the game time of this sample is unknown; the next readable frame covers it
+
+    def clear_history(self):
+        self.history.clear()
+        self.economy.clear()
+
+def read_slot_class_base(process_handle, slot):
+    """Address of the HouseClass of player slot, INVALIDCLASS if the slot is empty, or None if unreadable."""
+    fixedPointData = read_process_memory(process_handle, FIXEDPOINTADDRESS, 4)
+    classBaseArrayData = read_process_memory(process_handle, CLASSBASEARRAYADDRESS, 4)
+    if fixedPointData is None or classBaseArrayData is None:
+        return None
+    fixedPointValue = ctypes.c_uint32.from_buffer_copy(fixedPointData).value
+    classBaseArray = ctypes.c_uint32.from_buffer_copy(classBaseArrayData).value
+
+    memory_data = read_process_memory(process_handle, fixedPointValue + PLAYERSLOTSOFFSET + slot * 4, 4)
+    if memory_data is None:
+        return None
+    classBasePtr = ctypes.c_uint32.from_buffer_copy(memory_data).value
+    if classBasePtr == INVALIDCLASS:
+        return INVALIDCLASS
+    realClassBaseData = read_process_memory(process_handle, classBasePtr * 4 + classBaseArray, 4)
+    if realClassBaseData is None:
+        return None
+    return ctypes.c_uint32.from_buffer_copy(realClassBaseData).value
+
+def read_game_frame(process_handle):
+    frame_data = read_process_memory(process_handle, CURRENTFRAMEADDRESS, 4)
+    if frame_data is None:
+        return None
+    return ctypes.c_uint32.from_buffer_copy(frame_data).value
+
+def load_offset_profile(process_handle, executable_path, allow_scan=True, frame_samples=None):
+    """Switch to the profile of the running game build, scanning the game if the build is unknown.
+
+    Returns whether the profile was verified; if not, call again later in loading
+    with the same frame_samples dict, see select_profile().
+    """
+    profile, verified = select_profile(
+        executable_path, lambda address, size: read_process_memory(process_handle, address, size), allow_scan,
+        frame_samples)
+    apply_profile(profile)
+    return verified
+
+def apply_profile(profile):
+    global PROFILE
+    PROFILE = profile
+    module_globals = globals()
+    for name, value in list(profile.addresses.items()) + list(profile.field_offsets.items()):
+        if name in module_globals:
+            module_globals[name] = value
+        else:
+            logging.warning(f"Offset profile {profile.name} sets unknown value {name}")
+    for table, offsets in ((infantry_offsets, profile.unit_tables['infantry_offsets']),
+                           (tank_offsets, profile.unit_tables['tank_offsets']),
+                           (structure_offsets, profile.unit_tables['structure_offsets']),
+                           (aircraft_offsets, profile.unit_tables['aircraft_offsets']),
+                           (OBJECT_VECTORS, profile.object_vectors)):
+        table.clear()
+        table.update(offsets)
 
 def read_process_memory(process_handle, address, size):
     buffer = ctypes.create_string_buffer(size)
@@ -340,8 +570,8 @@ def get_color_name(color_scheme):
 def detect_if_all_players_are_loaded(process_handle):
     """Wait for players to be fully loaded before proceeding with initialization."""
     try:
-        fixedPoint = 0xa8b230
-        classBaseArrayPtr = 0xa8022c
+        fixedPoint = FIXEDPOINTADDRESS
+        classBaseArrayPtr = CLASSBASEARRAYADDRESS
 
         fixedPointData = read_process_memory(process_handle, fixedPoint, 4)
         if fixedPointData is None:
@@ -352,7 +582,7 @@ def detect_if_all_players_are_loaded(process_handle):
         classBaseArray = ctypes.c_uint32.from_buffer_copy(
             read_process_memory(process_handle, classBaseArrayPtr, 4)
         ).value
-        classBasePlayer = fixedPointValue + 1120 * 4
+        classBasePlayer = fixedPointValue + PLAYERSLOTSOFFSET
 
         for i in range(MAXPLAYERS):
             player_data = read_process_memory(process_handle, classBasePlayer, 4)
@@ -374,7 +604,7 @@ def detect_if_all_players_are_loaded(process_handle):
             realClassBase = ctypes.c_uint32.from_buffer_copy(realClassBaseData).value
 
             loaded = 0
-            right_values = {0x551c: 66, 0x5778: 0, 0x57ac: 90}
+            right_values = {LOADCHECK1OFFSET: 66, LOADCHECK2OFFSET: 0, LOADCHECK3OFFSET: 90}
             for offset, value in right_values.items():
                 ptr = realClassBase + offset
                 data = read_process_memory(process_handle, ptr, 4)
@@ -395,8 +625,8 @@ def initialize_players_after_loading(game_data, process_handle):
     """Initialize all players after detecting they are loaded."""
     game_data.players.clear()
 
-    fixedPoint = 0xa8b230
-    classBaseArrayPtr = 0xa8022c
+    fixedPoint = FIXEDPOINTADDRESS
+    classBaseArrayPtr = CLASSBASEARRAYADDRESS
 
     fixedPointData = read_process_memory(process_handle, fixedPoint, 4)
     if fixedPointData is None:
@@ -407,7 +637,7 @@ def initialize_players_after_loading(game_data, process_handle):
     classBaseArray = ctypes.c_uint32.from_buffer_copy(
         read_process_memory(process_handle, classBaseArrayPtr, 4)
     ).value
-    classbasearray = fixedPointValue + 1120 * 4
+    classbasearray = fixedPointValue + PLAYERSLOTSOFFSET
     valid_player_count = 0
 
     for i in range(MAXPLAYERS):
@@ -430,46 +660,9 @@ def initialize_players_after_loading(game_data, process_handle):
 
             realClassBase = ctypes.c_uint32.from_buffer_copy(realClassBaseData).value
             player = Player(i + 1, process_handle, realClassBase)
-
-            # Set the color
-            colorPtr = realClassBase + COLORSCHEMEOFFSET
-            color_data = read_process_memory(process_handle, colorPtr, 4)
-            if color_data is None:
-                logging.warning(f"Skipping color assignment for player {i} due to incomplete memory read.")
-                continue
-            color_scheme_value = ctypes.c_uint32.from_buffer_copy(color_data).value
-            player.color = get_color(color_scheme_value)
-            player.color_name = get_color_name(color_scheme_value)
-            logging.info(f"Player {i} color: {player.color_name}")
-
-            # Set the country name
-            houseTypeClassBasePtr = realClassBase + HOUSETYPECLASSBASEOFFSET
-            houseTypeClassBaseData = read_process_memory(process_handle, houseTypeClassBasePtr, 4)
-            if houseTypeClassBaseData is None:
-                logging.warning(f"Skipping country name assignment for player {i} due to incomplete memory read.")
-                continue
-            houseTypeClassBase = ctypes.c_uint32.from_buffer_copy(houseTypeClassBaseData).value
-            countryNamePtr = houseTypeClassBase + COUNTRYSTRINGOFFSET
-            country_data = read_process_memory(process_handle, countryNamePtr, 25)
-            if country_data is None:
-                logging.warning(f"Skipping country name assignment for player {i} due to incomplete memory read.")
-                continue
-            ctypes.memmove(player.country_name, country_data, 25)
-            country_name_str = player.country_name.value.decode('utf-8').strip('\x00')
-            logging.info(f"Player {i} country name: {country_name_str}")
-
-            # Set the faction based on the country name
-            player.faction = country_name_to_faction(country_name_str)
-            logging.info(f"Player {i} faction: {player.faction}")
-
-            # Set the username
-            userNamePtr = realClassBase + USERNAMEOFFSET
-            username_data = read_process_memory(process_handle, userNamePtr, 0x20)
-            if username_data is None:
-                logging.warning(f"Skipping username assignment for player {i} due to incomplete memory read.")
+            if not player.read_identity():
                 continue
-            ctypes.memmove(player.username, username_data, 0x20)
-            logging.info(f"Player {i} name: {player.username.value}")
+            player.fingerprint = player.read_fingerprint()
 
             game_data.add_player(player)
 
@@ -0,0 +1,220 @@
+#Replay.py
+import ctypes
+import logging
+import threading
+import time
+
+from PySide6.QtCore import QThread, Signal, Qt, QTimer
+from PySide6.QtGui import QColor
+from PySide6.QtWidgets import QWidget, QHBoxLayout, QPushButton, QComboBox, QSlider, QLabel
+
+from MatchRecorder import MatchRecording
+from Player import GameData
+from Theme import PlayerTheme
+
+REPLAY_SPEEDS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+MIN_SPEED, MAX_SPEED = REPLAY_SPEEDS[0], REPLAY_SPEEDS[-1]
+REPLAY_INTERVAL_MS = 10  # How often the replay clock advances
+MAX_CATCHUP_TICKS = 1000  # Larger jumps are treated as a seek instead of playing every tick
+
+
+class ReplayPlayer:
+    """A recorded player with the attributes the HUD reads from a live Player."""
+
+    def __init__(self, info):
+        self.index = info['index']
+        self.username = ctypes.create_unicode_buffer(info['username'], 0x20)
+        self.color = QColor(info['color'])
+        self.color_name = info['color_name']
+        self.theme = PlayerTheme(self.color)
+        self.country_name = ctypes.create_string_buffer(info['country_name'].encode('utf-8'), 0x40)
+        self.faction = info['faction']
+
+        self.is_winner = False
+        self.is_loser = False
+        self.balance = 0
+        self.spent_credit = 0
+        self.power_output = 0
+        self.power_drain = 0
+        self.power = 0
+        self.infantry_counts = {}
+        self.tank_counts = {}
+        self.building_counts = {}
+        self.aircraft_counts = {}
+        self.economy = None
+
+    def apply(self, values):
+        """Take over one recorded tick, as returned by MatchRecording.frame()."""
+        counts = {'infantry_counts': {}, 'tank_counts': {}, 'building_counts': {}, 'aircraft_counts': {}}
+        for column, value in values.items():
+            if isinstance(column, tuple):
+                counts[column[0]][column[1]] = value
+            else:
+                setattr(self, column, value)
+        self.is_winner = bool(self.is_winner)
+        self.is_loser = bool(self.is_loser)
+        self.power = self.power_output - self.power_drain
+        for field, field_counts in counts.items():
+            setattr(self, field, field_counts)
+
+
+class ReplayThread(QThread):
+    """Plays a match recording into the HUD, in place of DataUpdateThread.
+
+    The replay clock advances by the elapsed time times the speed. Every
+    recorded tick it passes is applied to the ReplayPlayers and to the
+    history of game_data, stamped with its recorded time, and then published
+    to the frame pump exactly like a live tick. Playback pauses at the end so
+    the match can still be seeked.
+    """
+    game_started = Signal()
+    game_stopped = Signal()
+
+    def __init__(self, path, frame_pump, speed=1):
+        super().__init__()
+        self.recording = MatchRecording(path)
+        self.frame_pump = frame_pump
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+
+        self.game_data = GameData()
+        for info in self.recording.players:
+            self.game_data.add_player(ReplayPlayer(info))
+        self.start_time = self.recording.header['start_time']
+
+        self.speed = clamp_speed(speed)
+        self.playing = True
+        self.position = 0.0  # Seconds into the recording
+        self.seek_target = None
+        if self.recording.tick_count:
+            self.apply_tick(0)  # So the HUD starts from the first tick, not from zeros
+        logging.info(f"Replaying {path}: {len(self.game_data.players)} players, "
+                     f"{self.recording.tick_count} ticks, {self.recording.duration():.0f} s")
+
+    def duration(self):
+        return self.recording.duration()
+
+    def set_speed(self, speed):
+        with self.lock:
+            self.speed = clamp_speed(speed)
+
+    def set_playing(self, playing):
+        with self.lock:
+            self.playing = playing
+
+    def seek(self, seconds):
+        with self.lock:
+            self.seek_target = min(max(0.0, seconds), self.duration())
+
+    def run(self):
+        self.setPriority(QThread.LowPriority)
+        if self.recording.tick_count == 0:
+            logging.warning(f"Match recording {self.recording.path} has no ticks")
+            return
+        self.game_started.emit()
+        shown_tick = None
+        last = time.monotonic()
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            with self.lock:
+                if self.seek_target is not None:
+                    self.position = self.seek_target
+                    self.seek_target = None
+                    shown_tick = None  # Start the history over from the new position
+                elif self.playing:
+                    self.position = min(self.position + (now - last) * self.speed, self.duration())
+            last = now
+
+            shown_tick = self.show(self.recording.tick_at(self.position), shown_tick)
+            QThread.msleep(REPLAY_INTERVAL_MS)
+
+        self.game_stopped.emit()
+        logging.info("Replay thread has exited.")
+
+    def show(self, tick, shown_tick):
+        """Bring the HUD from shown_tick to tick and return tick.
+
+        Ticks passed while playing are all applied, so the history has no gaps.
+        Going back, a jump of more than MAX_CATCHUP_TICKS, or shown_tick None
+        starts the history over at tick.
+        """
+        if shown_tick is None or tick < shown_tick or tick - shown_tick > MAX_CATCHUP_TICKS:
+            self.game_data.clear_history()
+            self.apply_tick(tick)
+            self.frame_pump.publish()
+        elif tick > shown_tick:
+            for passed_tick in range(shown_tick + 1, tick + 1):
+                self.apply_tick(passed_tick)
+            self.frame_pump.publish()
+        return tick
+
+    def apply_tick(self, tick):
+        seconds, frame = self.recording.frame(tick)
+        players = self.game_data.players
+        for player, values in zip(players, frame):
+            player.apply(values)
+        self.game_data.record(self.start_time + seconds)
+
+
+def clamp_speed(speed):
+    return min(max(MIN_SPEED, float(speed)), MAX_SPEED)
+
+
+def format_time(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+class ReplayControls(QWidget):
+    """Play/pause, speed and seek controls for a ReplayThread."""
+
+    def __init__(self, replay_thread, parent=None):
+        super().__init__(parent)
+        self.replay_thread = replay_thread
+        self.setWindowTitle("Replay")
+        self.setWindowFlags(self.windowFlags() | Qt.WindowStaysOnTopHint)
+
+        self.play_button = QPushButton("Pause")
+        self.play_button.clicked.connect(self.toggle_playing)
+
+        self.speed_combo = QComboBox()
+        for speed in REPLAY_SPEEDS:
+            self.speed_combo.addItem(f"{speed:g}x", speed)
+        self.speed_combo.setCurrentIndex(self.speed_index(replay_thread.speed))
+        self.speed_combo.currentIndexChanged.connect(
+            lambda index: self.replay_thread.set_speed(self.speed_combo.itemData(index)))
+
+        self.slider = QSlider(Qt.Horizontal)
+        self.slider.setRange(0, int(replay_thread.duration()))
+        self.slider.sliderReleased.connect(lambda: self.replay_thread.seek(self.slider.value()))
+
+        self.time_label = QLabel()
+
+        layout = QHBoxLayout()
+        layout.addWidget(self.play_button)
+        layout.addWidget(self.speed_combo)
+        layout.addWidget(self.slider)
+        layout.addWidget(self.time_label)
+        self.setLayout(layout)
+        self.resize(500, self.sizeHint().height())
+
+        # Follow the replay clock
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.update_position)
+        self.timer.start(250)
+        self.update_position()
+
+    @staticmethod
+    def speed_index(speed):
+        return min(range(len(REPLAY_SPEEDS)), key=lambda index: abs(REPLAY_SPEEDS[index] - speed))
+
+    def toggle_playing(self):
+        playing = not self.replay_thread.playing
+        self.replay_thread.set_playing(playing)
+        self.play_button.setText("Pause" if playing else "Play")
+
+    def update_position(self):
+        position = self.replay_thread.position
+        if not self.slider.isSliderDown():
+            self.slider.setValue(int(position))
+        self.time_label.setText(f"{format_time(position)} / {format_time(self.replay_thread.duration())}")
@@ -0,0 +1,75 @@
+#ResizePipeline.py
+import logging
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
+
+from CameoAtlas import get_atlas, set_wanted_atlas_size, evict_unwanted_atlases
+
+RESIZE_DEBOUNCE_MS = 250  # Wait this long after the last size change before rescaling properly
+
+
+class RescaleTask(QRunnable):
+    """Builds (or loads from the cache) the atlas of one size on a worker thread."""
+
+    def __init__(self, pipeline, size):
+        super().__init__()
+        self.pipeline = pipeline
+        self.size = size
+
+    def run(self):
+        get_atlas(self.size)
+        self.pipeline.atlas_ready.emit(self.size)
+
+
+class ResizePipeline(QObject):
+    """Turns bursts of size changes into one high-quality rescale per size.
+
+    While a size spinbox is being dragged, counters draw the nearest loaded
+    atlas stretched to the new size (a fast, unfiltered preview). The pipeline
+    waits until the size has settled, then smooth-scales the cameos into a new
+    atlas on the thread pool. atlas_ready is delivered on the GUI thread, where
+    unit windows swap every counter over to the new atlas in one pass.
+    """
+
+    atlas_ready = Signal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.requested = {}  # key -> latest requested size, e.g. one entry per unit window type
+        self.building = set()
+        self.atlas_ready.connect(self.on_atlas_ready)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(RESIZE_DEBOUNCE_MS)
+        self.timer.timeout.connect(self.start_rescale)
+
+    def request(self, key, size):
+        """Ask for the atlas of size. A later request with the same key replaces this one."""
+        self.requested[key] = size
+        set_wanted_atlas_size(key, size)
+        self.timer.start()  # Restarts the debounce interval
+
+    def start_rescale(self):
+        sizes = set(self.requested.values()) - self.building
+        self.requested.clear()
+        for size in sizes:
+            logging.debug(f"Rescaling cameos to {size} px")
+            self.building.add(size)
+            QThreadPool.globalInstance().start(RescaleTask(self, size))
+
+    def on_atlas_ready(self, size):
+        self.building.discard(size)
+        # Sizes passed while dragging, and the size before, are no longer needed
+        evict_unwanted_atlases(keep=self.building)
+
+
+resize_pipeline = None
+
+
+def get_resize_pipeline():
+    """Return the application-wide resize pipeline, creating it on first use."""
+    global resize_pipeline
+    if resize_pipeline is None:
+        resize_pipeline = ResizePipeline()
+    return resize_pipeline
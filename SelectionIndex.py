@@ -0,0 +1,147 @@
+#SelectionIndex.py
+import logging
+import weakref
+
+from common import names, factions, unit_types
+
+# What changed about a unit, passed to subscribers
+SELECTED, LOCKED, POSITION = 'selected', 'locked', 'position'
+
+
+def faction_bit(faction):
+    return 1 << factions.index(faction) if faction in factions else 0
+
+
+class SelectionIndex:
+    """The unit selection of unit_selection.json, compiled into flat per-unit arrays.
+
+    Every unit name gets an integer id. A unit that appears under several
+    factions (e.g. the Blitz oil) is selected if any of its entries is, and
+    locked for each faction whose entry is selected and locked. The nested
+    selected_units dict stays the saved form: changes are written through to it,
+    the version is bumped and subscribers are told which unit changed.
+    """
+
+    def __init__(self, selected_units):
+        self.selected_units = selected_units
+        self.version = 0
+        self.listeners = []  # Callables returning callback(unit_id, change), or None once it is gone
+        self.compile()
+
+    def compile(self):
+        self.unit_ids = {}  # unit_name -> id
+        self.unit_names = []
+        self.unit_types = []
+        self.entries = []  # id -> [(faction, unit_type)] the unit is listed under
+        self.faction_masks = []  # id -> bits of the factions that have the unit
+        self.selected = []
+        self.locked_factions = []  # id -> bits of the factions where the unit is selected and locked
+        self.positions = []
+
+        # Units in the saved selection first, so that counters keep their order
+        for faction, types in self.selected_units.items():
+            for unit_type, units in types.items():
+                for unit_name, unit_info in units.items():
+                    if isinstance(unit_info, bool):
+                        units[unit_name] = {'selected': unit_info, 'locked': False, 'position': -1}
+                    self.register(faction, unit_type, unit_name)
+        for faction in factions:
+            for unit_type in unit_types:
+                for unit_name in names[faction][unit_type]:
+                    self.register(faction, unit_type, unit_name)
+
+        for unit_id in range(len(self.unit_names)):
+            self.refresh(unit_id)
+        self.version += 1
+        logging.debug(f"Compiled unit selection index of {len(self.unit_names)} units")
+
+    def register(self, faction, unit_type, unit_name):
+        unit_id = self.unit_ids.get(unit_name)
+        if unit_id is None:
+            unit_id = len(self.unit_names)
+            self.unit_ids[unit_name] = unit_id
+            self.unit_names.append(unit_name)
+            self.unit_types.append(unit_type)
+            self.entries.append([])
+            self.faction_masks.append(0)
+            self.selected.append(False)
+            self.locked_factions.append(0)
+            self.positions.append(-1)
+        if (faction, unit_type) not in self.entries[unit_id]:
+            self.entries[unit_id].append((faction, unit_type))
+            self.faction_masks[unit_id] |= faction_bit(faction)
+        return unit_id
+
+    def unit_info(self, faction, unit_type, unit_name):
+        unit_info = self.selected_units.get(faction, {}).get(unit_type, {}).get(unit_name, {})
+        return unit_info if isinstance(unit_info, dict) else {'selected': unit_info}
+
+    def refresh(self, unit_id):
+        """Recompute the flags of one unit from its entries in the nested dict."""
+        unit_name = self.unit_names[unit_id]
+        selected = False
+        locked_factions = 0
+        position = -1
+        for faction, unit_type in self.entries[unit_id]:
+            unit_info = self.unit_info(faction, unit_type, unit_name)
+            if not unit_info.get('selected', False):
+                continue
+            if not selected:
+                position = unit_info.get('position', -1)
+            selected = True
+            if unit_info.get('locked', False):
+                locked_factions |= faction_bit(faction)
+        self.selected[unit_id] = selected
+        self.locked_factions[unit_id] = locked_factions
+        self.positions[unit_id] = position
+
+    def selected_ids(self):
+        return [unit_id for unit_id, selected in enumerate(self.selected) if selected]
+
+    def is_locked_for(self, unit_id, faction_mask):
+        return self.locked_factions[unit_id] & faction_mask != 0
+
+    def set_selected(self, faction, unit_type, unit_name, state):
+        self.update(faction, unit_type, unit_name, 'selected', state, SELECTED)
+
+    def set_locked(self, faction, unit_type, unit_name, state):
+        self.update(faction, unit_type, unit_name, 'locked', state, LOCKED)
+
+    def set_position(self, faction, unit_type, unit_name, position):
+        self.update(faction, unit_type, unit_name, 'position', position, POSITION)
+
+    def update(self, faction, unit_type, unit_name, key, value, change):
+        units = self.selected_units.setdefault(faction, {}).setdefault(unit_type, {})
+        unit_info = units.get(unit_name)
+        if not isinstance(unit_info, dict):
+            unit_info = {'selected': bool(unit_info), 'locked': False, 'position': -1}
+            units[unit_name] = unit_info
+        unit_info[key] = value
+
+        unit_id = self.register(faction, unit_type, unit_name)
+        self.refresh(unit_id)
+        self.version += 1
+        self.notify(unit_id, change)
+
+    def subscribe(self, callback, weak=True):
+        """Call callback(unit_id, change) after every change. Bound methods are held weakly by default."""
+        self.listeners.append(weakref.WeakMethod(callback) if weak else lambda: callback)
+
+    def notify(self, unit_id, change):
+        callbacks = [listener() for listener in self.listeners]
+        self.listeners = [listener for listener, callback in zip(self.listeners, callbacks) if callback is not None]
+        for callback in callbacks:
+            if callback is not None:
+                callback(unit_id, change)
+
+
+selection_index = None
+
+
+def get_selection_index(selected_units_dict):
+    """Return the index of selected_units_dict['selected_units'], compiling it on first use."""
+    global selection_index
+    selected_units = selected_units_dict.setdefault('selected_units', {})
+    if selection_index is None or selection_index.selected_units is not selected_units:
+        selection_index = SelectionIndex(selected_units)
+    return selection_index
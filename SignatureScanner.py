@@ -0,0 +1,214 @@
+#SignatureScanner.py
+import logging
+import re
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+IMAGE_BASE = 0x400000  # gamemd.exe is not relocated
+CHUNK_SIZE = 1024 * 1024
+SCAN_THREADS = 4
+MAX_FIELD_OFFSET = 0x20000  # A captured offset beyond this is not a HouseClass field
+MAX_CANDIDATES = 8  # An ambiguous signature with more values than this is dropped outright
+
+IMAGE_SCN_CNT_CODE = 0x20
+IMAGE_SCN_CNT_INITIALIZED_DATA = 0x40
+IMAGE_SCN_CNT_UNINITIALIZED_DATA = 0x80
+
+# name -> (pattern, offsets of the captured value in the match, kind)
+# ?? matches any byte. Each capture is a little endian 32 bit value; a signature
+# with several captures only matches where they are all equal, e.g. a load and a
+# store of the same global. Kind 'address' captures an absolute address, which
+# must lie in a data section; 'offset' captures a field offset. Every signature
+# must match exactly one value in the image; a few different values are kept as
+# candidates for the live check in OffsetProfiles.select_profile to choose from.
+#
+# The patterns are written from the known 1.001 layout but have not been run
+# against a real gamemd image yet. tests/test_signature_scanner.py checks them
+# against a real executable when GAMEMD_EXE points at one.
+SIGNATURES = {
+    # mov ecx, [fixedPoint]; mov eax, [ecx+eax*4+PlayerSlots]  (player slot -> HouseClass index)
+    'FIXEDPOINTADDRESS': ('8B 0D ?? ?? ?? ?? 8B 84 81 ?? ?? 00 00', (2,), 'address'),
+    'PLAYERSLOTSOFFSET': ('8B 0D ?? ?? ?? ?? 8B 84 81 ?? ?? 00 00', (9,), 'offset'),
+    # mov edx, [classBaseArray]; mov esi, [edx+eax*4]  (HouseClass index -> HouseClass)
+    'CLASSBASEARRAYADDRESS': ('8B 15 ?? ?? ?? ?? 8B 34 82 85 F6', (2,), 'address'),
+    # mov eax, [CurrentFrame]; inc eax; mov [CurrentFrame], eax
+    'CURRENTFRAMEADDRESS': ('A1 ?? ?? ?? ?? 40 A3 ?? ?? ?? ??', (1, 7), 'address'),
+    # mov eax, [esi+Balance]; sub eax, edi; mov [esi+Balance], eax  (HouseClass::TakeMoney)
+    'BALANCEOFFSET': ('8B 86 ?? ?? 00 00 2B C7 89 86 ?? ?? 00 00', (2, 10), 'offset'),
+    # add [esi+CreditsSpent], edi
+    'CREDITSPENT_OFFSET': ('01 BE ?? ?? 00 00 8B 86', (2,), 'offset'),
+    # mov eax, [ecx+PowerOutput]; mov edx, [ecx+PowerDrain]; sub eax, edx  (HouseClass::GetPowerPercentage)
+    'POWEROUTPUTOFFSET': ('8B 81 ?? ?? 00 00 8B 91 ?? ?? 00 00 2B C2', (2,), 'offset'),
+    'POWERDRAINOFFSET': ('8B 81 ?? ?? 00 00 8B 91 ?? ?? 00 00 2B C2', (8,), 'offset'),
+}
+
+# Values of the offset profile that have no signature. An unknown build keeps the
+# values of the default profile for these; OffsetProfiles.verify_profile checks
+# most of them against the running game, so a build where they moved is not trusted.
+NOT_SCANNED = (
+    'INFOFFSET', 'TANKOFFSET', 'BUILDINGOFFSET', 'AIRCRAFTOFFSET',
+    'INFANTRYTESTOFFSET', 'UNITTESTOFFSET', 'BUILDINGTESTOFFSET', 'AIRCRAFTTESTOFFSET',
+    'USERNAMEOFFSET', 'COLORSCHEMEOFFSET', 'HOUSETYPECLASSBASEOFFSET', 'COUNTRYSTRINGOFFSET',
+    'ISWINNEROFFSET', 'ISLOSEROFFSET', 'LOADCHECK1OFFSET', 'LOADCHECK2OFFSET', 'LOADCHECK3OFFSET',
+)
+
+
+def compile_pattern(pattern):
+    """Turn '8B 0D ?? ??' into a compiled bytes regex. Wildcards match any byte."""
+    parts = []
+    for token in pattern.split():
+        parts.append(b'.' if token == '??' else re.escape(bytes([int(token, 16)])))
+    return re.compile(b''.join(parts), re.DOTALL)
+
+
+def pattern_length(pattern):
+    return len(pattern.split())
+
+
+def pe_sections(read, image_base=IMAGE_BASE):
+    """[(name, address, size, characteristics)] of the sections of the PE image at image_base."""
+    dos_header = read(image_base, 0x40)
+    if dos_header is None or dos_header[:2] != b'MZ':
+        return []
+    pe_offset, = struct.unpack_from('<I', dos_header, 0x3c)
+    file_header = read(image_base + pe_offset, 24)
+    if file_header is None or file_header[:4] != b'PE\x00\x00':
+        return []
+    section_count, = struct.unpack_from('<H', file_header, 6)
+    optional_header_size, = struct.unpack_from('<H', file_header, 20)
+    table = read(image_base + pe_offset + 24 + optional_header_size, section_count * 40)
+    if table is None:
+        return []
+    sections = []
+    for index in range(section_count):
+        name, virtual_size, virtual_address = struct.unpack_from('<8sII', table, index * 40)
+        characteristics, = struct.unpack_from('<I', table, index * 40 + 36)
+        sections.append((name.rstrip(b'\x00').decode('ascii', errors='replace'),
+                         image_base + virtual_address, virtual_size, characteristics))
+    return sections
+
+
+def chunks(regions, overlap):
+    """Split (address, size) regions into CHUNK_SIZE pieces that overlap by overlap bytes,
+    so a match across a chunk boundary is seen by the next chunk."""
+    for address, size in regions:
+        start = address
+        end = address + size
+        while start < end:
+            chunk_end = min(end, start + CHUNK_SIZE)
+            yield start, min(end, chunk_end + overlap) - start
+            start = chunk_end
+
+
+class SignatureScanner:
+    """Finds the addresses and field offsets the reader needs in an unknown gamemd build.
+
+    The code and data sections are read in large overlapping chunks by a pool
+    of worker threads; reading the process releases the GIL, so reads overlap
+    with scanning. Each chunk is searched once per distinct pattern; all
+    signatures of that pattern are captured from the same matches. read(address, size) is passed in, so the scanner runs against a
+    live process or a synthetic image alike.
+    """
+
+    def __init__(self, read, signatures=None, image_base=IMAGE_BASE, threads=SCAN_THREADS):
+        self.read = read
+        self.signatures = SIGNATURES if signatures is None else signatures
+        self.image_base = image_base
+        self.threads = threads
+        # Signatures sharing a pattern capture different values of the same match, so
+        # each distinct pattern is searched once: pattern -> (regex, [(name, capture offsets)])
+        self.patterns = {}
+        for name, (pattern, capture_offsets, _) in self.signatures.items():
+            if pattern not in self.patterns:
+                self.patterns[pattern] = (compile_pattern(pattern), [])
+            self.patterns[pattern][1].append((name, capture_offsets))
+        self.overlap = max((pattern_length(pattern) for pattern in self.patterns), default=1) - 1
+        self.ambiguous = {}  # name -> sorted candidate values of signatures that matched several, after scan()
+
+    def scan(self):
+        """Return {name: value} of every signature that matched one unambiguous, plausible value."""
+        start = time.perf_counter()
+        self.ambiguous = {}
+        sections = pe_sections(self.read, self.image_base)
+        code = [(address, size) for _, address, size, flags in sections if flags & IMAGE_SCN_CNT_CODE]
+        data = [(address, size) for _, address, size, flags in sections
+                if flags & (IMAGE_SCN_CNT_INITIALIZED_DATA | IMAGE_SCN_CNT_UNINITIALIZED_DATA)]
+        if not code:
+            logging.warning("Signature scan found no code section in the game image")
+            return {}
+
+        candidates = {name: set() for name in self.signatures}
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            for matches in executor.map(self.scan_chunk, chunks(code, self.overlap)):
+                for name, value in matches:
+                    candidates[name].add(value)
+
+        found = {}
+        for name, values in candidates.items():
+            kind = self.signatures[name][2]
+            if kind == 'address':
+                values = {value for value in values if in_regions(value, data)}
+            else:
+                values = {value for value in values if 0 < value < MAX_FIELD_OFFSET}
+            if len(values) == 1:
+                found[name] = values.pop()
+            elif 1 < len(values) <= MAX_CANDIDATES:
+                self.ambiguous[name] = sorted(values)
+                logging.info(f"Signature {name}: candidates {[hex(value) for value in self.ambiguous[name]]}")
+            else:
+                logging.warning(f"Signature {name}: {len(values)} candidate values, not using it")
+        logging.info(f"Signature scan found {len(found)} of {len(self.signatures)} anchors "
+                     f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return found
+
+    def scan_chunk(self, chunk):
+        address, size = chunk
+        data = self.read(address, size)
+        if data is None:
+            return []
+        matches = []
+        for regex, captures in self.patterns.values():
+            # Step one byte at a time so that overlapping matches are all seen
+            position = 0
+            while True:
+                match = regex.search(data, position)
+                if match is None:
+                    break
+                for name, capture_offsets in captures:
+                    values = {struct.unpack_from('<I', data, match.start() + offset)[0] for offset in capture_offsets}
+                    if len(values) == 1:
+                        matches.append((name, values.pop()))
+                position = match.start() + 1
+        return matches
+
+
+def in_regions(address, regions):
+    return any(start <= address < start + size for start, size in regions)
+
+
+def image_file_reader(path, image_base=IMAGE_BASE):
+    """read(address, size) over the PE file at path, with its sections mapped the way the
+    loader maps them, so an executable on disk can be scanned like a running game."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    if data[:2] != b'MZ':
+        raise ValueError(f"{path} is not a PE image")
+    pe_offset, = struct.unpack_from('<I', data, 0x3c)
+    section_count, = struct.unpack_from('<H', data, pe_offset + 6)
+    optional_header_size, = struct.unpack_from('<H', data, pe_offset + 20)
+    table = pe_offset + 24 + optional_header_size
+    sections = [struct.unpack_from('<IIII', data, table + index * 40 + 8) for index in range(section_count)]
+    image = bytearray(max([virtual_address + max(virtual_size, raw_size)
+                           for virtual_size, virtual_address, raw_size, _ in sections] + [table + section_count * 40]))
+    image[:table + section_count * 40] = data[:table + section_count * 40]
+    for virtual_size, virtual_address, raw_size, raw_offset in sections:
+        raw = data[raw_offset:raw_offset + min(raw_size, virtual_size or raw_size)]
+        image[virtual_address:virtual_address + len(raw)] = raw
+
+    def read(address, size):
+        offset = address - image_base
+        if offset < 0 or offset + size > len(image):
+            return None
+        return bytes(image[offset:offset + size])
+    return read
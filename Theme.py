@@ -0,0 +1,72 @@
+#Theme.py
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QColor, QPen, QPalette, QFont, QFontDatabase
+
+# Caches keyed by QColor.rgba() so every color, pen and palette is only built once
+_palettes = {}
+_pens = {}
+_font_families = {}
+
+
+def to_qcolor(color):
+    """Convert a QColor, Qt.GlobalColor, (r, g, b) tuple or color string to a QColor."""
+    if isinstance(color, QColor):
+        return color
+    elif isinstance(color, tuple) and len(color) == 3:
+        return QColor(*color)
+    elif isinstance(color, (str, Qt.GlobalColor)):
+        return QColor(color)
+    else:
+        return QColor(Qt.red)  # Default color
+
+
+def text_palette(color):
+    """Return a shared palette that draws label text in the given color."""
+    color = to_qcolor(color)
+    palette = _palettes.get(color.rgba())
+    if palette is None:
+        palette = QPalette()
+        palette.setColor(QPalette.WindowText, color)
+        palette.setColor(QPalette.Text, color)
+        _palettes[color.rgba()] = palette
+    return palette
+
+
+def frame_pen(color, width):
+    """Return a shared pen for drawing unit counter frames."""
+    color = to_qcolor(color)
+    key = (color.rgba(), width)
+    pen = _pens.get(key)
+    if pen is None:
+        pen = QPen(color)
+        pen.setWidth(width)
+        _pens[key] = pen
+    return pen
+
+
+def application_font(path, fallback, point_size, weight=QFont.Bold):
+    """Create a font from an application font file, registering the file only once."""
+    if path not in _font_families:
+        font_id = QFontDatabase.addApplicationFont(path)
+        families = QFontDatabase.applicationFontFamilies(font_id)
+        _font_families[path] = families[0] if families else None
+    return QFont(_font_families[path] or fallback, point_size, weight)
+
+
+def number_font(point_size):
+    """The Futured font used for money and unit counts."""
+    return application_font("Other/Futured.ttf", "Arial", point_size)
+
+
+class PlayerTheme:
+    """Colors, pens and palettes of a single player, built once when the player is created."""
+
+    def __init__(self, color):
+        self.color = to_qcolor(color)
+        self.text_palette = text_palette(self.color)
+        self.white_palette = text_palette(Qt.white)
+        self.power_palette = text_palette(Qt.green)
+        self.low_power_palette = text_palette(Qt.red)
+
+    def frame_pen(self, width):
+        return frame_pen(self.color, width)
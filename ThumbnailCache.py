@@ -0,0 +1,89 @@
+#ThumbnailCache.py
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QFont, QImage, QPainter, QPixmap
+
+from AssetLoader import get_asset_loader, scale_image
+from common import name_to_path
+
+LOCK_ICON_PATH = 'lock_icon.png'
+LOCK_ICON_SIZE = 20
+THUMBNAIL_SIZE = 50  # Cameos are scaled to fit this square once, before shading
+
+# Per-channel lookup tables. Scaling R, G and B by the same factor is what
+# QColor.lighter(150) / darker(150) do to the value, without the per-pixel calls.
+LIGHTER = bytes(min(255, round(c * 1.5)) for c in range(256))
+DARKER = bytes(round(c / 1.5) for c in range(256))
+
+
+def shade_image(image, table):
+    """Return a copy of image with the color channels mapped through table, alpha untouched."""
+    image = image.convertToFormat(QImage.Format_RGBA8888)
+    width, height = image.width(), image.height()
+    pixels = image.constBits().tobytes()[:width * height * 4]
+    shaded = bytearray(pixels.translate(table))
+    shaded[3::4] = pixels[3::4]
+    return QImage(bytes(shaded), width, height, width * 4, QImage.Format_RGBA8888).copy()
+
+
+class ThumbnailCache:
+    """Unit selection thumbnails: the cameo lightened (selected) or darkened,
+    with the lock icon and position drawn on top.
+
+    Shared by every UnitSelectionWindow, so reopening the window, or toggling a
+    unit back to a state it was in before, does not redraw anything.
+    """
+
+    def __init__(self):
+        self.shaded = {}  # (unit_name, selected) -> QImage, scaled to THUMBNAIL_SIZE
+        self.pixmaps = {}  # (unit_name, selected, locked, position) -> QPixmap
+        self.lock_icon = None
+
+    def thumbnail(self, unit_name, selected, locked, position):
+        key = (unit_name, selected, locked, position)
+        pixmap = self.pixmaps.get(key)
+        if pixmap is None:
+            pixmap = self.render(unit_name, selected, locked, position)
+            self.pixmaps[key] = pixmap
+        return pixmap
+
+    def shaded_image(self, unit_name, selected):
+        image = self.shaded.get((unit_name, selected))
+        if image is None:
+            image = scale_image(get_asset_loader().image(name_to_path(unit_name)), THUMBNAIL_SIZE)
+            if not image.isNull():
+                image = shade_image(image, LIGHTER if selected else DARKER)
+            self.shaded[(unit_name, selected)] = image
+        return image
+
+    def render(self, unit_name, selected, locked, position):
+        image = self.shaded_image(unit_name, selected)
+        if image.isNull() or (not locked and position <= -1):
+            return QPixmap.fromImage(image)
+
+        image = image.copy()
+        painter = QPainter(image)
+        if locked:
+            painter.drawPixmap(0, 0, self.get_lock_icon())
+        if position > -1:
+            painter.setFont(QFont('Arial', 14))
+            painter.setPen(Qt.black if selected else Qt.white)
+            painter.drawText(1, image.height() - 1, str(position))
+        painter.end()
+        return QPixmap.fromImage(image)
+
+    def get_lock_icon(self):
+        if self.lock_icon is None:
+            self.lock_icon = QPixmap(LOCK_ICON_PATH).scaled(
+                LOCK_ICON_SIZE, LOCK_ICON_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        return self.lock_icon
+
+
+thumbnail_cache = None
+
+
+def get_thumbnail_cache():
+    """Return the application-wide thumbnail cache, creating it on first use."""
+    global thumbnail_cache
+    if thumbnail_cache is None:
+        thumbnail_cache = ThumbnailCache()
+    return thumbnail_cache
@@ -0,0 +1,159 @@
+#TimeSeriesStore.py
+import logging
+import time
+from array import array
+
+SCALAR_FIELDS = ('balance', 'spent_credit', 'power_output', 'power_drain')
+COUNT_FIELDS = ('infantry_counts', 'tank_counts', 'building_counts', 'aircraft_counts')
+
+DEFAULT_MEMORY_BUDGET = 32 * 1024 * 1024  # Bytes for all players together
+DEFAULT_MAX_SAMPLES = 2 * 60 * 60  # Two hours at one tick per second
+
+TIME_TYPECODE = 'd'
+FRAME_TYPECODE = 'q'  # Game frame of each sample, -1 if it is not known
+SCALAR_TYPECODE = 'q'  # Balances are unsigned 32 bit and power can go negative
+COUNT_TYPECODE = 'I'
+
+
+def zeroed_array(typecode, length):
+    return array(typecode, bytes(array(typecode).itemsize * length))
+
+
+class PlayerSeries:
+    """The history of one player: timestamp and game frame rings plus one ring per column, all sharing one head.
+
+    Scalar fields are columns named after the field. Unit counts are columns
+    named (count_field, unit_name), created the first time the unit shows up;
+    earlier samples of a new column read as zero. Appending overwrites the
+    oldest sample once the ring is full, so it is O(1) in the length of the
+    history and never allocates after the columns exist.
+    """
+
+    def __init__(self, capacity, store):
+        self.capacity = capacity
+        self.store = store
+        self.head = 0  # Index of the next sample to write
+        self.length = 0
+        self.times = zeroed_array(TIME_TYPECODE, capacity)
+        self.frames = zeroed_array(FRAME_TYPECODE, capacity)
+        self.columns = {}
+        for field in SCALAR_FIELDS:
+            self.columns[field] = zeroed_array(SCALAR_TYPECODE, capacity)
+        self.count_columns = {field: {} for field in COUNT_FIELDS}  # field -> {unit_name: column}
+
+    def append(self, timestamp, frame, player):
+        index = self.head
+        self.times[index] = timestamp
+        self.frames[index] = frame if frame is not None else -1
+        columns = self.columns
+        for field in SCALAR_FIELDS:
+            columns[field][index] = getattr(player, field)
+
+        for field in COUNT_FIELDS:
+            counts = getattr(player, field) or {}
+            field_columns = self.count_columns[field]
+            for unit_name in counts:
+                if unit_name not in field_columns:
+                    self.add_column(field, unit_name)
+            # Units missing from this tick count as zero
+            for unit_name, column in field_columns.items():
+                column[index] = counts.get(unit_name, 0)
+
+        self.head = (index + 1) % self.capacity
+        if self.length < self.capacity:
+            self.length += 1
+
+    def add_column(self, field, unit_name):
+        if not self.store.reserve(array(COUNT_TYPECODE).itemsize * self.capacity):
+            return
+        column = zeroed_array(COUNT_TYPECODE, self.capacity)
+        self.count_columns[field][unit_name] = column
+        self.columns[(field, unit_name)] = column
+
+    def order(self):
+        """Ring indexes of the stored samples, oldest first."""
+        start = (self.head - self.length) % self.capacity
+        return [(start + offset) % self.capacity for offset in range(self.length)]
+
+    def timestamps(self):
+        return [self.times[index] for index in self.order()]
+
+    def game_frames(self):
+        return [self.frames[index] for index in self.order()]
+
+    def values(self, field, unit_name=None):
+        """Samples of a field, oldest first. Counts of a unit that was never seen are all zero."""
+        column = self.columns.get(field if unit_name is None else (field, unit_name))
+        if column is None:
+            return [0] * self.length
+        return [column[index] for index in self.order()]
+
+
+class TimeSeriesStore:
+    """Bounded in-memory history of every player's economy and unit counts.
+
+    GameData.update_all_players() records one sample per player per tick.
+    Graphs, rates and post-match summaries read from here instead of each
+    keeping their own history. The ring capacity is fixed on the first
+    sample, from the memory budget and the number of players, so the store
+    never grows past the budget; unit columns that would not fit are dropped.
+    """
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET, max_samples=DEFAULT_MAX_SAMPLES):
+        self.memory_budget = memory_budget
+        self.max_samples = max_samples
+        self.series = {}  # player index -> PlayerSeries
+        self.used = 0
+        self.capacity = None
+        self.budget_warning_logged = False
+
+    def record(self, players, timestamp=None, frame=None):
+        if timestamp is None:
+            timestamp = time.time()
+        if self.capacity is None and players:
+            self.capacity = self.capacity_for(players)
+            logging.debug(f"Time series store keeps {self.capacity} samples per player")
+        for player in players:
+            series = self.series.get(player.index)
+            if series is None:
+                series = self.add_series(player.index)
+                if series is None:
+                    continue
+            series.append(timestamp, frame, player)
+
+    def capacity_for(self, players):
+        """Samples per player that fit the budget if every unit currently counted gets a column."""
+        columns = max(sum(len(getattr(player, field) or {}) for field in COUNT_FIELDS) for player in players)
+        sample_bytes = (array(TIME_TYPECODE).itemsize + array(FRAME_TYPECODE).itemsize
+                        + array(SCALAR_TYPECODE).itemsize * len(SCALAR_FIELDS)
+                        + array(COUNT_TYPECODE).itemsize * columns)
+        return max(1, min(self.max_samples, self.memory_budget // (sample_bytes * len(players))))
+
+    def add_series(self, player_index):
+        fixed_bytes = (array(TIME_TYPECODE).itemsize + array(FRAME_TYPECODE).itemsize
+                       + array(SCALAR_TYPECODE).itemsize * len(SCALAR_FIELDS)) * self.capacity
+        if not self.reserve(fixed_bytes):
+            return None
+        series = PlayerSeries(self.capacity, self)
+        self.series[player_index] = series
+        return series
+
+    def reserve(self, nbytes):
+        """Account for nbytes of new arrays. Returns False, and logs once, if they would exceed the budget."""
+        if self.used + nbytes > self.memory_budget:
+            if not self.budget_warning_logged:
+                logging.warning(f"Time series store is at its memory budget of {self.memory_budget} bytes, "
+                                f"dropping new columns")
+                self.budget_warning_logged = True
+            return False
+        self.used += nbytes
+        return True
+
+    def get(self, player_index):
+        return self.series.get(player_index)
+
+    def clear(self):
+        self.series.clear()
+        self.used = 0
+        self.capacity = None
+        self.budget_warning_logged = False
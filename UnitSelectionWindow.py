@@ -2,20 +2,20 @@
 import json
 import logging
 import os
-from idlelib.debugger_r import frametable
 
-from PySide6.QtGui import QPixmap, QImage, QAction, QPainter, QFont
+from PySide6.QtGui import QAction
 from PySide6.QtWidgets import QMainWindow, QWidget, QTabWidget, QVBoxLayout, QGridLayout, QPushButton, QLabel, QMenu, \
     QInputDialog
 from PySide6.QtCore import Qt
 
-from common import (names, name_to_path, factions, unit_types)
+from SelectionIndex import get_selection_index
+from ThumbnailCache import get_thumbnail_cache
+from common import (names, factions, unit_types)
 
 
 class UnitSelectionWindow(QMainWindow):
-    def __init__(self, selected_units_dict, hud_windows, parent=None):
+    def __init__(self, selected_units_dict, parent=None):
         super().__init__(parent)
-        self.hud_windows = hud_windows
 
         # Ensure 'selected_units' key exists in selected_units_dict
         if 'selected_units' not in selected_units_dict:
@@ -24,6 +24,8 @@ class UnitSelectionWindow(QMainWindow):
 
         # Migrate units data to new format if necessary
         self.migrate_units_data()
+        # Changes go through the index, which notifies the unit windows
+        self.selection = get_selection_index(selected_units_dict)
 
         self.setWindowTitle("Unit Selection")
         self.setGeometry(200, 200, 400, 300)
@@ -40,6 +42,9 @@ class UnitSelectionWindow(QMainWindow):
         layout.addWidget(self.tab_widget)
 
     def create_faction_tabs(self):
+        """Create the faction and unit type tabs. A sub-tab's units are only added when it is first shown."""
+        self.sub_tab_widgets = []
+        self.unbuilt_sub_tabs = {}  # sub_tab widget -> (faction, unit_type)
         for faction in factions:
             faction_tab = QWidget()
             faction_layout = QVBoxLayout(faction_tab)
@@ -47,60 +52,67 @@ class UnitSelectionWindow(QMainWindow):
             # Create sub-tabs (Infantry, Structure, Tank, Naval, Aircraft)
             sub_tab_widget = QTabWidget()
             self.create_sub_tabs(faction, sub_tab_widget)
+            sub_tab_widget.currentChanged.connect(self.build_current_sub_tab)
+            self.sub_tab_widgets.append(sub_tab_widget)
 
             faction_layout.addWidget(sub_tab_widget)
             self.tab_widget.addTab(faction_tab, faction)
+        self.tab_widget.currentChanged.connect(self.build_current_sub_tab)
+        self.build_current_sub_tab()
 
     def create_sub_tabs(self, faction, sub_tab_widget):
-        """Create sub-tabs and populate them with units if available."""
+        """Create empty sub-tabs, to be populated by populate_sub_tab()."""
         for unit_type in unit_types:
             sub_tab = QWidget()
             sub_layout = QGridLayout(sub_tab)  # Use QGridLayout for grid arrangement
             sub_layout.setAlignment(Qt.AlignTop)  # Align everything at the top of the tab
-
-            # Check if there are any units defined for this faction and unit type
-            units = names[faction][unit_type]
-
-            # Only add the units that have been defined (otherwise keep the tab empty)
-            row = 0
-            col = 0
-            for unit in units:
-                # Create a vertical layout for each unit (image acts as checkbox)
-                unit_layout = QVBoxLayout()
-                unit_layout.setAlignment(Qt.AlignTop | Qt.AlignHCenter)
-
-                # Create image label and set it as clickable
-                image_label = QLabel()
-                image_path = name_to_path(unit)  # Ensure image path is available
-                image_label.setProperty("image_path", image_path)  # Store the image path
-                pixmap = QPixmap(image_path)
-                if not pixmap.isNull():
-                    image_label.setPixmap(pixmap.scaled(50, 50, Qt.KeepAspectRatio))
-
-                # Set selection state and connect click event
-                is_selected = self.is_unit_selected(faction, unit_type, unit)
-                is_locked = self.is_unit_locked(faction, unit_type, unit)
-                position = self.get_unit_position(faction, unit_type, unit)
-                self.update_image_selection(image_label, is_selected, is_locked, position)
-
-                # Add event handling to the label
-                image_label.mousePressEvent = lambda event, f=faction, ut=unit_type, u=unit, label=image_label: self.unit_image_mousePressEvent(event, f, ut, u, label)
-
-
-                # Add the image label to the unit's layout
-                unit_layout.addWidget(image_label, alignment=Qt.AlignHCenter)
-
-                # Add the unit layout to the grid layout
-                sub_layout.addLayout(unit_layout, row, col)
-
-                # Update row and column for the grid (e.g., 3 columns per row)
-                col += 1
-                if col >= 3:  # You can adjust the number of columns here
-                    col = 0
-                    row += 1
-
+            self.unbuilt_sub_tabs[sub_tab] = (faction, unit_type)
             sub_tab_widget.addTab(sub_tab, unit_type)
 
+    def build_current_sub_tab(self, _index=None):
+        sub_tab_widget = self.sub_tab_widgets[self.tab_widget.currentIndex()]
+        sub_tab = sub_tab_widget.currentWidget()
+        if sub_tab in self.unbuilt_sub_tabs:
+            faction, unit_type = self.unbuilt_sub_tabs.pop(sub_tab)
+            self.populate_sub_tab(sub_tab, faction, unit_type)
+
+    def populate_sub_tab(self, sub_tab, faction, unit_type):
+        """Add a clickable thumbnail for every unit of this faction and unit type."""
+        sub_layout = sub_tab.layout()
+        units = names[faction][unit_type]
+
+        row = 0
+        col = 0
+        for unit in units:
+            # Create a vertical layout for each unit (image acts as checkbox)
+            unit_layout = QVBoxLayout()
+            unit_layout.setAlignment(Qt.AlignTop | Qt.AlignHCenter)
+
+            # Create image label and set it as clickable
+            image_label = QLabel()
+            image_label.setProperty("unit_name", unit)
+
+            # Set selection state and connect click event
+            is_selected = self.is_unit_selected(faction, unit_type, unit)
+            is_locked = self.is_unit_locked(faction, unit_type, unit)
+            position = self.get_unit_position(faction, unit_type, unit)
+            self.update_image_selection(image_label, is_selected, is_locked, position)
+
+            # Add event handling to the label
+            image_label.mousePressEvent = lambda event, f=faction, ut=unit_type, u=unit, label=image_label: self.unit_image_mousePressEvent(event, f, ut, u, label)
+
+            # Add the image label to the unit's layout
+            unit_layout.addWidget(image_label, alignment=Qt.AlignHCenter)
+
+            # Add the unit layout to the grid layout
+            sub_layout.addLayout(unit_layout, row, col)
+
+            # Update row and column for the grid (e.g., 3 columns per row)
+            col += 1
+            if col >= 3:  # You can adjust the number of columns here
+                col = 0
+                row += 1
+
     def is_unit_selected(self, faction, unit_type, unit):
         unit_info = self.units_data.get(faction, {}).get(unit_type, {}).get(unit, {})
 
@@ -181,82 +193,29 @@ class UnitSelectionWindow(QMainWindow):
 
     def handle_position_change(self, position, faction, unit_type, unit_name, label):
         try:
-            unit_info = self.units_data.setdefault(faction, {}).setdefault(unit_type, {}).setdefault(unit_name, {})
-            unit_info['position'] = position
-            print(f"Position of {unit_name} in {unit_type} ({faction}) set to: {position}")
+            self.selection.set_position(faction, unit_type, unit_name, position)
+            logging.debug(f"Position of {unit_name} in {unit_type} ({faction}) set to: {position}")
             # Update the image appearance
             self.update_image_selection(label, self.is_unit_selected(faction, unit_type, unit_name), self.is_unit_locked(faction, unit_type, unit_name), self.get_unit_position(faction, unit_type, unit_name))
 
-            # Update the widget
-            for unit_counter, _ in self.hud_windows:
-                if isinstance(unit_counter, tuple):
-                    for uc in unit_counter:
-                        uc.update_position_widgets(faction, unit_type, unit_name)
-                else:
-                    unit_counter.update_position_widgets(faction, unit_type, unit_name)
-
         except KeyError:
-            print(f"Error: Unit '{unit_name}' of type '{unit_type}' in faction '{faction}' not found.")
+            logging.warning(f"Unit '{unit_name}' of type '{unit_type}' in faction '{faction}' not found.")
 
 
     def update_image_selection(self, label, is_selected, is_locked, position):
-        # Get the image path from the label's property
-        image_path = label.property("image_path")
-        if not image_path:
-            return
-        # Load the original pixmap
-        pixmap = QPixmap(image_path)
-        if pixmap.isNull():
+        unit_name = label.property("unit_name")
+        if not unit_name:
             return
-        # Modify the pixmap
-        image = pixmap.toImage()
-        # Modify brightness based on selection
-        for x in range(image.width()):
-            for y in range(image.height()):
-                color = image.pixelColor(x, y)
-                color = color.lighter(150) if is_selected else color.darker(150)
-                image.setPixelColor(x, y, color)
-        # Overlay a lock icon if locked
-        if is_locked:
-            painter = QPainter()
-            painter.begin(image)
-            lock_icon = QPixmap('lock_icon.png')  # Ensure this path is correct
-            lock_icon = lock_icon.scaled(20, 20, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            painter.drawPixmap(0, 0, lock_icon)
-            painter.end()
-
-        # Overlay a lock icon if locked
-        if position > -1:
-            painter = QPainter(image)  # Pass the image to QPainter directly
-            painter.setFont(QFont('Arial', 14))  # Set the font and size
-
-            if is_selected:
-                painter.setPen(Qt.black)  # Set the text color
-            else:
-                painter.setPen(Qt.white)  # Set the text color
-
-
-            # Draw the position value
-            painter.drawText(1, image.height()-1, str(position))  # Adjust the position as needed
-
-            painter.end()  # Finalize the drawing
-        label.setPixmap(QPixmap.fromImage(image))
+        pixmap = get_thumbnail_cache().thumbnail(unit_name, is_selected, is_locked, position)
+        if not pixmap.isNull():
+            label.setPixmap(pixmap)
 
     def toggle_unit_lock(self, faction, unit_type, unit_name, label):
-        unit_info = self.units_data.setdefault(faction, {}).setdefault(unit_type, {}).setdefault(unit_name, {})
-        current_state = unit_info.get('locked', False)
-        new_state = not current_state
-        unit_info['locked'] = new_state
+        new_state = not self.is_unit_locked(faction, unit_type, unit_name)
+        self.selection.set_locked(faction, unit_type, unit_name, new_state)
         logging.debug(f'{unit_name} lock state changed to {new_state}')
         # Update the image appearance
         self.update_image_selection(label, self.is_unit_selected(faction, unit_type, unit_name), new_state, self.get_unit_position(faction, unit_type, unit_name))
-        # Update the unit counters
-        for unit_counter, _ in self.hud_windows:
-            if isinstance(unit_counter, tuple):
-                for uc in unit_counter:
-                    uc.update_locked_widgets(faction, unit_type, unit_name, new_state)
-            else:
-                unit_counter.update_locked_widgets(faction, unit_type, unit_name, new_state)
 
     def toggle_unit_selection(self, faction, unit_type, unit_name, label):
         """Toggle unit selection and update the appearance."""
@@ -265,21 +224,12 @@ class UnitSelectionWindow(QMainWindow):
 
         logging.debug(f'{unit_name} selection state changed to {new_state}')
 
-        # Update the selection status
-        unit_info = self.units_data.setdefault(faction, {}).setdefault(unit_type, {}).setdefault(unit_name, {})
-        unit_info['selected'] = new_state
+        # Update the selection status; the index notifies the unit windows
+        self.selection.set_selected(faction, unit_type, unit_name, new_state)
 
         # Update the image appearance
         is_locked = self.is_unit_locked(faction, unit_type, unit_name)
         position = self.get_unit_position(faction, unit_type, unit_name)
         self.update_image_selection(label, new_state, is_locked, position)
 
-        # Update the widget
-        for unit_counter, _ in self.hud_windows:
-            if isinstance(unit_counter, tuple):
-                for uc in unit_counter:
-                    uc.update_selected_widgets(faction, unit_type, unit_name, new_state)
-            else:
-                unit_counter.update_selected_widgets(faction, unit_type, unit_name, new_state)
-
 
@@ -0,0 +1,52 @@
+#UnitStripGeometry.py
+
+
+class UnitStripGeometry:
+    """Computes where the counters of a unit window go, without a QLayout.
+
+    Counters are stacked along one axis (top to bottom for 'Vertical', left to
+    right otherwise) with a fixed spacing and aligned to the top-left on the
+    other axis, which is what the old QVBoxLayout/QHBoxLayout did.
+    """
+
+    def __init__(self, layout_type='Vertical', spacing=0):
+        self.layout_type = layout_type
+        self.spacing = spacing
+        self.key = None  # Inputs of the last placement, None when it must be recomputed
+
+    def set_layout(self, layout_type, spacing):
+        if layout_type != self.layout_type or spacing != self.spacing:
+            self.layout_type = layout_type
+            self.spacing = spacing
+            self.invalidate()
+
+    def invalidate(self):
+        self.key = None
+
+    def needs_update(self, visible, size):
+        """Return True when the visible counters or their size changed since the last placement."""
+        return self.key != (visible, size)
+
+    def place(self, visible, size, counter_sizes):
+        """Return the (x, y) of every visible counter and the (width, height) of the whole strip.
+
+        counter_sizes holds the (width, height) of each visible counter, in order.
+        """
+        self.key = (visible, size)
+        vertical = self.layout_type == 'Vertical'
+        positions = []
+        offset = 0
+        thickness = 0
+        for width, height in counter_sizes:
+            if vertical:
+                positions.append((0, offset))
+                offset += height + self.spacing
+                thickness = max(thickness, width)
+            else:
+                positions.append((offset, 0))
+                offset += width + self.spacing
+                thickness = max(thickness, height)
+
+        length = offset - self.spacing if positions else 0
+        strip_size = (thickness, length) if vertical else (length, thickness)
+        return positions, strip_size
@@ -0,0 +1,95 @@
+#UnitVisibility.py
+from SelectionIndex import faction_bit
+
+BLITZ_OIL = "Blitz oil (psychic sensor)"
+MAX_SHOWN_COUNT = 500  # Larger counts are garbage reads
+ANY_FACTION = ~0
+
+# Per-player count dictionaries, in the order read_counts() fetches them
+INFANTRY, TANK, BUILDING = range(3)
+
+
+def count_sources(unit_type, unit_name):
+    """Return the (count dict, key) pairs that add up to the count of a unit."""
+    if unit_type == 'Infantry':
+        return ((INFANTRY, unit_name),)
+    elif unit_type == 'Tank' or unit_type == 'Naval':
+        return ((TANK, unit_name),)
+    elif unit_type == 'Structure':
+        if unit_name == 'Slave Miner Deployed' or unit_name == 'Slave miner undeployed':
+            return (BUILDING, 'Slave Miner Deployed'), (TANK, 'Slave miner undeployed')
+        elif unit_name == 'Allied AFC':
+            return (BUILDING, 'Allied AFC'), (BUILDING, 'American AFC')
+        else:
+            return ((BUILDING, unit_name),)
+    else:
+        # Unknown unit type, always counts 0
+        return ()
+
+
+class UnitVisibility:
+    """Decides which counters of a unit window are visible.
+
+    The selection, lock and faction rules are compiled into a bit mask of
+    always-visible counters whenever the selection changes. The mask of
+    counters with a count to show is only rebuilt when the counts changed,
+    i.e. once per game tick, not on every GUI frame.
+    """
+
+    def __init__(self):
+        self.version = None  # SelectionIndex version the rules were compiled from
+        self.order = ()  # Unit names, bit i of every mask is order[i]
+        self.index = {}  # unit_name -> bit
+        self.sources = ()
+        self.locked_mask = 0
+        self.visible_by_mask = {}  # mask -> tuple of visible unit names
+        self.last_counts = None  # Counts the last visible() call was given
+        self.last_visible = ()
+        self.dirty = True
+
+    def invalidate(self):
+        self.dirty = True
+
+    def needs_compile(self, selection):
+        return self.dirty or self.version != selection.version
+
+    def compile(self, counter_order, counter_types, selection, player_faction):
+        self.order = tuple(counter_order)
+        self.index = {unit_name: bit for bit, unit_name in enumerate(self.order)}
+        self.sources = tuple(count_sources(counter_types[unit_name], unit_name) for unit_name in self.order)
+
+        player_faction_mask = faction_bit(player_faction)
+        locked_mask = 0
+        for bit, unit_name in enumerate(self.order):
+            unit_id = selection.unit_ids.get(unit_name)
+            # The Blitz oil counter is shown when locked under any faction
+            if unit_id is not None and selection.is_locked_for(
+                    unit_id, ANY_FACTION if unit_name == BLITZ_OIL else player_faction_mask):
+                locked_mask |= 1 << bit
+        self.locked_mask = locked_mask
+        self.version = selection.version
+        self.visible_by_mask = {}
+        self.last_counts = None
+        self.dirty = False
+
+    def read_counts(self, player):
+        """Return the count of every unit, in order."""
+        counts = (player.infantry_counts, player.tank_counts, player.building_counts)
+        return [sum(counts[table].get(key, 0) for table, key in sources) for sources in self.sources]
+
+    def visible(self, counts):
+        """Return the names of the visible units, in display order."""
+        if counts == self.last_counts:
+            return self.last_visible
+        mask = self.locked_mask
+        for bit, count in enumerate(counts):
+            if 0 < count < MAX_SHOWN_COUNT:
+                mask |= 1 << bit
+
+        visible = self.visible_by_mask.get(mask)
+        if visible is None:
+            visible = tuple(unit_name for bit, unit_name in enumerate(self.order) if mask >> bit & 1)
+            self.visible_by_mask[mask] = visible
+        self.last_counts = counts
+        self.last_visible = visible
+        return visible
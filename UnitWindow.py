@@ -1,29 +1,34 @@
 # UnitWindow.py
 import logging
 from PySide6.QtCore import Qt
-from PySide6.QtWidgets import QMainWindow, QFrame, QWidget, QVBoxLayout, QHBoxLayout, QLayout
+from PySide6.QtWidgets import QMainWindow, QFrame
 
 from CounterWidget import (CounterWidgetImagesAndNumber, CounterWidgetNumberOnly, CounterWidgetImageOnly)
-from common import name_to_path, country_name_to_faction
+from UnitStripGeometry import UnitStripGeometry
+from UnitVisibility import UnitVisibility
+from ResizePipeline import get_resize_pipeline
+from SelectionIndex import get_selection_index, LOCKED, POSITION
 
 class UnitWindowBase(QMainWindow):
-    def __init__(self, player, hud_pos, selected_units_dict, spacing=0):
+    shows_cameos = True
+    size_setting = None  # Name of the HudSettings attribute holding the counter size
+
+    def __init__(self, player, hud_pos, selected_units_dict, spacing=0, visible=True):
         super().__init__()
         self.player = player
         self.hud_pos = hud_pos
-        self.selected_units = selected_units_dict['selected_units']
-        self.unit_info_by_name = {}
-        for faction, unit_types in self.selected_units.items():
-            for unit_type, units in unit_types.items():
-                for unit_name, unit_info in units.items():
-                    unit_info['unit_type'] = unit_type
-                    self.unit_info_by_name[unit_name] = unit_info
-                    unit_info['faction'] = faction
-        self.layout_type = hud_pos.get('unit_layout', 'Vertical')
+        self.selection = get_selection_index(selected_units_dict)
+        self.layout_type = hud_pos.unit_layout
         self.size = self.get_default_size()
-        self.show_unit_frames = hud_pos.get('show_unit_frames', True)
-        self.counters = {}
+        self.show_unit_frames = hud_pos.show_unit_frames
+        self.counters = {}  # unit_name -> (counter_widget, unit_type), only for counters shown at least once
+        self.counter_types = {}  # unit_name -> unit_type for every selected unit
+        self.counter_order = []  # Selected unit names in display order
+        self.free_counters = []  # Hidden widgets of deselected units, reused before creating new ones
+        self.visible_counters = ()
         self.spacing = spacing  # Store the spacing
+        self.geometry = UnitStripGeometry(self.layout_type, self.spacing)
+        self.visibility = UnitVisibility()
 
 
         # Set window geometry and flags
@@ -33,23 +38,40 @@ class UnitWindowBase(QMainWindow):
         self.setAttribute(Qt.WA_TranslucentBackground)
         self.make_hud_movable()
 
-        # Create the unit frame and apply the correct layout
+        # Create the unit frame; counters are placed on it by self.geometry
         self.unit_frame = QFrame(self)
-        self.set_layout(self.layout_type, self.spacing)
         self.setCentralWidget(self.unit_frame)
         self.load_selected_units_and_create_counters()
-        self.show()
+        self.selection.subscribe(self.on_selection_changed)
+        hud_pos.signals.changed.connect(self.on_setting_changed)
+        if self.shows_cameos:
+            get_resize_pipeline().atlas_ready.connect(self.on_atlas_ready)
+        if visible:
+            self.show()
 
 
     def get_default_size(self):
-        raise NotImplementedError("Subclasses should implement this method.")
+        return getattr(self.hud_pos, self.size_setting)
 
-    def set_layout(self, layout_type, spacing):
-        """Set the layout based on the provided layout type and spacing."""
-        self.layout = QVBoxLayout() if layout_type == 'Vertical' else QHBoxLayout()
-        self.layout.setSpacing(spacing)
-        self.layout.setContentsMargins(0, 0, 0, 0)
-        self.unit_frame.setLayout(self.layout)
+    def rebind(self, player):
+        """Reuse this window for another player with the same color, e.g. in the next match."""
+        self.player = player
+        for counter_widget in [counter_widget for counter_widget, _ in self.counters.values()] + self.free_counters:
+            counter_widget.update_count(0)
+            if counter_widget.color != player.color:
+                counter_widget.update_color(player.color)
+        self.visibility.invalidate()  # The faction may differ
+        self.visible_counters = ()
+        self.update_geometry()
+
+    def on_setting_changed(self, name, value):
+        """Follow the HUD settings. Windows idle in the HUD pool keep up too."""
+        if name == 'unit_layout':
+            self.update_layout(value)
+        elif name == 'show_unit_frames':
+            self.update_show_unit_frames(value)
+        elif name == self.size_setting:
+            self.update_all_counters_size(value)
 
     def update_show_unit_frames(self, show_frame):
         self.show_unit_frames = show_frame
@@ -57,152 +79,146 @@ class UnitWindowBase(QMainWindow):
             counter_widget.update_show_frame(show_frame)
 
     def update_layout(self, layout_type, spacing=None):
-        if self.layout_type != layout_type or (spacing is not None and self.layout.spacing() != spacing):
-            self.layout_type = layout_type
-            new_layout = QVBoxLayout() if layout_type == 'Vertical' else QHBoxLayout()
-            new_layout.setSpacing(spacing if spacing is not None else self.layout.spacing())
-            new_layout.setContentsMargins(0, 0, 0, 0)
-
-            for counter_widget, _ in self.counters.values():
-                self.layout.removeWidget(counter_widget)
-                new_layout.addWidget(counter_widget)
-
-            QWidget().setLayout(self.layout)
-            self.unit_frame.setLayout(new_layout)
-            self.layout = new_layout
-            self.updateGeometry()
+        self.layout_type = layout_type
+        if spacing is not None:
+            self.spacing = spacing
+        self.geometry.set_layout(self.layout_type, self.spacing)
+        self.update_geometry()
 
     def update_spacing(self, new_spacing):
-        self.layout.setSpacing(new_spacing)
-        self.layout.update()
-
-    def load_selected_units_and_create_counters(self):
-        for unit_name, unit_info in self.unit_info_by_name.items():
-            is_selected = unit_info.get('selected', False)
-            position = unit_info.get('position', -1)  # -1 means at the end
-            if is_selected:
-                unit_type = unit_info.get('unit_type')
-                counter_widget = self.create_counter_widget(unit_name, 0, unit_type)
-                counter_widget.hide()
-                if position == -1 or position >= self.layout.count():
-                    self.layout.addWidget(counter_widget)
-                else:
-                    self.layout.insertWidget(position, counter_widget)
-                self.counters[unit_name] = (counter_widget, unit_type)
-
-    def update_selected_widgets(self, faction, unit_type, unit_name, state):
-        unit_info = self.selected_units.get(faction, {}).get(unit_type, {}).get(unit_name, {})
-        is_selected = unit_info.get('selected', False)
-        position = unit_info.get('position', -1) # -1 means at the end
-        if is_selected:
-            # Ensure the counter widget exists
-            if unit_name not in self.counters:
-                unit_type = unit_info.get('unit_type')
-                counter_widget = self.create_counter_widget(unit_name, 0, unit_type)
-                counter_widget.hide()
-                if self.layout.count() < position:
-                    self.layout.addWidget(counter_widget)
-                else:
-                    self.layout.insertWidget(position, counter_widget)
-                self.counters[unit_name] = (counter_widget, unit_type)
+        self.spacing = new_spacing
+        self.geometry.set_layout(self.layout_type, self.spacing)
+        self.update_geometry()
+
+    def add_counter(self, unit_name, unit_type, position):
+        """Insert a unit at position (-1 means at the end). Its widget is built when first shown."""
+        if position == -1 or position >= len(self.counter_order):
+            self.counter_order.append(unit_name)
+        else:
+            self.counter_order.insert(position, unit_name)
+        self.counter_types[unit_name] = unit_type
+        self.geometry.invalidate()
+        self.visibility.invalidate()
+
+    def move_counter(self, unit_name, position):
+        self.counter_order.remove(unit_name)
+        self.add_counter(unit_name, self.counter_types[unit_name], position)
+
+    def remove_counter(self, unit_name):
+        if self.counter_types.pop(unit_name, None) is None:
+            return
+        self.counter_order.remove(unit_name)
+        counter_widget, _ = self.counters.pop(unit_name, (None, None))
+        if counter_widget:
+            counter_widget.hide()
+            self.free_counters.append(counter_widget)
+        self.geometry.invalidate()
+        self.visibility.invalidate()
+
+    def build_counter(self, unit_name, unit_type):
+        """Give a unit its widget, recycling a free one when possible."""
+        if self.free_counters:
+            counter_widget = self.free_counters.pop()
+            self.reuse_counter_widget(counter_widget, unit_name, unit_type)
+            if counter_widget.size != self.size:
+                counter_widget.update_size(self.size)
+            if hasattr(counter_widget, 'show_frame'):
+                counter_widget.update_show_frame(self.show_unit_frames)
         else:
-            # Remove the counter widget if it exists
-            counter_widget, _ = self.counters.pop(unit_name, (None, None))
-            if counter_widget:
-                self.layout.removeWidget(counter_widget)
-                counter_widget.deleteLater()
-
-    def update_position_widgets(self, faction, unit_type, unit_name):
-        unit_info = self.selected_units.get(faction, {}).get(unit_type, {}).get(unit_name, {})
-        is_selected = unit_info.get('selected', False)
-        position = unit_info.get('position', -1)  # -1 means at the end
-        if is_selected:
-            # Remove the existing widget
-            counter_widget, _ = self.counters.pop(unit_name, (None, None))
-            if counter_widget:
-                self.layout.removeWidget(counter_widget)
-                counter_widget.deleteLater()
-            unit_type = unit_info.get('unit_type')
             counter_widget = self.create_counter_widget(unit_name, 0, unit_type)
+            counter_widget.setParent(self.unit_frame)
             counter_widget.hide()
-            if position == -1 or position >= self.layout.count():
-                self.layout.addWidget(counter_widget)
-            else:
-                self.layout.insertWidget(position, counter_widget)
-            self.counters[unit_name] = (counter_widget, unit_type)
+        self.counters[unit_name] = (counter_widget, unit_type)
+        return counter_widget
+
+    def load_selected_units_and_create_counters(self):
+        selection = self.selection
+        for unit_id in selection.selected_ids():
+            self.add_counter(selection.unit_names[unit_id], selection.unit_types[unit_id], selection.positions[unit_id])
+
+    def on_selection_changed(self, unit_id, change):
+        """Apply a change of one unit's selection, lock or position (-1 means at the end)."""
+        selection = self.selection
+        unit_name = selection.unit_names[unit_id]
+        if not selection.selected[unit_id]:
+            self.remove_counter(unit_name)
+        elif unit_name not in self.counter_types:
+            position = -1 if change == LOCKED else selection.positions[unit_id]
+            self.add_counter(unit_name, selection.unit_types[unit_id], position)
+        elif change == POSITION:
+            self.move_counter(unit_name, selection.positions[unit_id])
+        # Lock changes reach the visibility rules through selection.version
 
     def update_all_counters_size(self, new_size):
+        """Resize every counter. Cameos show a stretched preview until the resize pipeline has rescaled them."""
         self.size = new_size
         for counter_widget, _ in self.counters.values():
             counter_widget.update_size(new_size)
-        self.layout.setSizeConstraint(QLayout.SetFixedSize)
-        self.updateGeometry()
+        # Free widgets are resized when they are reused
+        if self.shows_cameos:
+            get_resize_pipeline().request(self.get_hud_type(), new_size)
+        self.geometry.invalidate()
+        self.update_geometry()
+
+    def on_atlas_ready(self, size):
+        """Swap every previewed cameo of this size for the rescaled one at once."""
+        if size != self.size:
+            return
+        for counter_widget, _ in self.counters.values():
+            counter_widget.refresh_cameo()
+        for counter_widget in self.free_counters:
+            if counter_widget.size == size:
+                counter_widget.refresh_cameo()
+        self.geometry.invalidate()
+        self.update_geometry()
 
     def update_labels(self):
-        # Get the player's faction
-        player_faction = self.player.faction
-        for unit_name, (counter_widget, unit_type) in self.counters.items():
-            unit_count = self.get_unit_count(unit_type, unit_name)
-            counter_widget.update_count(unit_count)
-            unit_info = self.unit_info_by_name.get(unit_name, {})
-            is_locked = unit_info.get('locked', False)
-            unit_faction = unit_info.get('faction', None)
-            is_selected = unit_info.get('selected', False)
-            if (0 < unit_count < 500):
-                counter_widget.show()
-            # TODO do i really need another condition just for the blitz oil??
-            elif is_locked and is_selected and (unit_faction == player_faction or unit_name == "Blitz oil (psychic sensor)"):
-                counter_widget.show()
-            else:
-                counter_widget.hide()
-        self.update_all_counters_size(self.size)
-
-    def update_locked_widgets(self, faction, unit_type, unit_name, state):
-        unit_info = self.selected_units.get(faction, {}).get(unit_type, {}).get(unit_name, {})
-        is_selected = unit_info.get('selected', False)
-        is_locked = unit_info.get('locked', False)
-        if is_selected:
-            # Ensure the counter widget exists
-            if unit_name not in self.counters:
-                unit_type = unit_info.get('unit_type')
-                counter_widget = self.create_counter_widget(unit_name, 0, unit_type)
-                counter_widget.hide()
-                self.layout.addWidget(counter_widget)
-                self.counters[unit_name] = (counter_widget, unit_type)
-        else:
-            # Remove the counter widget if it exists
-            counter_widget, _ = self.counters.pop(unit_name, (None, None))
-            if counter_widget:
-                self.layout.removeWidget(counter_widget)
-                counter_widget.deleteLater()
-
-    def get_unit_count(self, unit_type, unit_name):
-        """Determine the unit type and retrieve the unit count from the relevant section."""
         if self.player is None:
             logging.warning("The game ended while retrieving unit counts.")
-            return 0  # Return 0 or any other default value
+            return
+        if self.visibility.needs_compile(self.selection):
+            self.visibility.compile(self.counter_order, self.counter_types, self.selection, self.player.faction)
 
         try:
-            if unit_type == 'Infantry':
-                return self.player.infantry_counts.get(unit_name, 0)
-            elif unit_type == 'Tank' or unit_type == 'Naval':
-                return self.player.tank_counts.get(unit_name, 0)
-            elif unit_type == 'Structure':
-                if unit_name == 'Slave Miner Deployed' or unit_name == 'Slave miner undeployed':
-                    return self.player.building_counts.get('Slave Miner Deployed', 0) + self.player.tank_counts.get(
-                        'Slave miner undeployed', 0)
-                elif unit_name == 'Allied AFC':
-                    return self.player.building_counts.get('Allied AFC', 0) + self.player.building_counts.get(
-                        'American AFC', 0)
-                else:
-                    return self.player.building_counts.get(unit_name, 0)
-            else:
-                # Unknown unit type, return 0 as default
-                return 0
+            counts = self.visibility.read_counts(self.player)
         except AttributeError as e:
             logging.error(f"Error retrieving unit count: {e}")
             logging.warning("Game likely ended while retrieving unit counts.")
-            return 0  # Return a default value to avoid further errors
+            return
+        visible = self.visibility.visible(counts)
+
+        index = self.visibility.index
+        for unit_name, (counter_widget, _) in self.counters.items():
+            counter_widget.update_count(counts[index[unit_name]])
+        for unit_name in visible:
+            if unit_name not in self.counters:
+                counter_widget = self.build_counter(unit_name, self.counter_types[unit_name])
+                counter_widget.update_count(counts[index[unit_name]])
+
+        self.visible_counters = visible
+        self.update_geometry()
+
+    def update_geometry(self):
+        """Place the visible counters. Does nothing unless the visible set or the size changed."""
+        if not self.geometry.needs_update(self.visible_counters, self.size):
+            return
+        visible = self.visible_counters
+        counter_widgets = [self.counters[unit_name][0] for unit_name in visible]
+        positions, (width, height) = self.geometry.place(
+            visible, self.size, [(widget.width(), widget.height()) for widget in counter_widgets]
+        )
+
+        for unit_name, (counter_widget, _) in self.counters.items():
+            if unit_name not in visible and not counter_widget.isHidden():
+                counter_widget.hide()
+        for counter_widget, (x, y) in zip(counter_widgets, positions):
+            counter_widget.move(x, y)
+            if counter_widget.isHidden():
+                counter_widget.show()
+
+        # A window can't be smaller than 1x1
+        self.unit_frame.setFixedSize(max(width, 1), max(height, 1))
+        self.setFixedSize(max(width, 1), max(height, 1))
 
     def make_hud_movable(self):
         self.offset = None
@@ -222,25 +238,10 @@ class UnitWindowBase(QMainWindow):
         self.mouseMoveEvent = mouse_move_event
 
     def get_default_position(self):
-        player_color_str = self.player.color_name
-        hud_type = self.get_hud_type()
-        if player_color_str not in self.hud_pos:
-            self.hud_pos[player_color_str] = {}
-        if hud_type not in self.hud_pos[player_color_str]:
-            default_position = {"x": 100, "y": 100}
-            self.hud_pos[player_color_str][hud_type] = default_position
-        else:
-            default_position = self.hud_pos[player_color_str][hud_type]
-        default_position['x'] = int(default_position['x'])
-        default_position['y'] = int(default_position['y'])
-        return default_position
+        return self.hud_pos.position(self.player.color_name, self.get_hud_type())
 
     def update_hud_position(self, x, y):
-        player_color_str = self.player.color_name
-        hud_type = self.get_hud_type()
-        if player_color_str not in self.hud_pos:
-            self.hud_pos[player_color_str] = {}
-        self.hud_pos[player_color_str][hud_type] = {"x": x, "y": y}
+        self.hud_pos.set_position(self.player.color_name, self.get_hud_type(), x, y)
 
     def get_hud_type(self):
         """Return the HUD type identifier. To be implemented in subclasses."""
@@ -250,50 +251,65 @@ class UnitWindowBase(QMainWindow):
         """Create a counter widget. To be implemented in subclasses."""
         raise NotImplementedError("Subclasses should implement this method.")
 
+    def reuse_counter_widget(self, counter_widget, unit_name, unit_type):
+        """Point a free counter widget at another unit."""
+        counter_widget.update_count(0)
+
 
 
 class UnitWindowWithImages(UnitWindowBase):
-    def get_default_size(self):
-        return self.hud_pos.get('unit_counter_size', 100)
+    size_setting = 'unit_counter_size'
 
     def get_hud_type(self):
         return 'unit_counter_combined'
 
     def create_counter_widget(self, unit_name, unit_count, unit_type):
-        unit_image_path = name_to_path(unit_name)
         return CounterWidgetImagesAndNumber(
             count=unit_count,
-            image_path=unit_image_path,
+            unit_name=unit_name,
             color=self.player.color,
             size=self.size,
             show_frame=self.show_unit_frames
         )
 
+    def reuse_counter_widget(self, counter_widget, unit_name, unit_type):
+        super().reuse_counter_widget(counter_widget, unit_name, unit_type)
+        counter_widget.set_unit(unit_name)
+
 
 class UnitWindowImagesOnly(UnitWindowBase):
-    def get_default_size(self):
-        return self.hud_pos.get('image_size', 75)
+    size_setting = 'image_size'
 
     def get_hud_type(self):
         return 'unit_counter_images'
 
     def create_counter_widget(self, unit_name, unit_count, unit_type):
-        unit_image_path = name_to_path(unit_name)
         return CounterWidgetImageOnly(
-            image_path=unit_image_path,
+            unit_name=unit_name,
             color=self.player.color,
             size=self.size,
             show_frame=self.show_unit_frames
         )
 
+    def reuse_counter_widget(self, counter_widget, unit_name, unit_type):
+        super().reuse_counter_widget(counter_widget, unit_name, unit_type)
+        counter_widget.set_unit(unit_name)
+
 
 class UnitWindowNumbersOnly(UnitWindowBase):
-    def __init__(self, player, hud_pos, selected_units_dict):
-        self.distance_between_numbers = hud_pos.get('distance_between_numbers', 0)
-        super().__init__(player, hud_pos, selected_units_dict, spacing=self.distance_between_numbers)
+    shows_cameos = False
+    size_setting = 'number_size'
 
-    def get_default_size(self):
-        return self.hud_pos.get('number_size', 75)
+    def __init__(self, player, hud_pos, selected_units_dict, visible=True):
+        self.distance_between_numbers = hud_pos.distance_between_numbers
+        super().__init__(player, hud_pos, selected_units_dict, spacing=self.distance_between_numbers,
+                         visible=visible)
+
+    def on_setting_changed(self, name, value):
+        super().on_setting_changed(name, value)
+        if name == 'distance_between_numbers':
+            self.distance_between_numbers = value
+            self.update_spacing(value)
 
     def get_hud_type(self):
         return 'unit_counter_numbers'
@@ -304,7 +320,3 @@ class UnitWindowNumbersOnly(UnitWindowBase):
             color=self.player.color,
             size=self.size
         )
-
-    def update_spacing(self, new_spacing):
-        self.layout.setSpacing(new_spacing)
-        self.updateGeometry()
\ No newline at end of file
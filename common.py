@@ -4,13 +4,15 @@ admin = True
 
 # Constants
 HUD_POSITION_FILE = 'hud_positions.json'
+UNIT_SELECTION_FILE = 'unit_selection.json'
+RECORDINGS_DIR = 'recordings'
 
 # Global variables
 players = []           # List to store player objects
 hud_windows = []       # List to store HUDWindow objects
 selected_units_dict = {}    # Dict to store units for the unitSelection HUD
 data_lock = threading.Lock()
-hud_positions = {}     # Dictionary to store HUD positions and settings
+hud_positions = {}     # HUD settings and positions, replaced by a HudSettings in load_hud_positions()
 process_handle = None  # Handle for the game process
 control_panel = None   # Reference to the ControlPanel instance
 data_update_thread = None  # Reference to the DataUpdateThread instance
@@ -189,6 +191,48 @@ factions = ['Allied', 'Soviet', 'Yuri', 'Other']
 
 unit_types = ['Infantry', 'Structure', 'Tank', 'Naval', 'Aircraft']
 
+# Build cost in credits of everything the counters read, keyed like the Player count dicts
+unit_costs = {
+    # Infantry
+    "GI": 200, "GGI": 400, "conscript": 100, "tesla trooper": 500, "Allied Engineer": 500,
+    "Soviet Engineer": 500, "Yuri Engineer": 500, "Rocketeer": 600, "Navy Seal": 1000,
+    "Yuri Clone": 800, "Ivan": 600, "Desolator": 600, "Allied Dog": 200, "Soviet Dog": 200,
+    "Chrono Legionnaire": 1500, "Spy": 1000, "Yuri Prime": 1500, "Sniper": 600, "Tanya": 1000,
+    "Terrorist": 200, "Initiate": 200, "Boris": 1500, "Brute": 500, "Virus": 700,
+    # Vehicles and ships
+    "Allied MCV": 3000, "Soviet MCV": 3000, "Yuri MCV": 3000, "War Miner": 1400, "Chrono Miner": 1400,
+    "Slave miner undeployed": 1500, "Apoc": 1750, "Rhino Tank": 900, "Grizzly": 700, "Lasher": 700,
+    "V3 Rocket Launcher": 800, "Kirov": 2000, "Terror Drone": 500, "Flak Track": 500, "IFV": 600,
+    "Tank Destroyer": 900, "Prism Tank": 1200, "Mirage Tank": 1000, "Robot Tank": 600,
+    "Battle Fortress": 2000, "Demolition truck": 1500, "Gattling Tank": 600, "Chaos Drone": 1000,
+    "Magnetron": 1000, "Mastermind": 1750, "Disc": 2000, "Siege Chopper": 1100,
+    "NightHawk Transport": 1000, "Allied Amphibious Transport": 900, "Soviet Amphibious Transport": 900,
+    "Yuri Amphibious Transport": 900, "Aircraft Carrier": 2000, "Destroyer": 1000, "Aegis Cruiser": 1200,
+    "Dolphin": 500, "Dreadnought": 2000, "Typhoon attack sub": 1000, "Sea Scorpion": 600, "Squid": 1000,
+    "Boomer": 2000,
+    # Aircraft
+    "Harrier": 1200, "Black Eagle": 1200,
+    # Structures
+    "Allied Con Yard": 3000, "sov con yard": 3000, "Yuri Con Yard": 3000,
+    "Allied Power Plant": 800, "Tesla Reactor": 600, "Nuclear Reactor": 1000, "Bio Reactor": 600,
+    "Allied Ore Refinery": 2000, "Sov Ore Ref": 2000, "Slave Miner Deployed": 1500,
+    "Allied Barracks": 500, "sov barracks": 500, "Yuri Barracks": 500,
+    "Allied War Factory": 2000, "Soviet War Factory": 2000, "Yuri War Factory": 2000,
+    "Allied Naval Yard": 1000, "Sov Naval Yard": 1000, "Yuri Naval Yard": 1000,
+    "Allied service Depot": 800, "Sov Service Depot": 800,
+    "Allied Battle Lab": 2000, "Sov Battle lab": 2000, "Yuri Battle Lab": 2000,
+    "Sov Radar": 1000, "Yuri Radar": 1000, "Allied AFC": 1000, "American AFC": 1000, "SpySat Uplink": 1500,
+    "PillBox": 500, "Patriot Missile": 1000, "Gap Generator": 1000, "Grand Cannon": 2000,
+    "Sentry Gun": 500, "Flak Cannon": 1000, "Tesla Coil": 1500, "Gattling Cannon": 1000,
+    "Psychic Tower": 1200, "Tank Bunker": 500, "Battle Bunker": 600,
+    "ChronoSphere": 2500, "Weather Controller": 5000, "Iron Curtain": 2500, "Nuclear Missile Launcher": 5000,
+    "Genetic Mutator": 2500, "Psychic dominator": 5000,
+    "Ore Purifier": 2500, "Cloning Vats": 2500, "Industrial Plant": 2500, "Grinder": 800,
+    "Robot Control Center": 1500,
+    # Captured tech, not built
+    "Oil": 0, "Blitz oil (psychic sensor)": 0,
+}
+
 
 def name_to_path(name):
     return 'cameos/png/' + name + '.png'
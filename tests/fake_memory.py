@@ -0,0 +1,31 @@
+class FakeMemory:
+    """Sparse process memory: writes go to a bytearray per page, reads of unwritten pages fail."""
+
+    PAGE = 0x10000
+
+    def __init__(self):
+        self.pages = {}
+
+    def write(self, address, data):
+        while data:
+            page = self.pages.setdefault(address // self.PAGE, bytearray(self.PAGE))
+            start = address % self.PAGE
+            length = min(len(data), self.PAGE - start)
+            page[start:start + length] = data[:length]
+            address += length
+            data = data[length:]
+
+    def write_int(self, address, value, signed=False):
+        self.write(address, value.to_bytes(4, 'little', signed=signed))
+
+    def read(self, address, size):
+        data = bytearray()
+        while len(data) < size:
+            page = self.pages.get(address // self.PAGE)
+            if page is None:
+                return None
+            start = address % self.PAGE
+            piece = page[start:start + min(size - len(data), self.PAGE - start)]
+            data += piece
+            address += len(piece)
+        return bytes(data)
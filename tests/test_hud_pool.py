@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+from HudPool import HudPool
+
+
+class Window:
+    def __init__(self, player):
+        self.player = player
+        self.hidden = False
+
+    def rebind(self, player):
+        self.player = player
+
+    def hide(self):
+        self.hidden = True
+
+    def hide_windows(self):
+        self.hidden = True
+
+
+def make_player(index, color_name='white'):
+    return SimpleNamespace(index=index, color_name=color_name)
+
+
+def test_players_sharing_a_color_keep_their_windows():
+    pool = HudPool()
+    players = [make_player(0), make_player(1)]
+    hud_windows = [(Window(player), Window(player)) for player in players]
+    pool.release(hud_windows)
+    assert all(window.hidden for pair in hud_windows for window in pair)
+
+    new_players = [make_player(2), make_player(3)]
+    resource_windows = [pool.acquire_resource_window(player, lambda: None) for player in new_players]
+    unit_windows = [pool.acquire_unit_window(player, False, lambda: None) for player in new_players]
+    assert {id(window) for window in resource_windows} == {id(resource_window) for _, resource_window in hud_windows}
+    assert {id(window) for window in unit_windows} == {id(unit_window) for unit_window, _ in hud_windows}
+    assert [window.player for window in resource_windows] == new_players
+    assert [window.player for window in unit_windows] == new_players
+    assert pool.idle_resource_windows == {} and pool.idle_unit_windows == {}
+
+
+def test_build_when_nothing_is_idle():
+    pool = HudPool()
+    player = make_player(0, 'red')
+    pool.release([((Window(player), Window(player)), Window(player))])
+    built = Window(player)
+    # Separate image and number windows are not handed out for a combined one
+    assert pool.acquire_unit_window(player, False, lambda: built) is built
+    assert isinstance(pool.acquire_unit_window(player, True, lambda: built), tuple)
+    assert pool.acquire_resource_window(make_player(1, 'blue'), lambda: built) is built
@@ -0,0 +1,138 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import MatchRecorder
+from MatchRecorder import MatchRecorder as Recorder, MatchRecording, BLOCK_HEADER, TRAILER, INDEX_ENTRY, count_columns, \
+    encode_varints, decode_varints
+
+BLOCK_TICKS = 4
+TICKS = 10  # Two full blocks and a partial one
+
+
+def make_player(index):
+    return SimpleNamespace(index=index, username=SimpleNamespace(value=f'player{index}'), color_name='red',
+                           color='#ff0000', country_name=SimpleNamespace(value=b'Russians'), faction='Soviet',
+                           balance=0, spent_credit=0, power_output=0, power_drain=0, is_winner=False, is_loser=False,
+                           infantry_counts={}, tank_counts={}, building_counts={}, aircraft_counts={})
+
+
+def unit_name():
+    """A unit of the current unit tables, so that it gets a column."""
+    return next(unit_names[0] for field, unit_names in count_columns() if field == 'infantry_counts')
+
+
+def write_recording(path, monkeypatch, ticks=TICKS):
+    """Record ticks of two players, one every 1.5 s. Returns the expected [{column: value}] per tick."""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(MatchRecorder, 'time', SimpleNamespace(time=lambda: clock.now))
+    players = [make_player(0), make_player(1)]
+    recorder = Recorder(str(path), players, block_ticks=BLOCK_TICKS)
+    recorder.start()
+    expected = []
+    for tick in range(ticks):
+        clock.now = 1000.0 + tick * 1.5
+        players[0].balance = 10000 - tick * 700  # Goes down, so the deltas are negative
+        players[0].infantry_counts = {unit_name(): tick}
+        players[1].power_drain = tick * 3
+        players[1].is_loser = tick == ticks - 1
+        recorder.record(players)
+        expected.append((players[0].balance, tick, tick * 3, int(players[1].is_loser)))
+    recorder.close()
+    return expected
+
+
+def check_ticks(recording, expected):
+    for tick, (balance, infantry, power_drain, is_loser) in enumerate(expected):
+        seconds, frame = recording.frame(tick)
+        assert seconds == tick * 1.5
+        assert frame[0]['balance'] == balance
+        assert frame[0][('infantry_counts', unit_name())] == infantry
+        assert frame[1]['power_drain'] == power_drain
+        assert frame[1]['is_loser'] == is_loser
+
+
+def test_varints_round_trip():
+    values = [0, 1, -1, 63, -64, 64, 2 ** 31, -2 ** 31, 2 ** 62]
+    out = bytearray()
+    encode_varints(values, out)
+    assert decode_varints(out) == values
+
+
+def test_round_trip_through_the_footer_index(tmp_path, monkeypatch):
+    path = tmp_path / 'match.ra2rec'
+    expected = write_recording(path, monkeypatch)
+    recording = MatchRecording(str(path))
+    assert recording.read_index() is not None
+    assert [entry[0] for entry in recording.index] == [0, 4, 8]
+    assert [entry[3] for entry in recording.index] == [4, 4, 2]
+    assert recording.index == recording.scan_blocks()
+    assert recording.tick_count == TICKS
+    assert recording.duration() == (TICKS - 1) * 1.5
+    assert recording.players[0]['username'] == 'player0' and recording.players[0]['country_name'] == 'Russians'
+    check_ticks(recording, expected)
+
+
+def test_tick_at(tmp_path, monkeypatch):
+    path = tmp_path / 'match.ra2rec'
+    write_recording(path, monkeypatch)
+    recording = MatchRecording(str(path))
+    assert recording.tick_at(0) == 0
+    assert recording.tick_at(1.4) == 0
+    assert recording.tick_at(1.5) == 1
+    assert recording.tick_at(6.0) == 4  # First tick of the second block
+    assert recording.tick_at(5.9) == 3  # Last tick of the first block
+    assert recording.tick_at(1000) == TICKS - 1
+
+
+def test_truncated_recording_reads_up_to_the_last_complete_block(tmp_path, monkeypatch):
+    path = tmp_path / 'match.ra2rec'
+    expected = write_recording(path, monkeypatch)
+    data = path.read_bytes()
+    recording = MatchRecording(str(path))
+    _, _, last_block, _ = recording.index[-1]
+    # As if the recorder died while writing the last block, before the index
+    path.write_bytes(data[:last_block + BLOCK_HEADER.size + 3])
+    recording = MatchRecording(str(path))
+    assert recording.read_index() is None
+    assert [entry[0] for entry in recording.index] == [0, 4]
+    assert recording.tick_count == 8
+    check_ticks(recording, expected[:8])
+    assert recording.frame(TICKS - 1)[0] == 7 * 1.5  # Past the end reads the last tick
+
+
+def test_corrupt_block_ends_the_scan(tmp_path, monkeypatch):
+    path = tmp_path / 'match.ra2rec'
+    write_recording(path, monkeypatch)
+    recording = MatchRecording(str(path))
+    _, _, second_block, _ = recording.index[1]
+    index_offset = len(recording.data) - TRAILER.size - len(recording.index) * INDEX_ENTRY.size
+    data = bytearray(recording.data[:index_offset])
+    data[second_block + BLOCK_HEADER.size] ^= 0xFF
+    path.write_bytes(bytes(data))
+    assert [entry[0] for entry in MatchRecording(str(path)).index] == [0]
+
+
+def test_recording_without_ticks(tmp_path, monkeypatch):
+    path = tmp_path / 'match.ra2rec'
+    write_recording(path, monkeypatch, ticks=0)
+    recording = MatchRecording(str(path))
+    assert recording.index == [] and recording.tick_count == 0 and recording.duration() == 0.0
+
+
+def test_not_a_recording(tmp_path):
+    path = tmp_path / 'match.ra2rec'
+    path.write_bytes(b'something else')
+    with pytest.raises(ValueError):
+        MatchRecording(str(path))
+
+
+def test_prune_recordings(tmp_path):
+    for number in range(4):
+        path = tmp_path / f'{number}.ra2rec'
+        path.write_bytes(b'')
+        os.utime(path, (number, number))
+    (tmp_path / 'notes.txt').write_bytes(b'')
+    MatchRecorder.prune_recordings(str(tmp_path), 2)
+    assert sorted(os.listdir(tmp_path)) == ['2.ra2rec', '3.ra2rec', 'notes.txt']
@@ -0,0 +1,79 @@
+import struct
+
+from ObjectEnumerator import (DYNAMIC_START, HEALTH_OFFSET, OBJECT_VECTORS, OWNER_OFFSET, VECTOR_HEADER,
+                              ObjectTable, coalesce)
+from fake_memory import FakeMemory
+
+ITEMS = 0x6000000
+RECORDS = 0x7000000
+RECORD_SIZE = 0x800
+TYPE = 0x8000000
+OWNER = 0x9000000
+INFANTRY_TYPE_OFFSET = OBJECT_VECTORS['infantry'][1]
+DYNAMIC_END = max(max(type_offset for _, type_offset in OBJECT_VECTORS.values()), OWNER_OFFSET) + 4
+
+
+def write_infantry(memory, addresses):
+    """Point the infantry vector at addresses; the other vectors stay empty."""
+    for kind, (vector_address, _) in OBJECT_VECTORS.items():
+        count = len(addresses) if kind == 'infantry' else 0
+        memory.write(vector_address, VECTOR_HEADER.pack(0, ITEMS if count else 0, max(count, 1), 0, count) + bytes(4))
+    memory.write(ITEMS, struct.pack(f'<{len(addresses)}I', *addresses))
+
+
+def write_record(memory, address, health, type_pointer=TYPE, owner=OWNER):
+    memory.write(address, bytes(RECORD_SIZE))
+    memory.write_int(address + HEALTH_OFFSET, health)
+    memory.write_int(address + INFANTRY_TYPE_OFFSET, type_pointer)
+    memory.write_int(address + OWNER_OFFSET, owner)
+
+
+def game(count):
+    memory = FakeMemory()
+    addresses = [RECORDS + index * RECORD_SIZE for index in range(count)]
+    for index, address in enumerate(addresses):
+        write_record(memory, address, 100 + index)
+    write_infantry(memory, addresses)
+    return memory, addresses
+
+
+def test_steady_refresh_reads_records_in_coalesced_spans():
+    memory, addresses = game(200)
+    table = ObjectTable(memory.read)
+    assert table.refresh()
+    assert len(table.addresses) == 200 and table.health[5] == 105 and table.owners[5] == OWNER
+
+    assert not table.refresh()
+    # A header per vector, the infantry pointer array, then the spans of records
+    spans = coalesce(addresses, DYNAMIC_START, DYNAMIC_END)
+    assert table.reads == len(OBJECT_VECTORS) + 1 + len(spans)
+    assert len(spans) < len(addresses) // 10
+
+
+def test_refresh_follows_created_and_destroyed_objects():
+    memory, addresses = game(10)
+    table = ObjectTable(memory.read)
+    table.refresh()
+
+    new = RECORDS + 20 * RECORD_SIZE
+    write_record(memory, new, 42)
+    write_infantry(memory, addresses[1:] + [new])
+    assert table.refresh()
+    assert addresses[0] not in table.rows
+    assert table.health[table.rows[new]] == 42
+    assert len(table.addresses) == 10
+
+
+def test_reused_record_is_noticed():
+    memory, addresses = game(10)
+    table = ObjectTable(memory.read)
+    table.refresh()
+
+    # Destroyed and replaced by an enemy unit of another type between two refreshes,
+    # at the same address, so the pointer array is unchanged
+    write_record(memory, addresses[3], 50, type_pointer=TYPE + 0x100, owner=OWNER + 0x100)
+    assert table.refresh()
+    row = table.rows[addresses[3]]
+    assert (table.type_ids[row], table.owners[row], table.health[row]) == (TYPE + 0x100, OWNER + 0x100, 50)
+    assert table.rows_of(OWNER + 0x100) == [row]
+    assert not table.refresh()
@@ -0,0 +1,150 @@
+import struct
+
+import OffsetProfiles
+from OffsetProfiles import load_default_profile, select_profile, verify_profile
+from fake_memory import FakeMemory
+from SignatureScanner import IMAGE_BASE, SIGNATURES
+from test_signature_scanner import TEXT_RVA, build_image, place
+
+FIXED_POINT = 0x1000000
+CLASS_BASE_ARRAY = 0x2000000
+HOUSES = (0x3000000, 0x3100000)
+HOUSE_TYPE = 0x4000000
+UNIT_ARRAY = 0x5000000
+
+
+def game_memory(profile, frame=1000):
+    """Memory of a running two player game laid out the way profile describes it."""
+    addresses, offsets = profile.addresses, profile.field_offsets
+    memory = FakeMemory()
+    memory.write_int(addresses['FIXEDPOINTADDRESS'], FIXED_POINT)
+    memory.write_int(addresses['CLASSBASEARRAYADDRESS'], CLASS_BASE_ARRAY)
+    memory.write_int(addresses['CURRENTFRAMEADDRESS'], frame)
+    for slot in range(OffsetProfiles.MAX_SLOTS):
+        memory.write_int(FIXED_POINT + offsets['PLAYERSLOTSOFFSET'] + slot * 4,
+                         slot if slot < len(HOUSES) else OffsetProfiles.EMPTY_SLOT)
+    memory.write(HOUSE_TYPE + offsets['COUNTRYSTRINGOFFSET'], b'Russians\x00')
+    for index, house in enumerate(HOUSES):
+        memory.write_int(CLASS_BASE_ARRAY + index * 4, house)
+        memory.write_int(house + offsets['BALANCEOFFSET'], 10000)
+        memory.write_int(house + offsets['CREDITSPENT_OFFSET'], 0)
+        memory.write_int(house + offsets['POWEROUTPUTOFFSET'], 100)
+        memory.write_int(house + offsets['POWERDRAINOFFSET'], 50)
+        memory.write_int(house + offsets['COLORSCHEMEOFFSET'], 11)
+        memory.write_int(house + offsets['HOUSETYPECLASSBASEOFFSET'], HOUSE_TYPE)
+        memory.write(house + offsets['USERNAMEOFFSET'], f'player{index}'.encode('utf-16-le') + b'\x00\x00')
+        for array_index, name in enumerate(OffsetProfiles.UNIT_ARRAY_OFFSETS):
+            array = UNIT_ARRAY + index * 0x10000 + array_index * 0x1000
+            memory.write_int(house + offsets[name], array)
+            memory.write_int(array, 3)
+    return memory
+
+
+def earlier_frames(profile):
+    """Frames read by a previous check, just before those game_memory() writes."""
+    return {profile.addresses['CURRENTFRAMEADDRESS']: 999}
+
+
+def test_default_profile_passes_on_a_matching_game():
+    profile = load_default_profile()
+    results = verify_profile(profile, game_memory(profile).read, earlier_frames(profile))
+    assert results and all(results.values()), results
+
+
+def test_moved_fields_that_are_not_scanned_fail():
+    profile = load_default_profile()
+    memory = game_memory(profile)
+    for house in HOUSES:
+        memory.write(house + profile.field_offsets['USERNAMEOFFSET'], bytes.fromhex('00d8 41 00') * 8)  # Lone surrogates
+        memory.write_int(house + profile.field_offsets['COLORSCHEMEOFFSET'], 0x12345678)
+        memory.write_int(house + profile.field_offsets['TANKOFFSET'], HOUSE_TYPE + 2)
+    results = verify_profile(profile, memory.read, earlier_frames(profile))
+    assert not results['USERNAMEOFFSET']
+    assert not results['COLORSCHEMEOFFSET']
+    assert not results['TANKOFFSET']
+    assert results['INFOFFSET'] and results['BALANCEOFFSET']
+
+
+def test_unit_arrays_are_not_checked_before_they_exist():
+    profile = load_default_profile()
+    memory = game_memory(profile)
+    for house in HOUSES:
+        memory.write_int(house + profile.field_offsets['AIRCRAFTOFFSET'], 0)
+    results = verify_profile(profile, memory.read, earlier_frames(profile))
+    assert 'AIRCRAFTOFFSET' not in results and all(results.values())
+
+
+def test_ambiguous_signature_is_settled_by_the_live_check(monkeypatch):
+    monkeypatch.setattr(OffsetProfiles, 'scanned_anchors', {})
+    profile = load_default_profile()
+    memory = game_memory(profile)
+    # This build keeps the balance 4 bytes further on; the old offset reads 0
+    for house in HOUSES:
+        memory.write_int(house + 0x30c, 0)
+        memory.write_int(house + 0x310, 10000)
+    image = build_image()
+    pattern = SIGNATURES['BALANCEOFFSET'][0]
+    place(image, TEXT_RVA + 0x1000, pattern, {2: 0x310, 10: 0x310})
+    place(image, TEXT_RVA + 0x2000, pattern, {2: 0x2f0, 10: 0x2f0})
+    memory.write(IMAGE_BASE, bytes(image))
+
+    frame_samples = earlier_frames(profile)
+    selected, verified = select_profile(None, memory.read, frame_samples=frame_samples)
+    assert verified
+    assert selected.field_offsets['BALANCEOFFSET'] == 0x310
+
+
+def test_profiles_are_read_from_disk_once_until_one_is_saved(monkeypatch, tmp_path):
+    monkeypatch.setattr(OffsetProfiles, 'LEARNED_PROFILES_DIR', str(tmp_path / 'profiles'))
+    monkeypatch.setattr(OffsetProfiles, 'EXE_HASH_CACHE_FILE', str(tmp_path / 'exe_hashes.json'))
+    monkeypatch.setattr(OffsetProfiles, 'known_hashes', None)
+    monkeypatch.setattr(OffsetProfiles, 'profiles_by_hash', None)
+    monkeypatch.setattr(OffsetProfiles, 'default_profile', None)
+    loaded = []
+    load_profile = OffsetProfiles.load_profile
+    monkeypatch.setattr(OffsetProfiles, 'load_profile', lambda path: loaded.append(path) or load_profile(path))
+    executable = tmp_path / 'gamemd.exe'
+    executable.write_bytes(b'MZ unknown build')
+    memory = game_memory(load_default_profile())
+    frame_samples = earlier_frames(load_default_profile())
+
+    for _ in range(3):
+        assert select_profile(str(executable), memory.read, frame_samples=frame_samples)[1]
+    first = len(loaded)
+
+    def no_reads(address, size):
+        raise AssertionError("a known build is not read")
+
+    # The build was saved as a learned profile: found by hash, from memory
+    for _ in range(3):
+        assert select_profile(str(executable), no_reads, frame_samples=frame_samples)[1]
+    assert len(loaded) == first
+
+
+def test_frame_counter_must_count_up():
+    profile = load_default_profile()
+    memory = game_memory(profile, frame=1000)
+    assert verify_profile(profile, memory.read) is None  # Nothing to compare with yet
+    assert verify_profile(profile, memory.read, {profile.addresses['CURRENTFRAMEADDRESS']: 1000}) is None
+    assert not verify_profile(profile, memory.read, {profile.addresses['CURRENTFRAMEADDRESS']: 1200})['CURRENTFRAMEADDRESS']
+    memory.write_int(profile.addresses['CURRENTFRAMEADDRESS'], OffsetProfiles.MAX_FRAME + 5)
+    assert not verify_profile(profile, memory.read)['CURRENTFRAMEADDRESS']
+
+
+def test_select_profile_waits_for_the_frame_to_advance(monkeypatch):
+    monkeypatch.setattr(OffsetProfiles, 'default_profile', None)
+    profile = load_default_profile()
+    memory = game_memory(profile, frame=1000)
+    frame_samples = {}
+    assert select_profile(None, memory.read, allow_scan=False, frame_samples=frame_samples) == (
+        OffsetProfiles.get_default_profile(), False)
+    memory.write_int(profile.addresses['CURRENTFRAMEADDRESS'], 1015)
+    assert select_profile(None, memory.read, allow_scan=False, frame_samples=frame_samples)[1]
+
+
+def test_class_index_out_of_range_fails():
+    profile = load_default_profile()
+    memory = game_memory(profile)
+    memory.write_int(FIXED_POINT + profile.field_offsets['PLAYERSLOTSOFFSET'], OffsetProfiles.MAX_HOUSES + 1)
+    results = verify_profile(profile, memory.read, earlier_frames(profile))
+    assert results is not None and not results['PLAYERSLOTSOFFSET']
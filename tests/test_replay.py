@@ -0,0 +1,62 @@
+from Replay import ReplayThread, MAX_CATCHUP_TICKS
+from test_match_recorder import write_recording, TICKS
+
+
+class FramePump:
+    def __init__(self):
+        self.published = 0
+
+    def publish(self):
+        self.published += 1
+
+
+def replay(tmp_path, monkeypatch, ticks=TICKS):
+    path = tmp_path / 'match.ra2rec'
+    write_recording(path, monkeypatch, ticks)
+    return ReplayThread(str(path), FramePump())
+
+
+def history(thread):
+    series = thread.game_data.history.get(0)
+    return [round(timestamp - thread.start_time, 1) for timestamp in series.timestamps()]
+
+
+def test_playing_applies_every_passed_tick(tmp_path, monkeypatch):
+    thread = replay(tmp_path, monkeypatch)
+    assert history(thread) == [0.0]
+    shown_tick = thread.show(0, None)
+    shown_tick = thread.show(3, shown_tick)
+    assert shown_tick == 3
+    assert history(thread) == [0.0, 1.5, 3.0, 4.5]
+    assert thread.game_data.players[0].balance == 10000 - 3 * 700
+    assert thread.show(3, shown_tick) == 3
+    assert len(history(thread)) == 4
+    assert thread.frame_pump.published == 2
+
+
+def test_seeking_back_starts_the_history_over(tmp_path, monkeypatch):
+    thread = replay(tmp_path, monkeypatch)
+    shown_tick = thread.show(6, thread.show(0, None))
+    assert thread.show(2, shown_tick) == 2
+    assert history(thread) == [3.0]
+    assert thread.game_data.players[1].power_drain == 6
+
+
+def test_large_jump_is_a_seek(tmp_path, monkeypatch):
+    ticks = MAX_CATCHUP_TICKS + 10
+    thread = replay(tmp_path, monkeypatch, ticks)
+    shown_tick = thread.show(0, None)
+    assert thread.show(MAX_CATCHUP_TICKS, shown_tick) == MAX_CATCHUP_TICKS
+    assert len(history(thread)) == MAX_CATCHUP_TICKS + 1
+    thread.show(ticks - 1, thread.show(0, None))
+    assert history(thread) == [round((ticks - 1) * 1.5, 1)]
+    assert thread.game_data.players[1].is_loser
+
+
+def test_seek_is_clamped_to_the_recording(tmp_path, monkeypatch):
+    thread = replay(tmp_path, monkeypatch)
+    thread.seek(-5)
+    assert thread.seek_target == 0.0
+    thread.seek(1000)
+    assert thread.seek_target == thread.duration() == (TICKS - 1) * 1.5
+    assert thread.recording.tick_at(thread.seek_target) == TICKS - 1
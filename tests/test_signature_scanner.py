@@ -0,0 +1,160 @@
+import os
+import struct
+
+import pytest
+
+import OffsetProfiles
+import SignatureScanner
+from SignatureScanner import SignatureScanner as Scanner, IMAGE_BASE, image_file_reader
+
+TEXT_RVA = 0x1000
+TEXT_SIZE = 0x40000
+DATA_RVA = TEXT_RVA + TEXT_SIZE
+DATA_SIZE = 0x40000
+
+FIXEDPOINT = IMAGE_BASE + DATA_RVA + 0x100
+CLASSBASEARRAY = IMAGE_BASE + DATA_RVA + 0x200
+CURRENTFRAME = IMAGE_BASE + DATA_RVA + 0x300
+
+
+def build_image():
+    """A zero filled PE image with a .text and a .data section."""
+    image = bytearray(DATA_RVA + DATA_SIZE)
+    image[0:2] = b'MZ'
+    struct.pack_into('<I', image, 0x3c, 0x80)
+    image[0x80:0x84] = b'PE\x00\x00'
+    struct.pack_into('<H', image, 0x80 + 6, 2)
+    struct.pack_into('<H', image, 0x80 + 20, 0xe0)
+    section_table = 0x80 + 24 + 0xe0
+    sections = ((b'.text', TEXT_RVA, TEXT_SIZE, 0x60000020), (b'.data', DATA_RVA, DATA_SIZE, 0xc0000040))
+    for index, (name, rva, size, characteristics) in enumerate(sections):
+        struct.pack_into('<8sII', image, section_table + index * 40, name, size, rva)
+        struct.pack_into('<I', image, section_table + index * 40 + 36, characteristics)
+    return image
+
+
+def place(image, offset, pattern, values):
+    """Write pattern at image offset, with the 32 bit values {position in pattern: value} in its wildcards."""
+    code = bytearray(int(token, 16) if token != '??' else 0 for token in pattern.split())
+    for position, value in values.items():
+        struct.pack_into('<I', code, position, value)
+    image[offset:offset + len(code)] = code
+
+
+def place_all(image):
+    place(image, TEXT_RVA + 0x1000, '8B 0D ?? ?? ?? ?? 8B 84 81 ?? ?? 00 00', {2: FIXEDPOINT, 9: 0x1180})
+    place(image, TEXT_RVA + 0x2000, '8B 15 ?? ?? ?? ?? 8B 34 82 85 F6', {2: CLASSBASEARRAY})
+    place(image, TEXT_RVA + 0x3000, 'A1 ?? ?? ?? ?? 40 A3 ?? ?? ?? ??', {1: CURRENTFRAME, 7: CURRENTFRAME})
+    place(image, TEXT_RVA + 0x4000, '8B 86 ?? ?? 00 00 2B C7 89 86 ?? ?? 00 00', {2: 0x30c, 10: 0x30c})
+    place(image, TEXT_RVA + 0x5000, '01 BE ?? ?? 00 00 8B 86', {2: 0x2dc})
+    place(image, TEXT_RVA + 0x6000, '8B 81 ?? ?? 00 00 8B 91 ?? ?? 00 00 2B C2', {2: 0x53a4, 8: 0x53a8})
+
+
+def reader(image):
+    def read(address, size):
+        offset = address - IMAGE_BASE
+        if offset < 0 or offset + size > len(image):
+            return None
+        return bytes(image[offset:offset + size])
+    return read
+
+
+def test_finds_every_signature():
+    image = build_image()
+    place_all(image)
+    assert Scanner(reader(image)).scan() == {
+        'FIXEDPOINTADDRESS': FIXEDPOINT,
+        'PLAYERSLOTSOFFSET': 0x1180,
+        'CLASSBASEARRAYADDRESS': CLASSBASEARRAY,
+        'CURRENTFRAMEADDRESS': CURRENTFRAME,
+        'BALANCEOFFSET': 0x30c,
+        'CREDITSPENT_OFFSET': 0x2dc,
+        'POWEROUTPUTOFFSET': 0x53a4,
+        'POWERDRAINOFFSET': 0x53a8,
+    }
+
+
+def test_match_across_chunk_boundary(monkeypatch):
+    monkeypatch.setattr(SignatureScanner, 'CHUNK_SIZE', 0x1000)
+    image = build_image()
+    # Starts 3 bytes before the end of the second chunk of .text
+    place(image, TEXT_RVA + 0x2000 - 3, '8B 15 ?? ?? ?? ?? 8B 34 82 85 F6', {2: CLASSBASEARRAY})
+    assert Scanner(reader(image)).scan() == {'CLASSBASEARRAYADDRESS': CLASSBASEARRAY}
+
+
+def test_ambiguous_signature_is_rejected():
+    image = build_image()
+    place_all(image)
+    place(image, TEXT_RVA + 0x7000, '8B 15 ?? ?? ?? ?? 8B 34 82 85 F6', {2: CLASSBASEARRAY + 4})
+    found = Scanner(reader(image)).scan()
+    assert 'CLASSBASEARRAYADDRESS' not in found
+    assert found['FIXEDPOINTADDRESS'] == FIXEDPOINT
+
+
+def test_repeated_matches_of_one_value_are_not_ambiguous():
+    image = build_image()
+    place_all(image)
+    place(image, TEXT_RVA + 0x7000, '8B 15 ?? ?? ?? ?? 8B 34 82 85 F6', {2: CLASSBASEARRAY})
+    assert Scanner(reader(image)).scan()['CLASSBASEARRAYADDRESS'] == CLASSBASEARRAY
+
+
+def test_captures_must_agree():
+    image = build_image()
+    # Loads one global and stores another, so it is not the frame counter
+    place(image, TEXT_RVA + 0x3000, 'A1 ?? ?? ?? ?? 40 A3 ?? ?? ?? ??', {1: CURRENTFRAME, 7: CURRENTFRAME + 4})
+    assert 'CURRENTFRAMEADDRESS' not in Scanner(reader(image)).scan()
+
+
+def test_address_outside_data_sections_is_rejected():
+    image = build_image()
+    place(image, TEXT_RVA + 0x2000, '8B 15 ?? ?? ?? ?? 8B 34 82 85 F6', {2: IMAGE_BASE + TEXT_RVA + 0x10})
+    assert Scanner(reader(image)).scan() == {}
+
+
+def test_image_without_pe_header():
+    assert Scanner(lambda address, size: bytes(size)).scan() == {}
+
+
+def test_shared_patterns_are_searched_once(monkeypatch):
+    searched = []
+    compile_pattern = SignatureScanner.compile_pattern
+    monkeypatch.setattr(SignatureScanner, 'compile_pattern', lambda pattern: searched.append(pattern) or compile_pattern(pattern))
+    image = build_image()
+    place_all(image)
+    found = Scanner(reader(image)).scan()
+    assert len(searched) == len(set(searched)) == len({pattern for pattern, _, _ in SignatureScanner.SIGNATURES.values()})
+    assert found['PLAYERSLOTSOFFSET'] == 0x1180 and found['POWERDRAINOFFSET'] == 0x53a8
+
+
+def test_ambiguous_signature_keeps_its_candidates():
+    image = build_image()
+    place_all(image)
+    place(image, TEXT_RVA + 0x7000, '8B 86 ?? ?? 00 00 2B C7 89 86 ?? ?? 00 00', {2: 0x2f0, 10: 0x2f0})
+    scanner = Scanner(reader(image))
+    assert 'BALANCEOFFSET' not in scanner.scan()
+    assert scanner.ambiguous == {'BALANCEOFFSET': [0x2f0, 0x30c]}
+
+
+def test_image_file_reader_maps_sections(tmp_path):
+    image = build_image()
+    place_all(image)
+    # Store .text and .data at other file offsets than their addresses, as linkers do
+    section_table = 0x80 + 24 + 0xe0
+    raw = bytearray(image[:0x400])
+    for index, (rva, size) in enumerate(((TEXT_RVA, TEXT_SIZE), (DATA_RVA, DATA_SIZE))):
+        struct.pack_into('<II', raw, section_table + index * 40 + 16, size, len(raw))
+        raw += image[rva:rva + size]
+    path = tmp_path / 'gamemd.exe'
+    path.write_bytes(bytes(raw))
+    assert Scanner(image_file_reader(str(path))).scan() == Scanner(reader(image)).scan()
+
+
+@pytest.mark.skipif(not os.environ.get('GAMEMD_EXE'), reason="set GAMEMD_EXE to a gamemd.exe 1.001 to check the signatures")
+def test_signatures_on_real_build():
+    """Every signature must find exactly the value of the shipped 1.001 profile."""
+    profile = OffsetProfiles.load_default_profile()
+    expected = {**profile.addresses, **profile.field_offsets}
+    scanner = Scanner(image_file_reader(os.environ['GAMEMD_EXE']))
+    found = scanner.scan()
+    assert scanner.ambiguous == {}
+    assert found == {name: expected[name] for name in SignatureScanner.SIGNATURES}
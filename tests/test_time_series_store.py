@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+from TimeSeriesStore import TimeSeriesStore
+
+
+def make_player(index, balance, infantry_counts=None):
+    return SimpleNamespace(index=index, balance=balance, spent_credit=balance * 2, power_output=100, power_drain=-5,
+                           infantry_counts=infantry_counts or {}, tank_counts={}, building_counts={},
+                           aircraft_counts={})
+
+
+def test_ring_keeps_the_newest_samples_in_order():
+    store = TimeSeriesStore(max_samples=3)
+    player = make_player(0, 0)
+    for tick in range(5):
+        player.balance = tick * 10
+        store.record([player], timestamp=100 + tick, frame=tick * 15)
+    series = store.get(0)
+    assert series.capacity == 3 and series.length == 3
+    assert series.timestamps() == [102, 103, 104]
+    assert series.game_frames() == [30, 45, 60]
+    assert series.values('balance') == [20, 30, 40]
+    assert series.values('power_drain') == [-5, -5, -5]
+
+
+def test_unit_seen_late_reads_zero_before_it_showed_up():
+    store = TimeSeriesStore(max_samples=4)
+    player = make_player(0, 0)
+    store.record([player], timestamp=1)
+    player.infantry_counts = {'GI': 3}
+    store.record([player], timestamp=2)
+    player.infantry_counts = {}
+    store.record([player], timestamp=3, frame=None)
+    series = store.get(0)
+    assert series.values('infantry_counts', 'GI') == [0, 3, 0]
+    assert series.values('infantry_counts', 'Conscript') == [0, 0, 0]
+    assert series.game_frames() == [-1, -1, -1]
+
+
+def test_wraparound_after_a_new_column():
+    store = TimeSeriesStore(max_samples=2)
+    player = make_player(0, 0)
+    for tick, counts in enumerate(({}, {'GI': 1}, {'GI': 2})):
+        player.infantry_counts = counts
+        store.record([player], timestamp=tick)
+    assert store.get(0).values('infantry_counts', 'GI') == [1, 2]
+
+
+def test_columns_past_the_budget_are_dropped():
+    store = TimeSeriesStore(memory_budget=2000, max_samples=10)
+    players = [make_player(0, 0), make_player(1, 0)]
+    store.record(players, timestamp=0)
+    assert store.capacity == 10
+    players[0].infantry_counts = {f'unit{number}': 1 for number in range(50)}
+    store.record(players, timestamp=1)
+    assert store.used <= store.memory_budget
+    assert store.budget_warning_logged
+    assert store.get(1).values('balance') == [0, 0]
+
+    store.clear()
+    assert store.get(0) is None and store.used == 0 and store.capacity is None